@@ -0,0 +1,258 @@
+import heapq
+import itertools
+import logging
+import math
+import threading
+import time
+from functools import wraps
+
+from flask import g, jsonify
+from werkzeug.exceptions import ServiceUnavailable
+
+# Obtener el logger de la aplicación Flask
+logger = logging.getLogger(__name__)
+
+# Prioridades de acceso a la base de datos (menor valor = se atiende antes)
+PRIORITIES = {'high': 0, 'normal': 1, 'low': 2}
+
+
+class AdmissionRejected(ServiceUnavailable):
+    """Se lanza cuando una consulta no obtiene turno en la base de datos; Flask responde 503 con Retry-After."""
+
+    def __init__(self, description, retry_after, reason):
+        super().__init__(description, retry_after=retry_after)
+        self.reason = reason
+
+
+class CircuitOpenError(AdmissionRejected):
+    """Se lanza mientras el circuito está abierto tras varios errores seguidos de la base de datos."""
+
+    def __init__(self, retry_after):
+        super().__init__("La base de datos no está disponible temporalmente.", retry_after, 'circuit_open')
+
+
+def db_priority(level, timeout=None):
+    """Decorador de rutas: fija la prioridad de sus consultas y, opcionalmente, su tiempo máximo por sentencia."""
+    if level not in PRIORITIES:
+        raise ValueError(f"Prioridad desconocida: '{level}'.")
+
+    def decorator(f):
+        @wraps(f)
+        def wrapper(*args, **kwargs):
+            g.db_priority = level
+            if timeout is not None:
+                g.db_timeout = timeout
+            return f(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def current_priority():
+    """Prioridad de las consultas del contexto actual ('normal' si la ruta o el hilo no fijaron otra)."""
+    return g.get('db_priority', 'normal')
+
+
+class AdmissionController:
+    """Limita las consultas simultáneas contra la base de datos y ordena la espera por prioridad.
+
+    Como mucho `max_concurrent` consultas a la vez; las `reserved` últimas plazas sólo las usa la
+    prioridad 'high', para que un listado masivo no deje sin turno a las alertas, y la prioridad
+    'low' no ocupa más de `low_max` plazas, para que los listados lentos no agoten las de las
+    rutas normales. Quien no obtiene
+    plaza espera en una cola ordenada por prioridad (y por llegada) como mucho `queue_timeout`
+    segundos; si la cola está llena o se agota la espera se lanza AdmissionRejected.
+    """
+
+    def __init__(self, max_concurrent=8, reserved=2, max_queue=32, queue_timeout=2.0, retry_after=1, low_max=None):
+        if max_concurrent < 1:
+            raise ValueError("max_concurrent debe ser al menos 1")
+        self.max_concurrent = max_concurrent
+        self.reserved = min(reserved, max_concurrent - 1)
+        shared = max_concurrent - self.reserved
+        self.low_max = shared if low_max is None else max(1, min(low_max, shared))
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.retry_after = retry_after
+        self._active = 0
+        self._active_low = 0
+        self._waiters = [] # Montículo de [prioridad, orden de llegada, concedida]
+        self._order = itertools.count()
+        self._cond = threading.Condition(threading.Lock())
+        # Estadísticas
+        self._admitted = 0
+        self._queued_total = 0
+        self._rejected = {}
+
+    def _limit(self, level):
+        return self.max_concurrent if level == PRIORITIES['high'] else self.max_concurrent - self.reserved
+
+    def _fits(self, level):
+        if self._active >= self._limit(level):
+            return False
+        return level != PRIORITIES['low'] or self._active_low < self.low_max
+
+    def _admit(self, level):
+        self._active += 1
+        if level == PRIORITIES['low']:
+            self._active_low += 1
+        self._admitted += 1
+
+    def acquire(self, priority='normal', timeout=None):
+        """Obtiene una plaza y devuelve los segundos esperados en cola; lanza AdmissionRejected si no la obtiene."""
+        level = PRIORITIES[priority]
+        timeout = self.queue_timeout if timeout is None else timeout
+        with self._cond:
+            # Sin adelantar a quien ya espera con igual o mayor prioridad
+            if self._fits(level) and not (self._waiters and self._waiters[0][0] <= level):
+                self._admit(level)
+                return 0.0
+            if len(self._waiters) >= self.max_queue:
+                self._reject(priority, 'queue_full')
+            waiter = [level, next(self._order), False]
+            heapq.heappush(self._waiters, waiter)
+            self._queued_total += 1
+            start = time.monotonic()
+            deadline = start + timeout
+            while not waiter[2]:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._waiters.remove(waiter)
+                    heapq.heapify(self._waiters)
+                    self._grant() # Quien esperaba detrás quizá sí cabe en el límite de su prioridad
+                    self._reject(priority, 'timeout')
+                self._cond.wait(remaining)
+            return time.monotonic() - start
+
+    def release(self, priority='normal'):
+        """Libera la plaza obtenida con `priority` y se la concede a la siguiente espera por orden de prioridad."""
+        with self._cond:
+            self._active -= 1
+            if PRIORITIES[priority] == PRIORITIES['low']:
+                self._active_low -= 1
+            self._grant()
+
+    def _grant(self):
+        granted = False
+        # La cabeza del montículo es la de mayor prioridad: si una 'low' no cabe, detrás sólo hay otras 'low'
+        while self._waiters and self._fits(self._waiters[0][0]):
+            waiter = heapq.heappop(self._waiters)
+            waiter[2] = True
+            self._admit(waiter[0])
+            granted = True
+        if granted:
+            self._cond.notify_all()
+
+    def _reject(self, priority, reason):
+        key = f"{priority}_{reason}"
+        self._rejected[key] = self._rejected.get(key, 0) + 1
+        raise AdmissionRejected("La base de datos está saturada; inténtelo de nuevo en unos segundos.",
+                                self.retry_after, reason)
+
+    def stats(self):
+        with self._cond:
+            queued = {name: 0 for name in PRIORITIES}
+            names = {level: name for name, level in PRIORITIES.items()}
+            for level, _, _ in self._waiters:
+                queued[names[level]] += 1
+            return {
+                "active": self._active,
+                "active_low": self._active_low,
+                "max_concurrent": self.max_concurrent,
+                "low_max": self.low_max,
+                "queued": len(self._waiters),
+                "queued_by_priority": queued,
+                "admitted": self._admitted,
+                "queued_total": self._queued_total,
+                "rejected": sum(self._rejected.values()),
+                "rejected_by_reason": dict(self._rejected),
+            }
+
+
+class CircuitBreaker:
+    """Corta el acceso a la base de datos tras `failure_threshold` errores seguidos.
+
+    Con el circuito abierto las consultas se rechazan al momento durante `reset_timeout`
+    segundos; después se deja pasar una sola de prueba (semiabierto) y, si va bien, se cierra.
+    """
+
+    CLOSED, OPEN, HALF_OPEN = 0, 1, 2
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_started = 0.0
+        self._lock = threading.Lock()
+        # Estadísticas
+        self._trips = 0
+        self._rejected = 0
+
+    def allow(self):
+        """Lanza CircuitOpenError si el circuito no deja pasar consultas en este momento.
+
+        Devuelve True si la consulta es la de prueba del circuito semiabierto; si después no llega
+        a ejecutarse (p. ej. la rechaza el control de admisión) hay que llamar a cancel_trial().
+        """
+        if self.failure_threshold <= 0:
+            return False
+        with self._lock:
+            if self._state == self.CLOSED:
+                return False
+            now = time.monotonic()
+            # Con el circuito semiabierto, otra prueba si la anterior no terminó en reset_timeout
+            started = self._opened_at if self._state == self.OPEN else self._trial_started
+            remaining = started + self.reset_timeout - now
+            if remaining > 0:
+                self._rejected += 1
+                raise CircuitOpenError(max(1, math.ceil(remaining)))
+            self._state = self.HALF_OPEN
+            self._trial_started = now
+            return True
+
+    def cancel_trial(self):
+        """Devuelve el turno de prueba sin gastarlo: la siguiente consulta podrá probar al momento."""
+        with self._lock:
+            if self._state == self.HALF_OPEN:
+                self._trial_started = time.monotonic() - self.reset_timeout
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            if self._state != self.CLOSED:
+                self._state = self.CLOSED
+                logger.info("Circuito de la base de datos cerrado: la consulta de prueba funcionó.")
+
+    def record_failure(self):
+        if self.failure_threshold <= 0:
+            return
+        with self._lock:
+            self._failures += 1
+            if self._state == self.HALF_OPEN or (self._state == self.CLOSED and self._failures >= self.failure_threshold):
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+                self._trips += 1
+                logger.warning("Circuito de la base de datos abierto tras %d errores seguidos; se reintenta en %.0f s.",
+                               self._failures, self.reset_timeout)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "state": self._state,
+                "consecutive_failures": self._failures,
+                "trips": self._trips,
+                "rejected": self._rejected,
+            }
+
+
+def _rejected_response(error):
+    response = jsonify({"message": error.description, "reason": error.reason})
+    response.status_code = error.code
+    response.headers['Retry-After'] = str(error.retry_after)
+    return response
+
+
+def init_app(app):
+    """Registra la respuesta JSON 503 con Retry-After para las consultas rechazadas."""
+    app.register_error_handler(AdmissionRejected, _rejected_response)
@@ -0,0 +1,313 @@
+import logging
+import os
+import queue
+import threading
+from collections import deque
+from datetime import datetime
+
+from flask import g
+
+from werkzeug.exceptions import HTTPException
+
+from admission import AdmissionRejected
+from database import fetch_data
+
+# Obtener el logger de la aplicación Flask
+logger = logging.getLogger(__name__)
+
+ALERT_COLUMNS = "ID, NombreMetrica, ValorActual, Unidad, FechaHora, UmbralNormal, UmbralAdvertencia"
+
+# Alertas posteriores a una marca de agua (FechaHora, ID), en orden
+_AFTER_WATERMARK = "WHERE FechaHora > ? OR (FechaHora = ? AND ID > ?) ORDER BY FechaHora ASC, ID ASC"
+
+# Evento que pide al cliente recargar /api/alerts cuando no se pueden reenviar las alertas perdidas
+RESET_EVENT = "event: reset\ndata: {\"reason\": \"resume_unavailable\"}\n\n"
+
+
+def _event_id(alert):
+    """Identificador SSE de una alerta: marca de agua FechaHora|ID."""
+    return f"{alert['FechaHora']}|{alert['ID']}"
+
+
+def _parse_fecha(value):
+    """FechaHora como datetime para enlazarla en la consulta (el conversor de filas la entrega en ISO 8601)."""
+    return datetime.fromisoformat(value) if isinstance(value, str) else value
+
+
+def _parse_event_id(event_id):
+    """Convierte un Last-Event-ID en (FechaHora, ID) o None si no es válido."""
+    if not event_id or '|' not in event_id:
+        return None
+    fecha, _, alert_id = event_id.rpartition('|')
+    try:
+        return _parse_fecha(fecha), int(alert_id)
+    except ValueError:
+        return None
+
+
+def _format_event(alert, dumps):
+    """Evento SSE de una alerta como (clave de orden, texto)."""
+    payload = f"id: {_event_id(alert)}\nevent: alert\ndata: {dumps(alert)}\n\n"
+    # La clave guarda la fecha nativa; el texto sólo se usa en el id del evento
+    return (_parse_fecha(alert['FechaHora']), alert['ID']), payload
+
+
+class Subscriber:
+    """Cola de eventos pendientes de un cliente conectado.
+
+    `last_key` es la clave del último evento encolado: los eventos que no sean posteriores se
+    descartan, así no se repiten los que llegan a la vez de la base de datos y del búfer.
+    """
+
+    def __init__(self, max_queue, last_key=None):
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.closed = False
+        self.last_key = last_key
+
+    def push(self, key, payload):
+        """Encola un evento; devuelve False si el cliente va demasiado lento y su cola está llena."""
+        if self.last_key is not None and key is not None and key <= self.last_key:
+            return True
+        try:
+            self.queue.put_nowait(payload)
+        except queue.Full:
+            return False
+        if key is not None:
+            self.last_key = key
+        return True
+
+
+class AlertBroadcaster:
+    """Consulta las alertas nuevas una sola vez por intervalo y las reparte entre todos los clientes SSE.
+
+    Un hilo en segundo plano por proceso sigue una marca de agua (FechaHora, ID) y sólo pide a la
+    base de datos las alertas posteriores. Las últimas alertas se guardan en un búfer circular para
+    reanudar con Last-Event-ID sin consultar la base de datos; si el evento pedido es anterior al
+    búfer (o el proceso aún no lo ha llenado, p. ej. al reconectar a otro worker) las alertas
+    perdidas se leen de Alertas, y si son más de las que caben en la cola del cliente se le envía
+    un evento `reset` para que recargue /api/alerts. Si un cliente no consume sus eventos
+    y su cola se llena, se le desconecta; al reconectar reanuda desde su último evento.
+    Cada cliente ocupa un hilo del servidor mientras está conectado: con `max_clients` se rechazan
+    (503) las conexiones que excedan los hilos reservados para el stream.
+    """
+
+    def __init__(self, app, poll_interval=5.0, buffer_size=200, client_queue_size=100, initial_events=5,
+                 max_clients=0):
+        self.app = app
+        self.poll_interval = poll_interval
+        self.max_clients = max_clients
+        self.client_queue_size = client_queue_size
+        self.initial_events = initial_events
+        self._buffer = deque(maxlen=buffer_size)
+        self._watermark = None
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        # Estadísticas
+        self.polls = 0
+        self.poll_errors = 0
+        self.events = 0
+        self.disconnected_slow = 0
+        self.rejected = 0
+        self.backfilled = 0
+        self.resets = 0
+        self.resume_errors = 0
+
+    def subscribe(self, last_event_id=None):
+        """Registra un cliente y le encola los eventos que debe recibir al conectarse."""
+        resume_from = _parse_event_id(last_event_id)
+        with self._lock:
+            self._check_capacity()
+            backfill = resume_from is not None and (not self._buffer or resume_from < self._buffer[0][0])
+        missed = self._fetch_missed(resume_from) if backfill else []
+        with self._lock:
+            self._check_capacity()
+            if resume_from is not None and missed is not None:
+                subscriber = Subscriber(self.client_queue_size, last_key=resume_from)
+                backlog = missed + [event for event in self._buffer if event[0] > resume_from]
+            if resume_from is None or missed is None or len(backlog) > self.client_queue_size:
+                subscriber = Subscriber(self.client_queue_size)
+                if resume_from is not None:
+                    # No se pueden reenviar las alertas perdidas: el cliente recarga y sigue como si conectara de nuevo
+                    self.resets += 1
+                    subscriber.push(None, RESET_EVENT)
+                backlog = list(self._buffer)[-self.initial_events:] if self.initial_events else []
+            for key, payload in backlog:
+                subscriber.push(key, payload)
+            self._subscribers.add(subscriber)
+            first = len(self._subscribers) == 1
+        self._ensure_started()
+        if first:
+            self._wakeup.set() # Consulta enseguida si el hilo estaba en reposo sin clientes
+        return subscriber
+
+    def _check_capacity(self):
+        """Rechaza (503) la conexión si ya no quedan plazas para clientes; se llama con el cerrojo tomado."""
+        if self.max_clients and len(self._subscribers) >= self.max_clients:
+            self.rejected += 1
+            raise AdmissionRejected("Demasiados clientes conectados al stream de alertas; inténtelo más tarde.",
+                                    max(1, int(self.poll_interval)), 'stream_full')
+
+    def _fetch_missed(self, resume_from):
+        """Alertas posteriores a `resume_from` leídas de la base de datos.
+
+        Devuelve None si son más de las que caben en la cola del cliente o si la consulta falla.
+        """
+        try:
+            with self.app.app_context():
+                g.db_priority = 'high'
+                fecha, alert_id = resume_from
+                rows = fetch_data(
+                    f"SELECT TOP {self.client_queue_size + 1} {ALERT_COLUMNS} FROM Alertas {_AFTER_WATERMARK}",
+                    (fecha, fecha, alert_id),
+                )
+        except HTTPException:
+            raise # 503 del control de admisión: el cliente reintenta con el mismo Last-Event-ID
+        except Exception as e:
+            self.resume_errors += 1
+            logger.error("Error al leer las alertas perdidas para reanudar el stream: %s", e)
+            return None
+        if len(rows) > self.client_queue_size:
+            return None
+        self.backfilled += len(rows)
+        dumps = self.app.json.dumps
+        return [_format_event(alert, dumps) for alert in rows]
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+        subscriber.closed = True
+
+    def _ensure_started(self):
+        if self._thread is None or not self._thread.is_alive():
+            with self._lock:
+                if self._thread is None or not self._thread.is_alive():
+                    self._thread = threading.Thread(target=self._run, name='alerts-broadcaster', daemon=True)
+                    self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.poll_interval)
+            self._wakeup.clear()
+            with self._lock:
+                if not self._subscribers:
+                    continue
+            try:
+                self.poll()
+            except Exception as e:
+                self.poll_errors += 1
+                logger.error("Error al consultar alertas nuevas para el stream: %s", e)
+
+    def poll(self):
+        """Consulta las alertas posteriores a la marca de agua y las reparte a los clientes."""
+        with self.app.app_context():
+            g.db_priority = 'high' # Las alertas pasan antes que los listados masivos
+            if self._watermark is None:
+                # Primera consulta: sólo las más recientes, para llenar el búfer
+                rows = fetch_data(
+                    f"SELECT TOP {self._buffer.maxlen} {ALERT_COLUMNS} FROM Alertas ORDER BY FechaHora DESC, ID DESC"
+                )
+                rows.reverse()
+            else:
+                fecha, alert_id = self._watermark
+                rows = fetch_data(
+                    f"SELECT TOP {self._buffer.maxlen} {ALERT_COLUMNS} FROM Alertas {_AFTER_WATERMARK}",
+                    (fecha, fecha, alert_id),
+                )
+        self.polls += 1
+        if not rows:
+            return
+        dumps = self.app.json.dumps
+        events = [_format_event(alert, dumps) for alert in rows]
+        with self._lock:
+            first_load = self._watermark is None
+            self._watermark = events[-1][0]
+            self._buffer.extend(events)
+            # En la primera carga los clientes nuevos reciben el estado inicial y los que reanudan, lo que les falta
+            initial = events[-self.initial_events:] if self.initial_events else []
+            slow = []
+            for subscriber in self._subscribers:
+                pending = initial if first_load and subscriber.last_key is None else events
+                for key, payload in pending:
+                    if not subscriber.push(key, payload):
+                        slow.append(subscriber)
+                        break
+            for subscriber in slow:
+                # El cliente recibe lo que ya tenía en cola y luego se cierra la conexión
+                self._subscribers.discard(subscriber)
+                subscriber.closed = True
+        self.events += len(initial if first_load else events)
+        if slow:
+            self.disconnected_slow += len(slow)
+            logger.warning("Se desconectaron %d clientes lentos del stream de alertas.", len(slow))
+
+    def stream(self, subscriber, heartbeat):
+        """Generador de la respuesta SSE de un cliente."""
+        try:
+            yield f"retry: {int(self.poll_interval * 1000)}\n\n"
+            while True:
+                try:
+                    event = subscriber.queue.get(block=not subscriber.closed, timeout=heartbeat)
+                except queue.Empty:
+                    if subscriber.closed:
+                        break
+                    yield ": keepalive\n\n"
+                    continue
+                yield event
+        finally:
+            self.unsubscribe(subscriber)
+
+    def stats(self):
+        with self._lock:
+            subscribers = len(self._subscribers)
+            buffered = len(self._buffer)
+        return {
+            "subscribers": subscribers,
+            "buffered": buffered,
+            "polls": self.polls,
+            "poll_errors": self.poll_errors,
+            "events": self.events,
+            "disconnected_slow": self.disconnected_slow,
+            "rejected": self.rejected,
+            "backfilled": self.backfilled,
+            "resets": self.resets,
+            "resume_errors": self.resume_errors,
+        }
+
+
+# Difusor del proceso (se crea en el primer uso)
+_broadcaster = None
+_broadcaster_lock = threading.Lock()
+
+
+def get_broadcaster(app):
+    """Devuelve el difusor de alertas del proceso, creándolo si aún no existe."""
+    global _broadcaster
+    if _broadcaster is None:
+        with _broadcaster_lock:
+            if _broadcaster is None:
+                config = app.config
+                _broadcaster = AlertBroadcaster(
+                    app,
+                    poll_interval=config.get('ALERTS_STREAM_POLL_INTERVAL', 5.0),
+                    buffer_size=config.get('ALERTS_STREAM_BUFFER_SIZE', 200),
+                    client_queue_size=config.get('ALERTS_STREAM_CLIENT_QUEUE', 100),
+                    max_clients=config.get('ALERTS_STREAM_MAX_CLIENTS', 0),
+                )
+    return _broadcaster
+
+
+def _reset_after_fork():
+    """En el proceso hijo de un fork el hilo del difusor no existe: se crea uno nuevo en el primer uso."""
+    global _broadcaster, _broadcaster_lock
+    _broadcaster = None
+    _broadcaster_lock = threading.Lock()
+
+
+if hasattr(os, 'register_at_fork'): # No existe en Windows
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def get_stream_stats():
+    return _broadcaster.stats() if _broadcaster is not None else None
@@ -1,52 +1,37 @@
 # backend/app.py
-import os
-from flask import Flask, jsonify, request
+import logging
+import time
+from functools import wraps
+from flask import Blueprint, Flask, Response, current_app, jsonify, request, stream_with_context
 from flask_cors import CORS
 import jwt
-from dotenv import load_dotenv
-import logging
-from logging.handlers import RotatingFileHandler
-
-# Cargar variables de entorno
-load_dotenv()
-
-# --- Configuración ---
-TENANT_ID = os.getenv("TENANT_ID")
-CLIENT_ID = os.getenv("CLIENT_ID")
-ISSUER = f"https://login.microsoftonline.com/{TENANT_ID}/v2.0"
-AUDIENCE = CLIENT_ID
-
-# Inicializar Flask
-app = Flask(__name__)
-
-# Cargar configuración desde config.py
-from config import Config
-app.config.from_object(Config)
-
-# Configura CORS para permitir solicitudes desde tu frontend Angular
-# Reemplaza 'http://localhost:8000' con la URL real de tu frontend Angular en producción
-CORS(app, resources={r"/api/*": {"origins": ["http://localhost:8000", "http://127.0.0.1:8000"]}})
-
-# --- CONFIGURACIÓN DETALLADA DE LOGS ---
-log_formatter = logging.Formatter('%(asctime)s %(levelname)s %(funcName)s(%(lineno)d) %(message)s')
-log_file_path = os.path.join(os.getcwd(), 'logs', app.config['LOG_FILE']) # Ruta completa al archivo de log
-
-# Asegúrate de que la carpeta 'logs' exista
-if not os.path.exists(os.path.dirname(log_file_path)):
-    os.makedirs(os.path.dirname(log_file_path))
-
-# Configura un manejador de archivos que rota los logs cuando alcanzan 1MB, manteniendo 5 copias.
-my_handler = RotatingFileHandler(log_file_path, mode='a', maxBytes=1*1024*1024, backupCount=5, encoding='utf-8', delay=0)
-my_handler.setFormatter(log_formatter)
-my_handler.setLevel(app.config['LOG_LEVEL']) # Nivel mínimo para escribir en el archivo
-
-# Añade el manejador al logger de la aplicación Flask
-app.logger.setLevel(app.config['LOG_LEVEL'])
-app.logger.addHandler(my_handler)
+from werkzeug.exceptions import HTTPException
+import admission
+from admission import db_priority
+from alerts_stream import get_broadcaster, get_stream_stats
+from auth import get_token_validator, get_auth_stats
+from cache import cached_response, get_cache_stats
+from config import get_config
+from database import fetch_data, get_admission_stats, get_pool, get_pool_stats, get_table_columns
+from logging_config import configure_logging, get_logging_stats
+import metrics
+import response_compression
+from routes import ISLAND_TABLES, api_bp
+from ticket_summary import get_summary_stats
+
+# Obtener el logger de la aplicación Flask
+logger = logging.getLogger(__name__)
+
+# Rutas generales de la aplicación (las de tickets e ítems están en routes.py)
+main_bp = Blueprint('main', __name__)
+
+# Tiempos de arranque del proceso en milisegundos (se publican en /api/metrics)
+_startup = {}
 
 
 # --- Decorador de Autenticación (con logs añadidos) ---
 def token_required(f):
+    @wraps(f)
     def decorated(*args, **kwargs):
         token = None
         if 'Authorization' in request.headers:
@@ -54,73 +39,164 @@ def token_required(f):
                 auth_header = request.headers['Authorization']
                 token = auth_header.split(" ")[1]
             except IndexError:
-                app.logger.warning("Token malformado recibido.")
+                current_app.logger.warning("Token malformado recibido.")
                 return jsonify({"message": "Token malformado."}), 401
 
         if not token:
-            app.logger.warning("Intento de acceso a ruta protegida sin token.")
+            current_app.logger.warning("Intento de acceso a ruta protegida sin token.")
             return jsonify({"message": "Token no encontrado."}), 401
 
         try:
-            # Para validación completa del token, necesitarías las claves públicas de Azure AD.
-            # Aquí, solo se verifica la audiencia y el emisor sin verificar la firma (para simplificar, pero NO RECOMENDADO EN PRODUCCIÓN).
-            decoded_token = jwt.decode(
-                token,
-                options={"verify_signature": False}, # PELIGROSO en producción. Solo para depuración.
-                audience=AUDIENCE,
-                issuer=ISSUER
-            )
+            # Verifica firma (claves JWKS de Azure AD en caché), audiencia, emisor y expiración.
+            # Los tokens ya validados se guardan hasta su 'exp' y no vuelven a verificarse.
+            config = current_app.config
+            decoded_token = get_token_validator(config, config['TOKEN_AUDIENCE'], config['TOKEN_ISSUER']).decode(token)
             current_user = decoded_token
         except jwt.ExpiredSignatureError:
-            app.logger.warning(f"Token expirado para usuario: {decoded_token.get('name', 'N/A') if 'decoded_token' in locals() else 'N/A'}")
+            current_app.logger.warning("Token expirado para usuario: %s", decoded_token.get('name', 'N/A') if 'decoded_token' in locals() else 'N/A')
             return jsonify({"message": "El token ha expirado."}), 401
         except Exception as e:
-            app.logger.error(f"Error al decodificar el token: {str(e)}")
+            current_app.logger.error("Error al decodificar el token: %s", e)
             return jsonify({"message": "Token inválido.", "error": str(e)}), 401
 
         return f(current_user, *args, **kwargs)
-    decorated.__name__ = f.__name__
     return decorated
 
-# Importa las rutas después de inicializar la aplicación para evitar problemas de importación circular
-from routes import api_bp
-app.register_blueprint(api_bp, url_prefix='/api') # Registra el blueprint con prefijo /api
-
 # --- Rutas de la API (con logs añadidos) ---
 
-@app.route("/")
+@main_bp.route("/")
 def index():
-    app.logger.info("Ruta de bienvenida '/' fue accedida.")
+    current_app.logger.info("Ruta de bienvenida '/' fue accedida.")
     return jsonify({"message": "El servidor Flask está funcionando correctamente."})
 
-@app.route("/api/data")
+@main_bp.route("/api/data")
 @token_required
 def get_data(current_user):
     user_name = current_user.get("name", "N/A")
-    app.logger.info(f"Usuario '{user_name}' accedió a /api/data.")
+    current_app.logger.info("Usuario '%s' accedió a /api/data.", user_name)
     return jsonify({
         "message": "Respuesta protegida desde Flask.",
         "user_name_from_token": user_name
     })
 
-@app.route("/api/alerts")
+@main_bp.route("/api/alerts")
+@db_priority('high') # Las alertas pasan antes que los listados masivos
 @token_required
+@cached_response('alerts', tables=('Alertas',))
 def get_alerts(current_user):
-    from database import fetch_data # Importar aquí para evitar importación circular con app
     user_name = current_user.get("name", "N/A")
-    app.logger.info(f"Usuario '{user_name}' está solicitando las alertas desde /api/alerts.")
+    current_app.logger.info("Usuario '%s' está solicitando las alertas desde /api/alerts.", user_name)
     try:
         # Usa la función fetch_data de database.py
         query = "SELECT TOP 5 ID, NombreMetrica, ValorActual, Unidad, FechaHora, UmbralNormal, UmbralAdvertencia FROM Alertas ORDER BY FechaHora DESC"
         alerts = fetch_data(query)
-        app.logger.info(f"Se obtuvieron {len(alerts)} alertas de la base de datos.")
+        current_app.logger.info("Se obtuvieron %s alertas de la base de datos.", len(alerts))
         return jsonify(alerts)
+    except HTTPException:
+        raise # 503 del control de admisión
     except Exception as e:
-        app.logger.error(f"Error al obtener alertas: {str(e)}")
+        current_app.logger.error("Error al obtener alertas: %s", e)
         return jsonify({"message": "Error al obtener las alertas", "error": str(e)}), 500
 
+@main_bp.route("/api/alerts/stream")
+@token_required
+def stream_alerts(current_user):
+    """Alertas nuevas como Server-Sent Events; una sola consulta por intervalo para todos los clientes.
+
+    Al reconectar con Last-Event-ID se reenvían las alertas perdidas; si no es posible se envía un
+    evento `reset` y el cliente debe recargar /api/alerts antes de seguir con el stream.
+    """
+    user_name = current_user.get("name", "N/A")
+    current_app.logger.info("Usuario '%s' se suscribió al stream de alertas.", user_name)
+    broadcaster = get_broadcaster(current_app._get_current_object())
+    subscriber = broadcaster.subscribe(request.headers.get('Last-Event-ID') or request.args.get('lastEventId'))
+    events = broadcaster.stream(subscriber, current_app.config.get('ALERTS_STREAM_HEARTBEAT', 15.0))
+    response = Response(stream_with_context(events), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no' # Evita que un proxy nginx acumule los eventos
+    return response
+
+
+# --- Fábrica de la aplicación ---
+def create_app(config=None):
+    """Crea y configura la aplicación Flask.
+
+    `config` es una clase de config.py o su nombre ('development', 'production'); por defecto
+    se usa la variable de entorno APP_ENV. No abre conexiones: el pool, las cachés y los hilos
+    en segundo plano se crean en el primer uso dentro de cada proceso (o en warm_up).
+    """
+    start = time.perf_counter()
+    config_class = get_config(config)
+    app = Flask(__name__)
+    app.config.from_object(config_class)
+
+    # Configura CORS para permitir solicitudes desde tu frontend Angular
+    # Reemplaza 'http://localhost:8000' con la URL real de tu frontend Angular en producción
+    CORS(app, resources={r"/api/*": {"origins": ["http://localhost:8000", "http://127.0.0.1:8000"]}})
+
+    # --- CONFIGURACIÓN DETALLADA DE LOGS ---
+    # Los logs se encolan y los escribe un hilo en segundo plano (ver logging_config.py)
+    configure_logging(app)
+
+    # --- Métricas (/api/metrics en formato Prometheus) ---
+    metrics.init_app(app)
+    metrics.register_stats('db_pool', get_pool_stats, 'Estado del pool de conexiones.')
+    metrics.register_stats('db_admission', get_admission_stats, 'Consultas en curso, en cola y rechazadas; estado del circuito.')
+    metrics.register_stats('response_cache', get_cache_stats, 'Aciertos y fallos de la caché de respuestas.')
+    metrics.register_stats('auth', get_auth_stats, 'Aciertos y fallos de las cachés de JWKS y tokens validados.')
+    metrics.register_stats('logging', get_logging_stats, 'Cola de logs y registros descartados.')
+    metrics.register_stats('alerts_stream', get_stream_stats, 'Clientes y eventos del stream de alertas.')
+    metrics.register_stats('ticket_summary', get_summary_stats, 'Recálculos del resumen de tickets.')
+    metrics.register_stats('startup', lambda: dict(_startup), 'Tiempos de arranque del proceso en milisegundos.')
+
+    # --- Control de admisión: respuesta 503 con Retry-After cuando la base de datos está saturada ---
+    admission.init_app(app)
+
+    # --- Compresión de respuestas (después de las métricas para que cuenten los bytes comprimidos) ---
+    response_compression.init_app(app)
+
+    app.register_blueprint(main_bp)
+    app.register_blueprint(api_bp, url_prefix='/api') # Registra el blueprint con prefijo /api
+
+    _startup['create_app_ms'] = round((time.perf_counter() - start) * 1000, 1)
+    logger.info("Aplicación creada en %.1f ms (%s).", _startup['create_app_ms'], config_class.__name__)
+    return app
+
+
+def _prefetch_jwks(config):
+    jwks = get_token_validator(config, config['TOKEN_AUDIENCE'], config['TOKEN_ISSUER']).jwks
+    if not jwks.stats()['keys']: # Un worker hereda las claves que ya descargó el proceso maestro
+        jwks.refresh()
+
+
+def warm_up(app, connect=True):
+    """Prepara el proceso antes de que reciba peticiones y devuelve los milisegundos empleados.
+
+    Descarga las claves JWKS, descubre las columnas de las tablas de tickets y, con
+    connect=True, abre las conexiones mínimas del pool. Un fallo sólo se registra: la
+    petición que lo necesite volverá a intentarlo.
+    """
+    start = time.perf_counter()
+    with app.app_context():
+        config = app.config
+        steps = (
+            ('jwks', lambda: _prefetch_jwks(config)),
+            ('columnas', lambda: [get_table_columns(table) for table in ISLAND_TABLES.values()]),
+        )
+        if connect:
+            steps += (('pool', get_pool),)
+        for name, step in steps:
+            try:
+                step()
+            except Exception as e:
+                logger.warning("No se pudo preparar '%s' durante el arranque: %s", name, e)
+    _startup['warm_up_ms'] = round((time.perf_counter() - start) * 1000, 1)
+    logger.info("Proceso preparado en %.1f ms.", _startup['warm_up_ms'])
+    return _startup['warm_up_ms']
+
 
-# --- Ejecución del Servidor ---
+# --- Ejecución del Servidor (desarrollo; en producción: gunicorn -c gunicorn.conf.py wsgi:app) ---
 if __name__ == "__main__":
+    app = create_app() # Configuración según APP_ENV
     app.logger.info("Iniciando servidor Flask...")
-    app.run(host="0.0.0.0", port=5000, debug=app.config['DEBUG']) # Usa app.config['DEBUG']
\ No newline at end of file
+    app.run(host="0.0.0.0", port=5000, debug=app.config['DEBUG']) # Usa app.config['DEBUG']
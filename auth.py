@@ -0,0 +1,244 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+import urllib.request
+from collections import OrderedDict
+
+import jwt
+
+# Obtener el logger de la aplicación Flask
+logger = logging.getLogger(__name__)
+
+
+class JWKSCache:
+    """Caché de las claves públicas (JWKS) de Azure AD.
+
+    Las claves se refrescan en segundo plano cada `refresh_interval` segundos. Si llega un
+    token con un `kid` desconocido (rotación de claves) se vuelven a descargar, como mucho
+    una vez cada `min_refetch_interval` segundos.
+    """
+
+    def __init__(self, url, refresh_interval=3600, min_refetch_interval=60, http_timeout=5, fetch=None):
+        self.url = url
+        self.refresh_interval = refresh_interval
+        self.min_refetch_interval = min_refetch_interval
+        self.http_timeout = http_timeout
+        self._fetch = fetch or self._http_fetch
+        self._keys = {}
+        self._lock = threading.Lock()
+        self._last_fetch = None
+        self._thread = None
+        self._stop = threading.Event()
+        # Estadísticas
+        self.hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.refresh_errors = 0
+
+    def _http_fetch(self):
+        with urllib.request.urlopen(self.url, timeout=self.http_timeout) as response:
+            return json.loads(response.read().decode('utf-8'))
+
+    def refresh(self):
+        """Descarga el JWKS y reemplaza las claves en memoria. Lanza la excepción si falla."""
+        self._last_fetch = time.monotonic()
+        try:
+            jwks = self._fetch()
+            keys = {}
+            for data in jwks.get('keys', []):
+                try:
+                    key = jwt.PyJWK(data)
+                except jwt.PyJWTError as e:
+                    logger.warning("Clave JWKS ignorada (kid=%s): %s", data.get('kid'), e)
+                    continue
+                keys[key.key_id] = key
+        except Exception:
+            self.refresh_errors += 1
+            raise
+        self._keys = keys
+        self.refreshes += 1
+        logger.info("Claves JWKS actualizadas: %d claves.", len(keys))
+
+    def get_key(self, kid):
+        """Devuelve la clave pública para `kid`, descargando de nuevo el JWKS si no se conoce."""
+        self._ensure_started()
+        key = self._keys.get(kid)
+        if key is not None:
+            self.hits += 1
+            return key
+        self.misses += 1
+        with self._lock:
+            key = self._keys.get(kid)
+            if key is None and (self._last_fetch is None
+                                or time.monotonic() - self._last_fetch >= self.min_refetch_interval):
+                self.refresh()
+                key = self._keys.get(kid)
+        if key is None:
+            raise jwt.InvalidTokenError(f"No se encontró la clave de firma con kid '{kid}'.")
+        return key
+
+    def _ensure_started(self):
+        # El hilo se crea en el primer uso para que cada proceso (p. ej. tras un fork) tenga el suyo
+        if self._thread is None or not self._thread.is_alive():
+            with self._lock:
+                if self._thread is None or not self._thread.is_alive():
+                    self._thread = threading.Thread(target=self._run, name='jwks-refresh', daemon=True)
+                    self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.refresh_interval):
+            try:
+                with self._lock:
+                    self.refresh()
+            except Exception as e:
+                # Se conservan las claves anteriores hasta el próximo intento
+                logger.error("Error al refrescar las claves JWKS: %s", e)
+
+    def stop(self):
+        self._stop.set()
+
+    def after_fork(self):
+        """Conserva las claves heredadas; el hilo de refresco se vuelve a crear en el primer uso."""
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def stats(self):
+        return {
+            "keys": len(self._keys),
+            "hits": self.hits,
+            "misses": self.misses,
+            "refreshes": self.refreshes,
+            "refresh_errors": self.refresh_errors,
+        }
+
+
+class ValidatedTokenCache:
+    """LRU acotada de tokens ya validados, indexada por el hash del token.
+
+    Cada entrada caduca en el `exp` del token, así que una sesión que repite el mismo
+    token no vuelve a verificar la firma hasta que éste expira.
+    """
+
+    def __init__(self, max_size=1024):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        # Estadísticas
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(token):
+        return hashlib.sha256(token.encode('utf-8')).digest()
+
+    def get(self, token):
+        """Devuelve los claims del token si ya se validó y no ha expirado; si no, None."""
+        key = self._key(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                claims, expires_at = entry
+                if expires_at > time.time():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return claims
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, token, claims):
+        expires_at = claims.get('exp')
+        if not self.max_size or not isinstance(expires_at, (int, float)):
+            return
+        key = self._key(token)
+        with self._lock:
+            self._entries[key] = (claims, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def after_fork(self):
+        self._lock = threading.Lock()
+
+    def stats(self):
+        with self._lock:
+            size = len(self._entries)
+        return {"size": size, "max_size": self.max_size, "hits": self.hits, "misses": self.misses}
+
+
+class TokenValidator:
+    """Valida tokens de Azure AD verificando firma, audiencia, emisor y expiración."""
+
+    def __init__(self, jwks, audience, issuer, token_cache=None, algorithms=('RS256',)):
+        self.jwks = jwks
+        self.audience = audience
+        self.issuer = issuer
+        self.token_cache = token_cache or ValidatedTokenCache()
+        self.algorithms = list(algorithms)
+
+    def decode(self, token):
+        """Devuelve los claims del token o lanza una excepción de jwt si no es válido."""
+        claims = self.token_cache.get(token)
+        if claims is not None:
+            return claims
+        header = jwt.get_unverified_header(token)
+        key = self.jwks.get_key(header.get('kid'))
+        claims = jwt.decode(
+            token,
+            key=key.key,
+            algorithms=self.algorithms,
+            audience=self.audience,
+            issuer=self.issuer,
+        )
+        self.token_cache.put(token, claims)
+        return claims
+
+    def after_fork(self):
+        self.jwks.after_fork()
+        self.token_cache.after_fork()
+
+    def stats(self):
+        return {"jwks": self.jwks.stats(), "token_cache": self.token_cache.stats()}
+
+
+# Validador del proceso (se crea en el primer uso con la configuración de la app)
+_validator = None
+_validator_lock = threading.Lock()
+
+
+def get_token_validator(config, audience, issuer):
+    """Devuelve el validador de tokens del proceso, creándolo si aún no existe."""
+    global _validator
+    if _validator is None:
+        with _validator_lock:
+            if _validator is None:
+                jwks = JWKSCache(
+                    config['JWKS_URL'],
+                    refresh_interval=config.get('JWKS_REFRESH_INTERVAL', 3600),
+                    min_refetch_interval=config.get('JWKS_MIN_REFETCH_INTERVAL', 60),
+                )
+                _validator = TokenValidator(
+                    jwks, audience, issuer,
+                    token_cache=ValidatedTokenCache(config.get('TOKEN_CACHE_SIZE', 1024)),
+                )
+    return _validator
+
+
+def _reset_after_fork():
+    """En el proceso hijo de un fork reutiliza el validador (y sus claves JWKS) con cerrojos nuevos."""
+    global _validator_lock
+    _validator_lock = threading.Lock()
+    if _validator is not None:
+        _validator.after_fork()
+
+
+if hasattr(os, 'register_at_fork'): # No existe en Windows
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def get_auth_stats():
+    """Devuelve los contadores de aciertos y fallos de las cachés de autenticación."""
+    return _validator.stats() if _validator is not None else None
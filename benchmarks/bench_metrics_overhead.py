@@ -0,0 +1,98 @@
+"""Benchmark del coste de la instrumentación de metrics.py.
+
+Mide peticiones por segundo de una aplicación Flask mínima con y sin metrics.init_app, y el
+coste por llamada de los decoradores timed_db/timed_acquire sobre una función vacía.
+No necesita base de datos. Las dos variantes se ejecutan alternadas durante varias rondas y
+se toma la mejor de cada una, para que el ruido de la máquina no decida el resultado.
+
+Uso: python benchmarks/bench_metrics_overhead.py [--requests 20000] [--calls 200000] [--rounds 5]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask, jsonify  # noqa: E402
+
+import metrics  # noqa: E402
+
+
+def make_app(instrumented):
+    app = Flask(f"bench_{instrumented}")
+    if instrumented:
+        metrics.init_app(app)
+
+    @app.route('/api/ping')
+    def ping():
+        return jsonify({"ok": True})
+
+    return app
+
+
+def warm_up(client):
+    for _ in range(500):
+        client.get('/api/ping')
+
+
+def bench_requests(client, requests):
+    start = time.perf_counter()
+    for _ in range(requests):
+        client.get('/api/ping')
+    return time.perf_counter() - start
+
+
+def bench_calls(func, calls):
+    start = time.perf_counter()
+    for _ in range(calls):
+        func("SELECT 1")
+    return time.perf_counter() - start
+
+
+def best_of(rounds, *runs):
+    """Ejecuta las funciones alternadas (cambiando el orden en cada ronda) y devuelve el mejor tiempo de cada una."""
+    best = [float('inf')] * len(runs)
+    for round_number in range(rounds):
+        order = range(len(runs)) if round_number % 2 == 0 else reversed(range(len(runs)))
+        for i in order:
+            best[i] = min(best[i], runs[i]())
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=20000)
+    parser.add_argument('--calls', type=int, default=200000)
+    parser.add_argument('--rounds', type=int, default=5, help="rondas alternadas; se informa la mejor de cada variante")
+    args = parser.parse_args()
+
+    plain_client = make_app(False).test_client()
+    instrumented_client = make_app(True).test_client()
+    warm_up(plain_client)
+    warm_up(instrumented_client)
+    plain, instrumented = best_of(
+        args.rounds,
+        lambda: bench_requests(plain_client, args.requests),
+        lambda: bench_requests(instrumented_client, args.requests),
+    )
+    print(f"mejor de {args.rounds} rondas alternadas")
+    per_request = (instrumented - plain) / args.requests * 1e6
+    print(f"peticiones sin métricas:  {args.requests / plain:>10,.0f} req/s")
+    print(f"peticiones con métricas:  {args.requests / instrumented:>10,.0f} req/s")
+    print(f"coste por petición:       {per_request:>10.1f} µs ({(instrumented / plain - 1) * 100:+.1f}%)")
+
+    def query(sql):
+        return []
+
+    wrapped_query = metrics.timed_db('fetch')(query)
+    bare, wrapped = best_of(
+        args.rounds,
+        lambda: bench_calls(query, args.calls),
+        lambda: bench_calls(wrapped_query, args.calls),
+    )
+    print(f"coste por consulta (timed_db): {(wrapped - bare) / args.calls * 1e6:.2f} µs")
+
+
+if __name__ == '__main__':
+    main()
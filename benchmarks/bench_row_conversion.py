@@ -0,0 +1,98 @@
+"""Micro-benchmark de la conversión de filas de fetch_data sobre una tabla ancha sintética.
+
+Compara el bucle anterior (una rama y str() por celda) con el conversor precompilado
+por forma de resultado de converters.py. No necesita base de datos.
+
+Uso: python benchmarks/bench_row_conversion.py [--rows 50000] [--repeat 5]
+"""
+import argparse
+import base64
+import datetime
+import decimal
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from converters import get_row_converter  # noqa: E402
+
+
+def legacy_format_row(columns, row):
+    """Conversión anterior de fetch_data, copiada aquí como referencia."""
+    formatted_row = []
+    for i, item in enumerate(row):
+        if columns[i] == 'Signature' and isinstance(item, (bytes, memoryview)):
+            formatted_row.append(base64.b64encode(item).decode('utf-8'))
+        elif isinstance(item, (bytes, memoryview)):
+            formatted_row.append(item.hex())
+        else:
+            formatted_row.append(str(item))
+    return dict(zip(columns, formatted_row))
+
+
+def synthetic_table(rows):
+    """Devuelve (description, filas) de una tabla con 40 columnas de tipos variados."""
+    description = [('Number', int, None, 10, 10, 0, False)]
+    for i in range(12):
+        description.append((f'Text{i}', str, None, 100, 100, 0, True))
+    for i in range(8):
+        description.append((f'Int{i}', int, None, 10, 10, 0, True))
+    for i in range(6):
+        description.append((f'Float{i}', float, None, 53, 53, 0, True))
+    for i in range(4):
+        description.append((f'Amount{i}', decimal.Decimal, None, 12, 12, 2, True))
+    for i in range(6):
+        description.append((f'Date{i}', datetime.datetime, None, 23, 23, 3, True))
+    description.append(('Flag', bool, None, 1, 1, 0, True))
+    description.append(('Blob', bytearray, None, 16, 16, 0, True))
+    description.append(('Signature', bytearray, None, 0, 0, 0, True))
+
+    now = datetime.datetime(2026, 1, 1, 12, 30)
+    data = []
+    for n in range(rows):
+        row = [n]
+        row += [f'texto {n} {i}' for i in range(12)]
+        row += [n * i for i in range(8)]
+        row += [n / (i + 1) for i in range(6)]
+        row += [decimal.Decimal(n) / 100 for _ in range(4)]
+        row += [now + datetime.timedelta(minutes=n + i) for i in range(6)]
+        row += [n % 2 == 0, bytes(range(16)), bytes(256)]
+        data.append(tuple(row))
+    return description, data
+
+
+def measure(label, convert_all, rows, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        convert_all()
+        best = min(best, time.perf_counter() - start)
+    rate = rows / best
+    print(f"{label:<28} {rate:>12,.0f} filas/s  ({best * 1000:.1f} ms)")
+    return rate
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=50000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    description, data = synthetic_table(args.rows)
+    columns = [column[0] for column in description]
+    print(f"{args.rows} filas x {len(columns)} columnas, mejor de {args.repeat} repeticiones")
+
+    before = measure("antes (rama por celda)", lambda: [legacy_format_row(columns, row) for row in data],
+                     args.rows, args.repeat)
+
+    def planned():
+        convert = get_row_converter(description)
+        return [convert(row) for row in data]
+
+    after = measure("después (plan precompilado)", planned, args.rows, args.repeat)
+    print(f"aceleración: x{after / before:.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,380 @@
+"""Prueba de carga reproducible del backend contra una base de datos local.
+
+Siembra una base sqlite con tablas *_Ticket, Alertas e Items sintéticas (ver standin_db.py),
+levanta la aplicación en un servidor WSGI con hilos, sirve un JWKS local para los tokens y
+recorre todas las rutas de app.py y routes.py con clientes concurrentes. Para cada ruta
+informa rendimiento, latencias p50/p95/p99, códigos de estado y memoria asignada por petición;
+al final, el pico de RSS del proceso. Los resultados se guardan en JSON para comparar commits.
+
+Uso:
+    python benchmarks/load_test.py [--tickets 10000] [--concurrency 8] [--requests 400]
+                                   [--output benchmarks/results] [--compare anterior.json]
+"""
+import argparse
+import datetime
+import http.client
+import itertools
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from urllib.parse import quote
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, REPO_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+
+def percentile(values, fraction):
+    if not values:
+        return None
+    values = sorted(values)
+    index = min(len(values) - 1, max(0, int(round(fraction * (len(values) - 1)))))
+    return values[index]
+
+
+class JWKSStub:
+    """Servidor HTTP local que publica un JWKS con una clave RSA generada al vuelo."""
+
+    def __init__(self):
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        import jwt
+        from cryptography.hazmat.primitives.asymmetric import rsa
+
+        self._jwt = jwt
+        self._rsa = rsa
+        self.fetches = 0
+        self.rotate('bench')
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                stub.fetches += 1
+                body = stub.body
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self.server.server_port}/keys"
+
+    def rotate(self, kid):
+        """Publica una clave nueva con `kid` en lugar de la anterior (rotación de claves)."""
+        key = self._rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        jwk = json.loads(self._jwt.algorithms.RSAAlgorithm.to_jwk(key.public_key()))
+        jwk.update({"kid": kid, "use": "sig"})
+        self.key, self.kid = key, kid
+        self.body = json.dumps({"keys": [jwk]}).encode('utf-8')
+
+    def token(self, audience, issuer, expires_in=3600):
+        claims = {"aud": audience, "iss": issuer, "name": "Benchmark", "exp": int(time.time()) + expires_in}
+        return self._jwt.encode(claims, self.key, algorithm='RS256', headers={"kid": self.kid})
+
+
+def build_scenarios(args, changes_since=None, alert_event_id=None):
+    """Devuelve {nombre: función que devuelve (método, ruta, cuerpo JSON o None, requiere token)}.
+
+    `changes_since` es la marca de agua de /changes anterior a los cambios que siembra standin_db y
+    `alert_event_id`, el Last-Event-ID con el que reanuda el stream de alertas. Los escenarios del
+    stream añaden un quinto elemento: cuántos eventos lee cada cliente antes de desconectarse.
+    """
+    ticket_numbers = itertools.cycle(range(1, args.tickets + 1, max(1, args.tickets // 997)))
+    item_ids = itertools.cycle(range(1, args.items + 1))
+    delete_ids = itertools.count(1)
+    batch = [{"name": f"Lote {i}", "description": "carga"} for i in range(args.batch_size)]
+
+    scenarios = {
+        "GET /": lambda: ('GET', '/', None, False),
+        "GET /api/data": lambda: ('GET', '/api/data', None, True),
+        "GET /api/alerts": lambda: ('GET', '/api/alerts', None, True),
+        "GET /api/alerts/stream": lambda: ('GET', '/api/alerts/stream', None, True, args.stream_events),
+        "GET /api/metrics": lambda: ('GET', '/api/metrics', None, False),
+        "GET /api/tickets": lambda: ('GET', '/api/tickets?limit=100', None, False),
+        "GET /api/tickets/summary": lambda: ('GET', '/api/tickets/summary', None, False),
+    }
+    if alert_event_id:
+        scenarios["GET /api/alerts/stream?lastEventId="] = (
+            lambda: ('GET', f'/api/alerts/stream?lastEventId={quote(alert_event_id)}', None, True, args.stream_events))
+    for island in ('antigua', 'dominica', 'maartin', 'thomas'):
+        scenarios[f"GET /api/{island}_tickets"] = (lambda i=island: ('GET', f'/api/{i}_tickets', None, False))
+        scenarios[f"GET /api/{island}_tickets?limit=100"] = (
+            lambda i=island: ('GET', f'/api/{i}_tickets?limit=100&fields=Number,Status,CreatedDate', None, False))
+        scenarios[f"GET /api/{island}_tickets/<n>"] = (
+            lambda i=island: ('GET', f'/api/{i}_tickets/{next(ticket_numbers)}', None, False))
+        scenarios[f"GET /api/{island}_tickets/<n>/signature"] = (
+            lambda i=island: ('GET', f'/api/{i}_tickets/{next(ticket_numbers)}/signature', None, False))
+        scenarios[f"GET /api/{island}_tickets/changes"] = (
+            lambda i=island: ('GET', f'/api/{i}_tickets/changes?limit=500', None, False))
+        if changes_since:
+            scenarios[f"GET /api/{island}_tickets/changes?since="] = (
+                lambda i=island: ('GET', f'/api/{i}_tickets/changes?since={changes_since}', None, False))
+    scenarios.update({
+        "GET /api/items": lambda: ('GET', '/api/items', None, False),
+        "GET /api/items/<id>": lambda: ('GET', f'/api/items/{next(item_ids)}', None, False),
+        "POST /api/items": lambda: ('POST', '/api/items', {"name": "Nuevo", "description": "carga"}, False),
+        "PUT /api/items/<id>": lambda: ('PUT', f'/api/items/{next(item_ids)}', {"description": "actualizado"}, False),
+        "POST /api/items/batch": lambda: ('POST', '/api/items/batch', batch, False),
+        "PATCH /api/items/batch": lambda: ('PATCH', '/api/items/batch',
+                                           [{"id": next(item_ids), "name": "Parche"} for _ in range(args.batch_size)], False),
+        "DELETE /api/items/<id>": lambda: ('DELETE', f'/api/items/{next(delete_ids)}', None, False),
+        "DELETE /api/items/batch": lambda: ('DELETE', '/api/items/batch',
+                                            [next(delete_ids) for _ in range(args.batch_size)], False),
+    })
+    return scenarios
+
+
+def check_coverage(app, scenarios):
+    """Avisa de las rutas de la aplicación que ningún escenario recorre."""
+    adapter = app.url_map.bind('localhost')
+    covered = set()
+    for make_request in scenarios.values():
+        method, path = make_request()[:2]
+        endpoint, _ = adapter.match(path.split('?')[0], method=method)
+        covered.add((method, endpoint))
+    missing = []
+    for rule in app.url_map.iter_rules():
+        if rule.endpoint == 'static':
+            continue
+        for method in rule.methods - {'HEAD', 'OPTIONS'}:
+            if (method, rule.endpoint) not in covered:
+                missing.append(f"{method} {rule.rule}")
+    if missing:
+        print("Aviso: rutas sin escenario de carga: " + ", ".join(sorted(missing)))
+    return missing
+
+
+def read_events(chunks, count):
+    """Lee de un stream SSE (iterable de trozos en bytes) hasta recibir `count` eventos completos."""
+    received = 0
+    in_event = False
+    for chunk in chunks:
+        for line in chunk.splitlines():
+            if line.startswith(b'event:'):
+                in_event = True
+            elif not line and in_event:
+                in_event = False
+                received += 1
+                if received >= count:
+                    return received
+    return received
+
+
+def run_scenario(port, make_request, token, concurrency, requests):
+    """Lanza `requests` peticiones repartidas entre `concurrency` clientes con conexión persistente."""
+    latencies = []
+    statuses = {}
+    errors = []
+    lock = threading.Lock()
+    counter = itertools.count()
+
+    def client():
+        conn = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+        local_latencies = []
+        local_statuses = {}
+        while next(counter) < requests:
+            with lock:
+                method, path, body, auth, *stream = make_request()
+            headers = {"Authorization": f"Bearer {token}"} if auth else {}
+            data = None
+            if body is not None:
+                data = json.dumps(body).encode('utf-8')
+                headers['Content-Type'] = 'application/json'
+            start = time.perf_counter()
+            try:
+                conn.request(method, path, body=data, headers=headers)
+                response = conn.getresponse()
+                if stream:
+                    # Stream SSE: se leen los eventos pedidos y se desconecta, como un cliente que cierra la pestaña
+                    read_events(iter(response.readline, b''), stream[0])
+                    conn.close()
+                    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+                else:
+                    response.read()
+            except Exception as e:
+                errors.append(str(e))
+                conn.close()
+                conn = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+                continue
+            local_latencies.append(time.perf_counter() - start)
+            local_statuses[response.status] = local_statuses.get(response.status, 0) + 1
+        conn.close()
+        with lock:
+            latencies.extend(local_latencies)
+            for status, count in local_statuses.items():
+                statuses[status] = statuses.get(status, 0) + count
+
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    return {
+        "requests": len(latencies),
+        "errors": len(errors),
+        "statuses": {str(status): count for status, count in sorted(statuses.items())},
+        "throughput_rps": round(len(latencies) / elapsed, 1) if elapsed else None,
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 3) if latencies else None,
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 3) if latencies else None,
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 3) if latencies else None,
+    }
+
+
+def measure_allocations(app, make_request, token, samples):
+    """Mediana de la memoria asignada (pico de tracemalloc, en KiB) por petición, con el cliente de pruebas de Flask."""
+    client = app.test_client()
+
+    def request():
+        method, path, body, auth, *stream = make_request()
+        response = client.open(path, method=method, json=body,
+                               headers={"Authorization": f"Bearer {token}"} if auth else {})
+        if stream:
+            read_events(response.iter_encoded(), stream[0])
+            response.close() # Cierra el generador y da de baja al cliente del stream
+        else:
+            response.get_data()
+
+    request() # Calentamiento
+    peaks = []
+    tracemalloc.start()
+    try:
+        for _ in range(samples):
+            tracemalloc.reset_peak()
+            baseline = tracemalloc.get_traced_memory()[0]
+            request()
+            peaks.append(tracemalloc.get_traced_memory()[1] - baseline)
+    finally:
+        tracemalloc.stop()
+    return round(percentile(peaks, 0.5) / 1024, 1) if peaks else None
+
+
+def peak_rss_mib():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux informa KiB y macOS bytes
+    return round(peak / 1024 / (1024 if sys.platform == 'darwin' else 1), 1)
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_DIR, text=True).strip()
+    except Exception:
+        return 'desconocido'
+
+
+def compare(results, previous_path):
+    with open(previous_path, encoding='utf-8') as f:
+        previous = json.load(f)
+    print(f"\nComparación con {previous_path} (commit {previous.get('commit')}):")
+    for name, current in results["scenarios"].items():
+        before = previous.get("scenarios", {}).get(name)
+        if not before or not before.get("p95_ms") or not current.get("p95_ms"):
+            continue
+        change = (current["p95_ms"] / before["p95_ms"] - 1) * 100
+        print(f"  {name:<45} p95 {before['p95_ms']:>9.2f} -> {current['p95_ms']:>9.2f} ms ({change:+.0f}%)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--tickets', type=int, default=10000, help="filas por tabla *_Ticket")
+    parser.add_argument('--alerts', type=int, default=500)
+    parser.add_argument('--items', type=int, default=1000)
+    parser.add_argument('--signature-bytes', type=int, default=4096)
+    parser.add_argument('--batch-size', type=int, default=100, help="filas por petición en /api/items/batch")
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=400, help="peticiones por ruta")
+    parser.add_argument('--stream-events', type=int, default=5,
+                        help="eventos que lee cada cliente de /api/alerts/stream antes de desconectarse")
+    parser.add_argument('--alloc-samples', type=int, default=20, help="peticiones por ruta para medir memoria asignada")
+    parser.add_argument('--only', help="sólo los escenarios que contengan este texto")
+    parser.add_argument('--output', default=os.path.join(BENCH_DIR, 'results'))
+    parser.add_argument('--compare', help="JSON de una ejecución anterior")
+    args = parser.parse_args()
+
+    args.output = os.path.abspath(args.output)
+    if args.compare:
+        args.compare = os.path.abspath(args.compare)
+
+    # La aplicación escribe logs en ./logs: se ejecuta en un directorio temporal
+    workdir = tempfile.mkdtemp(prefix='argos-bench-')
+    os.chdir(workdir)
+    os.environ.setdefault('LOG_LEVEL', 'WARNING')
+    os.environ['FLASK_DEBUG'] = 'False'
+
+    from standin_db import StandInDatabase
+    database = StandInDatabase(os.path.join(workdir, 'bench.sqlite'))
+    print(f"Sembrando {args.tickets} tickets por isla en {database.path}...")
+    database.seed(tickets=args.tickets, alerts=args.alerts, items=args.items, signature_bytes=args.signature_bytes)
+
+    jwks = JWKSStub()
+    os.environ['JWKS_URL'] = jwks.url
+
+    import logging
+    from app import create_app, warm_up
+    from werkzeug.serving import make_server
+    logging.getLogger('werkzeug').setLevel(logging.WARNING) # Sin una línea de acceso por petición
+    app = create_app('production')
+    app.config['DB_CONNECT_FUNCTION'] = database.connect
+    app.config['JWKS_URL'] = jwks.url
+    # Los clientes del stream se desconectan tras leer sus eventos: un keepalive frecuente libera antes su hilo
+    app.config['ALERTS_STREAM_HEARTBEAT'] = 1.0
+    warm_up_ms = warm_up(app)
+    token = jwks.token(app.config['TOKEN_AUDIENCE'], app.config['TOKEN_ISSUER'])
+
+    scenarios = build_scenarios(args, database.changes_since, database.alert_event_id(max(1, args.alerts - 50)))
+    missing = check_coverage(app, scenarios)
+    if args.only:
+        scenarios = {name: make for name, make in scenarios.items() if args.only in name}
+
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    results = {
+        "commit": git_commit(),
+        "timestamp": datetime.datetime.now().isoformat(timespec='seconds'),
+        "python": platform.python_version(),
+        "parameters": {key: value for key, value in vars(args).items() if key not in ('output', 'compare')},
+        "routes_without_scenario": missing,
+        "warm_up_ms": warm_up_ms,
+        "scenarios": {},
+    }
+    print(f"{'escenario':<45} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'KiB/req':>9}  estados")
+    for name, make_request in scenarios.items():
+        run_scenario(server.port, make_request, token, 1, min(10, args.requests))  # Calentamiento
+        result = run_scenario(server.port, make_request, token, args.concurrency, args.requests)
+        result["alloc_kib_per_request"] = measure_allocations(app, make_request, token, args.alloc_samples)
+        results["scenarios"][name] = result
+        print(f"{name:<45} {result['throughput_rps'] or 0:>9.1f} {result['p50_ms'] or 0:>9.2f} "
+              f"{result['p95_ms'] or 0:>9.2f} {result['p99_ms'] or 0:>9.2f} "
+              f"{result['alloc_kib_per_request'] or 0:>9.1f}  {result['statuses']}")
+    server.shutdown()
+
+    results["peak_rss_mib"] = peak_rss_mib()
+    print(f"\nPico de RSS: {results['peak_rss_mib']} MiB")
+
+    os.makedirs(args.output, exist_ok=True)
+    output = os.path.join(args.output, f"{results['commit']}-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2, ensure_ascii=False)
+    print(f"Resultados guardados en {output}")
+
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,229 @@
+"""Base de datos local que sustituye a Azure SQL en los benchmarks.
+
+Envuelve sqlite3 con la misma interfaz que usa database.py (cursor, execute, executemany,
+fetchmany, commit, rollback, autocommit) y traduce las pocas construcciones de T-SQL que
+usa la aplicación. Se activa con DB_CONNECT_FUNCTION = StandInDatabase(ruta).connect.
+
+Las tablas de tickets llevan además el seguimiento de cambios de sql/delta_sync.sql: una
+columna RowVer que emula rowversion (contador global de 8 bytes big-endian, asignado por
+triggers en cada INSERT y UPDATE) y la tabla TicketTombstone que llenan los DELETE.
+"""
+import datetime
+import os
+import random
+import re
+import sqlite3
+
+TICKET_TABLES = ('antigua_Ticket', 'dominica_Ticket', 'maartin_Ticket', 'Thomas_Ticket')
+
+# Traducciones de T-SQL a sqlite: (patrón, reemplazo)
+_TRANSLATIONS = [
+    (re.compile(r'\bOFFSET 0 ROWS FETCH NEXT \? ROWS ONLY', re.IGNORECASE), 'LIMIT ?'),
+    (re.compile(r'^\s*SELECT TOP (\d+) (.*)$', re.IGNORECASE | re.DOTALL), r'SELECT \2 LIMIT \1'),
+    (re.compile(r'\bDATALENGTH\(', re.IGNORECASE), 'length('),
+    (re.compile(r'\bSUBSTRING\(', re.IGNORECASE), 'substr('),
+    (re.compile(r'\bCAST\(([^()]+) AS date\)', re.IGNORECASE), r'date(\1)'),
+    (re.compile(r'\bMIN_ACTIVE_ROWVERSION\(\)', re.IGNORECASE), 'ROWVERSION((SELECT Value + 1 FROM RowVersionCounter))'),
+]
+
+# Columnas de los tickets que, al modificarse, cambian la versión de la fila
+_TICKET_DATA_COLUMNS = 'Status, CreatedDate, Customer, Description, Amount, Signature'
+
+
+def rowversion(value):
+    """Valor del contador en el formato de rowversion (8 bytes big-endian, comparables como binario)."""
+    return None if value is None else int(value).to_bytes(8, 'big')
+
+
+def _register_functions(conn):
+    conn.create_function('ROWVERSION', 1, rowversion, deterministic=True)
+
+_translated = {}
+
+
+def translate(query):
+    """Traduce una consulta T-SQL de la aplicación al dialecto de sqlite (con caché)."""
+    result = _translated.get(query)
+    if result is None:
+        result = query
+        for pattern, replacement in _TRANSLATIONS:
+            result = pattern.sub(replacement, result)
+        _translated[query] = result
+    return result
+
+
+class StandInCursor:
+    def __init__(self, connection, cursor):
+        self._connection = connection
+        self._cursor = cursor
+
+    def execute(self, query, params=()):
+        self._connection._begin_if_needed()
+        self._cursor.execute(translate(query), params)
+        return self
+
+    def executemany(self, query, seq_of_params):
+        self._connection._begin_if_needed()
+        self._cursor.executemany(translate(query), seq_of_params)
+        return self
+
+    @property
+    def description(self):
+        return self._cursor.description
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    def fetchone(self):
+        return self._cursor.fetchone()
+
+    def fetchmany(self, size):
+        return self._cursor.fetchmany(size)
+
+    def fetchall(self):
+        return self._cursor.fetchall()
+
+    def close(self):
+        self._cursor.close()
+
+
+class StandInConnection:
+    """Conexión con la semántica de pyodbc: sin autocommit, la primera sentencia abre la transacción."""
+
+    def __init__(self, path):
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30,
+                                     isolation_level=None)  # Las transacciones se abren explícitamente
+        _register_functions(self._conn)
+        self.autocommit = True
+
+    def _begin_if_needed(self):
+        if not self.autocommit and not self._conn.in_transaction:
+            # IMMEDIATE toma el bloqueo de escritura al empezar y evita interbloqueos entre lectores que escriben
+            self._conn.execute('BEGIN IMMEDIATE')
+
+    def cursor(self):
+        return StandInCursor(self, self._conn.cursor())
+
+    def commit(self):
+        if self._conn.in_transaction:
+            self._conn.execute('COMMIT')
+
+    def rollback(self):
+        if self._conn.in_transaction:
+            self._conn.execute('ROLLBACK')
+
+    def close(self):
+        self._conn.close()
+
+
+class StandInDatabase:
+    """Archivo sqlite con las tablas de la aplicación."""
+
+    def __init__(self, path):
+        self.path = path
+        self.changes_since = None # Versión (hex) anterior a los cambios sembrados; ver seed()
+
+    def connect(self):
+        return StandInConnection(self.path)
+
+    def alert_event_id(self, alert_id):
+        """Id SSE (FechaHora|ID) de una alerta sembrada, para reanudar el stream con Last-Event-ID."""
+        conn = sqlite3.connect(self.path)
+        try:
+            fecha, = conn.execute("SELECT FechaHora FROM Alertas WHERE ID = ?", (alert_id,)).fetchone()
+        finally:
+            conn.close()
+        return f"{fecha}|{alert_id}"
+
+    def seed(self, tickets=10000, alerts=500, items=1000, signature_bytes=4096, seed=42):
+        """Crea las tablas *_Ticket, Alertas e Items con datos sintéticos (borra el archivo anterior).
+
+        Tras la carga inicial modifica uno de cada 20 tickets e inserta y elimina otros tantos
+        (1 %), de modo que /changes?since=<changes_since> devuelva filas y lápidas. Los tickets
+        1..`tickets` siguen existiendo, así que el resto de rutas ve los mismos datos.
+        """
+        if os.path.exists(self.path):
+            os.remove(self.path)
+        rng = random.Random(seed)
+        conn = sqlite3.connect(self.path)
+        _register_functions(conn)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute("CREATE TABLE RowVersionCounter (Value INTEGER NOT NULL)")
+        conn.execute("INSERT INTO RowVersionCounter VALUES (0)")
+        conn.execute(
+            "CREATE TABLE TicketTombstone (TableName TEXT NOT NULL, Number INTEGER NOT NULL, RowVer BLOB NOT NULL, "
+            "DeletedAt TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP, PRIMARY KEY (TableName, RowVer))"
+        )
+        start = datetime.datetime(2025, 1, 1)
+        statuses = ('Open', 'In Progress', 'Closed', 'Cancelled')
+        # Firma con cabecera PNG para que el tipo de contenido se detecte como en producción
+        signature = b'\x89PNG\r\n\x1a\n' + bytes(rng.getrandbits(8) for _ in range(max(0, signature_bytes - 8)))
+        for table in TICKET_TABLES:
+            conn.execute(
+                f"CREATE TABLE {table} (Number INTEGER PRIMARY KEY, Status TEXT, CreatedDate TEXT, "
+                "Customer TEXT, Description TEXT, Amount REAL, Signature BLOB, RowVer BLOB)"
+            )
+            conn.execute(f"CREATE INDEX ix_{table}_CreatedDate ON {table} (CreatedDate)")
+            conn.execute(f"CREATE INDEX ix_{table}_RowVer ON {table} (RowVer, Number)")
+            self._create_change_triggers(conn, table)
+            conn.executemany(
+                f"INSERT INTO {table} (Number, {_TICKET_DATA_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    (number, rng.choice(statuses),
+                     (start + datetime.timedelta(minutes=37 * number)).isoformat(sep=' '),
+                     f"Cliente {rng.randint(1, 500)}", f"Ticket sintético {number} de {table}",
+                     round(rng.uniform(1, 500), 2), signature)
+                    for number in range(1, tickets + 1)
+                ),
+            )
+        conn.execute(
+            "CREATE TABLE Alertas (ID INTEGER PRIMARY KEY, NombreMetrica TEXT, ValorActual REAL, Unidad TEXT, "
+            "FechaHora TEXT, UmbralNormal REAL, UmbralAdvertencia REAL)"
+        )
+        conn.executemany(
+            "INSERT INTO Alertas VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (
+                (i, rng.choice(('CPU', 'Memoria', 'Disco', 'Red')), round(rng.uniform(0, 100), 1), '%',
+                 (start + datetime.timedelta(minutes=i)).isoformat(sep=' '), 70, 90)
+                for i in range(1, alerts + 1)
+            ),
+        )
+        conn.execute("CREATE TABLE Items (Id INTEGER PRIMARY KEY AUTOINCREMENT, Name TEXT, Description TEXT)")
+        conn.executemany(
+            "INSERT INTO Items (Name, Description) VALUES (?, ?)",
+            ((f"Ítem {i}", f"Descripción del ítem {i}") for i in range(1, items + 1)),
+        )
+        conn.commit()
+
+        self.changes_since = rowversion(conn.execute("SELECT Value FROM RowVersionCounter").fetchone()[0] + 1).hex()
+        churn = max(1, tickets // 100)
+        for table in TICKET_TABLES:
+            conn.execute(f"UPDATE {table} SET Description = Description || ' (editado)' WHERE Number % 20 = 0")
+            extra = range(tickets + 1, tickets + churn + 1)
+            conn.executemany(
+                f"INSERT INTO {table} (Number, Status, CreatedDate, Customer, Description, Amount) "
+                "VALUES (?, 'Open', ?, 'Temporal', 'Ticket eliminado en la siembra', 0)",
+                ((number, start.isoformat(sep=' ')) for number in extra),
+            )
+            conn.execute(f"DELETE FROM {table} WHERE Number > ?", (tickets,))
+        conn.commit()
+        conn.close()
+
+    @staticmethod
+    def _create_change_triggers(conn, table):
+        """Triggers que emulan rowversion en `table` y registran sus borrados en TicketTombstone."""
+        bump = "UPDATE RowVersionCounter SET Value = Value + 1;"
+        current = "ROWVERSION((SELECT Value FROM RowVersionCounter))"
+        conn.execute(
+            f"CREATE TRIGGER tr_{table}_insert AFTER INSERT ON {table} BEGIN {bump} "
+            f"UPDATE {table} SET RowVer = {current} WHERE Number = NEW.Number; END"
+        )
+        conn.execute(
+            f"CREATE TRIGGER tr_{table}_update AFTER UPDATE OF {_TICKET_DATA_COLUMNS} ON {table} BEGIN {bump} "
+            f"UPDATE {table} SET RowVer = {current} WHERE Number = NEW.Number; END"
+        )
+        conn.execute(
+            f"CREATE TRIGGER tr_{table}_delete AFTER DELETE ON {table} BEGIN {bump} "
+            f"INSERT INTO TicketTombstone (TableName, Number, RowVer) VALUES ('{table}', OLD.Number, {current}); END"
+        )
@@ -0,0 +1,298 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import current_app, request
+
+from database import register_write_hook
+from response_compression import available_encodings, compress, is_compressible, negotiate, record_saved
+
+# Obtener el logger de la aplicación Flask
+logger = logging.getLogger(__name__)
+
+
+class CachedResponse:
+    """Respuesta guardada en caché: cuerpo, tipo de contenido, ETag fuerte y variantes ya comprimidas."""
+    __slots__ = ('body', 'mimetype', 'etag', 'variants')
+
+    def __init__(self, body, mimetype, etag=None, variants=None):
+        self.body = body
+        self.mimetype = mimetype
+        self.etag = etag or hashlib.sha256(body).hexdigest()
+        self.variants = variants or {} # Codificación (gzip, br, zstd) -> cuerpo comprimido
+
+    @property
+    def size(self):
+        return len(self.body) + sum(len(data) for data in self.variants.values())
+
+    def dumps(self):
+        meta = {"mimetype": self.mimetype, "etag": self.etag,
+                "variants": {encoding: len(data) for encoding, data in self.variants.items()}}
+        return b''.join([json.dumps(meta).encode('utf-8'), b'\n', self.body, *self.variants.values()])
+
+    @classmethod
+    def loads(cls, data):
+        header, payload = data.split(b'\n', 1)
+        meta = json.loads(header)
+        variant_sizes = meta.get('variants', {})
+        end = len(payload) - sum(variant_sizes.values())
+        body = payload[:end]
+        variants = {}
+        for encoding, size in variant_sizes.items():
+            variants[encoding] = payload[end:end + size]
+            end += size
+        return cls(body, meta['mimetype'], meta['etag'], variants)
+
+
+class LocalCache:
+    """Caché en memoria del proceso con TTL por entrada y expulsión LRU por número de entradas y bytes."""
+
+    def __init__(self, max_entries=1024, max_bytes=64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._versions = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                return None
+            entry, expires_at = item
+            if expires_at <= time.monotonic():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key, entry, ttl):
+        size = entry.size
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (entry, time.monotonic() + ttl)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+
+    def _remove(self, key):
+        entry, _ = self._entries.pop(key)
+        self._bytes -= entry.size
+
+    def get_versions(self, tags):
+        return [self._versions.get(tag, 0) for tag in tags]
+
+    def bump_version(self, tag):
+        with self._lock:
+            self._versions[tag] = self._versions.get(tag, 0) + 1
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self._bytes}
+
+
+class RedisCache:
+    """Caché compartida entre procesos sobre Redis (requiere el paquete opcional 'redis')."""
+
+    def __init__(self, url, prefix='argos:cache:'):
+        import redis
+        self._client = redis.Redis.from_url(url)
+        self._prefix = prefix
+
+    def get(self, key):
+        data = self._client.get(self._prefix + key)
+        return CachedResponse.loads(data) if data is not None else None
+
+    def set(self, key, entry, ttl):
+        self._client.set(self._prefix + key, entry.dumps(), ex=max(1, int(ttl)))
+
+    def get_versions(self, tags):
+        if not tags:
+            return []
+        values = self._client.mget([f"{self._prefix}version:{tag}" for tag in tags])
+        return [int(value) if value is not None else 0 for value in values]
+
+    def bump_version(self, tag):
+        self._client.incr(f"{self._prefix}version:{tag}")
+
+    def stats(self):
+        return {"backend": "redis"}
+
+
+class ResponseCache:
+    """Caché de respuestas con invalidación por tabla.
+
+    Cada tabla tiene un número de versión que forma parte de la clave; una escritura sobre
+    la tabla incrementa la versión y las entradas anteriores dejan de usarse (y caducan por TTL).
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+
+    def key(self, route, tables, path):
+        versions = self.backend.get_versions(tables)
+        version_part = ','.join(f"{table}={version}" for table, version in zip(tables, versions))
+        return f"{route}|{version_part}|{path}"
+
+    def get(self, key):
+        entry = self.backend.get(key)
+        if entry is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return entry
+
+    def set(self, key, entry, ttl):
+        self.backend.set(key, entry, ttl)
+
+    def invalidate(self, table):
+        self.backend.bump_version(table)
+
+    def stats(self):
+        stats = {"hits": self.hits, "misses": self.misses, "not_modified": self.not_modified}
+        stats.update(self.backend.stats())
+        return stats
+
+
+# Caché del proceso (se crea en el primer uso con la configuración de la app)
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def _create_cache(config):
+    redis_url = config.get('CACHE_REDIS_URL')
+    if redis_url:
+        try:
+            backend = RedisCache(redis_url)
+            logger.info("Caché de respuestas compartida en Redis.")
+            return ResponseCache(backend)
+        except ImportError:
+            logger.warning("CACHE_REDIS_URL está configurada pero el paquete 'redis' no está instalado; se usa la caché local.")
+    return ResponseCache(LocalCache(config.get('CACHE_MAX_ENTRIES', 1024), config.get('CACHE_MAX_BYTES', 64 * 1024 * 1024)))
+
+
+def get_response_cache():
+    """Devuelve la caché de respuestas del proceso, creándola si aún no existe."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = _create_cache(current_app.config)
+    return _cache
+
+
+def _reset_after_fork():
+    """En el proceso hijo de un fork empieza con una caché propia (y un cliente de Redis propio)."""
+    global _cache, _cache_lock
+    _cache = None
+    _cache_lock = threading.Lock()
+
+
+if hasattr(os, 'register_at_fork'): # No existe en Windows
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def get_cache_stats():
+    return _cache.stats() if _cache is not None else None
+
+
+# Tabla afectada por una sentencia de escritura
+_WRITE_TABLE_RE = re.compile(r'^\s*(?:INSERT\s+INTO|UPDATE|DELETE\s+FROM|DELETE|MERGE\s+INTO|MERGE)\s+(?:\w+\.)?\[?(\w+)\]?', re.IGNORECASE)
+
+
+def invalidate_for_query(query):
+    """Hook de escritura: invalida las respuestas en caché que dependen de la tabla modificada."""
+    if _cache is None:
+        return
+    match = _WRITE_TABLE_RE.match(query)
+    if match:
+        _cache.invalidate(match.group(1))
+        logger.debug("Caché invalidada para la tabla %s.", match.group(1))
+
+
+register_write_hook(invalidate_for_query)
+
+
+def precompress(entry, config):
+    """Añade a la entrada sus variantes comprimidas (las que resulten más pequeñas que el original)."""
+    if is_compressible(entry.mimetype, len(entry.body), config):
+        for encoding in available_encodings(config):
+            compressed = compress(entry.body, encoding, config)
+            if len(compressed) < len(entry.body):
+                entry.variants[encoding] = compressed
+
+
+def send_cached(entry, config):
+    """Responde con la variante de la entrada que pide Accept-Encoding, con su ETag, o 304 si coincide."""
+    encoding = negotiate([encoding for encoding in available_encodings(config) if encoding in entry.variants])
+    if encoding is None:
+        response = current_app.response_class(entry.body, mimetype=entry.mimetype)
+        response.set_etag(entry.etag)
+    else:
+        response = current_app.response_class(entry.variants[encoding], mimetype=entry.mimetype)
+        response.set_etag(f"{entry.etag}-{encoding}") # Cada codificación es una representación distinta
+        response.headers['Content-Encoding'] = encoding
+    if is_compressible(entry.mimetype, len(entry.body), config):
+        response.vary.add('Accept-Encoding')
+    response.headers['Cache-Control'] = 'no-cache' # El cliente debe revalidar con If-None-Match
+    response.make_conditional(request)
+    if response.status_code != 304 and encoding is not None:
+        record_saved(encoding, len(entry.body), len(entry.variants[encoding]))
+    return response
+
+
+def cached_response(route, tables):
+    """Decorador que guarda en caché la respuesta de una ruta y responde 304 si el ETag coincide.
+
+    `route` selecciona el TTL en CACHE_TTLS y `tables` son las tablas cuyas escrituras
+    invalidan la respuesta. Sólo se guardan respuestas 200 no transmitidas por partes, junto
+    con sus versiones comprimidas, que se sirven según Accept-Encoding sin volver a comprimir.
+    """
+    tables = tuple(tables)
+
+    def decorator(f):
+        @wraps(f)
+        def wrapper(*args, **kwargs):
+            config = current_app.config
+            ttl = config.get('CACHE_TTLS', {}).get(route, config.get('CACHE_DEFAULT_TTL', 0))
+            if not config.get('CACHE_ENABLED', True) or ttl <= 0:
+                return f(*args, **kwargs)
+
+            cache = get_response_cache()
+            try:
+                key = cache.key(route, tables, request.full_path)
+                entry = cache.get(key)
+            except Exception as e:
+                logger.error("Error al leer la caché de respuestas: %s", e)
+                return f(*args, **kwargs)
+
+            if entry is None:
+                response = current_app.make_response(f(*args, **kwargs))
+                if response.status_code != 200 or response.is_streamed:
+                    return response
+                entry = CachedResponse(response.get_data(), response.mimetype)
+                precompress(entry, config)
+                try:
+                    cache.set(key, entry, ttl)
+                except Exception as e:
+                    logger.error("Error al escribir en la caché de respuestas: %s", e)
+
+            response = send_cached(entry, config)
+            if response.status_code == 304:
+                cache.not_modified += 1
+            return response
+        return wrapper
+    return decorator
@@ -6,15 +6,110 @@ load_dotenv()
 
 class Config:
     """Clase de configuración base."""
+    # Validación de tokens de Azure AD (aplicación registrada)
+    TENANT_ID = os.getenv("TENANT_ID")
+    CLIENT_ID = os.getenv("CLIENT_ID")
+    TOKEN_ISSUER = f"https://login.microsoftonline.com/{TENANT_ID}/v2.0"
+    TOKEN_AUDIENCE = CLIENT_ID
+
     # Configuración de la base de datos de Azure SQL
     SQLALCHEMY_DATABASE_URI = os.getenv('DATABASE_URI', 'DRIVER={ODBC Driver 17 for SQL Server};SERVER=your_server.database.windows.net;DATABASE=your_database;UID=your_username;PWD=your_password')
+
+    # Pool de conexiones a la base de datos
+    DB_POOL_MIN_SIZE = int(os.getenv('DB_POOL_MIN_SIZE', '1'))        # Conexiones que se abren al crear el pool
+    DB_POOL_MAX_SIZE = int(os.getenv('DB_POOL_MAX_SIZE', '10'))       # Máximo de conexiones abiertas por proceso
+    DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', '30'))       # Segundos de espera para obtener una conexión
+    DB_POOL_MAX_USES = int(os.getenv('DB_POOL_MAX_USES', '1000'))     # Recicla la conexión tras N usos (0 = sin límite)
+    DB_POOL_MAX_AGE = float(os.getenv('DB_POOL_MAX_AGE', '1800'))     # Recicla la conexión tras N segundos (0 = sin límite)
+    DB_POOL_PING_AFTER = float(os.getenv('DB_POOL_PING_AFTER', '5'))  # Verifica la conexión si estuvo inactiva más de N segundos
+    # Función sin argumentos que devuelve una conexión DB-API; None usa pyodbc.connect(SQLALCHEMY_DATABASE_URI)
+    DB_CONNECT_FUNCTION = None
+    # Filas leídas por cada fetchmany en las respuestas transmitidas por partes
+    DB_FETCH_BATCH_SIZE = int(os.getenv('DB_FETCH_BATCH_SIZE', '500'))
+    # Filas por cada executemany en las operaciones masivas y máximo de filas por petición
+    DB_EXECUTEMANY_CHUNK_SIZE = int(os.getenv('DB_EXECUTEMANY_CHUNK_SIZE', '1000'))
+    ITEMS_BATCH_MAX_ROWS = int(os.getenv('ITEMS_BATCH_MAX_ROWS', '50000'))
+
+    # Control de admisión: consultas simultáneas, cola por prioridad y rechazo rápido con 503 (ver admission.py)
+    DB_ADMISSION_ENABLED = os.getenv('DB_ADMISSION_ENABLED', 'True').lower() in ('true', '1', 't')
+    DB_MAX_CONCURRENT = int(os.getenv('DB_MAX_CONCURRENT', '8'))                      # Consultas a la vez por proceso (≤ DB_POOL_MAX_SIZE)
+    DB_ADMISSION_RESERVED = int(os.getenv('DB_ADMISSION_RESERVED', '2'))              # Plazas sólo para prioridad 'high' (alertas)
+    DB_ADMISSION_LOW_MAX = int(os.getenv('DB_ADMISSION_LOW_MAX', '3'))                # Plazas como mucho para prioridad 'low' (listados masivos)
+    DB_ADMISSION_MAX_QUEUE = int(os.getenv('DB_ADMISSION_MAX_QUEUE', '32'))           # Consultas en espera antes de rechazar al momento
+    DB_ADMISSION_QUEUE_TIMEOUT = float(os.getenv('DB_ADMISSION_QUEUE_TIMEOUT', '2'))  # Segundos máximos de espera en la cola
+    DB_ADMISSION_RETRY_AFTER = int(os.getenv('DB_ADMISSION_RETRY_AFTER', '1'))        # Segundos en la cabecera Retry-After
+    DB_QUERY_TIMEOUT = int(os.getenv('DB_QUERY_TIMEOUT', '30'))                       # Segundos máximos por sentencia (0 = sin límite)
+    DB_CIRCUIT_FAILURES = int(os.getenv('DB_CIRCUIT_FAILURES', '5'))                  # Errores seguidos que abren el circuito (0 = desactivado)
+    DB_CIRCUIT_RESET = float(os.getenv('DB_CIRCUIT_RESET', '30'))                     # Segundos con el circuito abierto antes de probar
+
+    # Consultas de tickets por isla (paginación y filtros)
+    TICKETS_MAX_PAGE_SIZE = int(os.getenv('TICKETS_MAX_PAGE_SIZE', '1000'))  # Máximo de filas por página (?limit=)
+    TICKET_DATE_COLUMN = os.getenv('TICKET_DATE_COLUMN', 'CreatedDate')      # Columna usada por ?from= y ?to=
+    TICKET_STATUS_COLUMN = os.getenv('TICKET_STATUS_COLUMN', 'Status')       # Columna usada por ?status=
+    CROSS_ISLAND_MAX_WORKERS = int(os.getenv('CROSS_ISLAND_MAX_WORKERS', '16')) # Hilos del proceso (compartidos) para consultar las islas en paralelo
+    CROSS_ISLAND_TIMEOUT = float(os.getenv('CROSS_ISLAND_TIMEOUT', '10'))       # Segundos por isla en /api/tickets (en cola y en consulta, cada uno)
+    # Blobs de los tickets: los listados devuelven <columna>_url en lugar del contenido
+    TICKET_BLOB_COLUMNS = [c.strip() for c in os.getenv('TICKET_BLOB_COLUMNS', 'Signature').split(',') if c.strip()]  # Además de las binarias que detecta el driver
+    TICKET_BLOB_CHUNK_SIZE = int(os.getenv('TICKET_BLOB_CHUNK_SIZE', '65536'))  # Bytes leídos por consulta al transmitir un blob
+    TICKET_BLOB_MAX_AGE = int(os.getenv('TICKET_BLOB_MAX_AGE', '300'))          # Segundos que el navegador puede reutilizar un blob
+    # Sincronización incremental (/api/<isla>_tickets/changes); ver sql/delta_sync.sql
+    TICKET_CHANGE_COLUMN = os.getenv('TICKET_CHANGE_COLUMN', 'RowVer')                # Columna de versión de cada fila
+    TICKET_CHANGE_TYPE = os.getenv('TICKET_CHANGE_TYPE', 'rowversion').lower()        # 'rowversion' o 'datetime' (fecha de modificación UTC)
+    TICKET_TOMBSTONE_TABLE = os.getenv('TICKET_TOMBSTONE_TABLE', 'TicketTombstone')   # Tabla con los tickets eliminados
+    TICKET_TOMBSTONE_COLUMN = os.getenv('TICKET_TOMBSTONE_COLUMN', 'RowVer')          # Versión del borrado ('DeletedAt' con 'datetime')
     
+    # Validación de tokens de Azure AD
+    JWKS_URL = os.getenv('JWKS_URL', f"https://login.microsoftonline.com/{os.getenv('TENANT_ID')}/discovery/v2.0/keys")
+    JWKS_REFRESH_INTERVAL = float(os.getenv('JWKS_REFRESH_INTERVAL', '3600'))        # Segundos entre refrescos en segundo plano
+    JWKS_MIN_REFETCH_INTERVAL = float(os.getenv('JWKS_MIN_REFETCH_INTERVAL', '60'))  # Mínimo entre descargas por 'kid' desconocido
+    TOKEN_CACHE_SIZE = int(os.getenv('TOKEN_CACHE_SIZE', '1024'))                    # Tokens validados en memoria (0 = sin caché)
+
+    # Caché de respuestas (alertas y consulta de tickets por número)
+    CACHE_ENABLED = os.getenv('CACHE_ENABLED', 'True').lower() in ('true', '1', 't')
+    CACHE_DEFAULT_TTL = float(os.getenv('CACHE_DEFAULT_TTL', '0'))                 # Segundos; 0 = no guardar
+    CACHE_TTLS = {                                                                  # TTL por ruta en segundos
+        'alerts': float(os.getenv('CACHE_TTL_ALERTS', '5')),
+        'ticket': float(os.getenv('CACHE_TTL_TICKET', '30')),
+    }
+    CACHE_MAX_ENTRIES = int(os.getenv('CACHE_MAX_ENTRIES', '1024'))                # Máximo de respuestas en memoria
+    CACHE_MAX_BYTES = int(os.getenv('CACHE_MAX_BYTES', str(64 * 1024 * 1024)))    # Máximo de bytes en memoria
+    CACHE_REDIS_URL = os.getenv('CACHE_REDIS_URL')                                  # Caché compartida opcional (requiere 'redis')
+
+    # Stream de alertas (/api/alerts/stream)
+    ALERTS_STREAM_POLL_INTERVAL = float(os.getenv('ALERTS_STREAM_POLL_INTERVAL', '5'))  # Segundos entre consultas de alertas nuevas
+    ALERTS_STREAM_HEARTBEAT = float(os.getenv('ALERTS_STREAM_HEARTBEAT', '15'))         # Segundos sin eventos antes de enviar un keepalive
+    ALERTS_STREAM_BUFFER_SIZE = int(os.getenv('ALERTS_STREAM_BUFFER_SIZE', '200'))      # Últimas alertas guardadas para reanudar con Last-Event-ID
+    ALERTS_STREAM_MAX_CLIENTS = int(os.getenv('ALERTS_STREAM_MAX_CLIENTS', '0'))        # Clientes conectados por proceso (0 = sin límite; cada uno ocupa un hilo)
+    ALERTS_STREAM_CLIENT_QUEUE = int(os.getenv('ALERTS_STREAM_CLIENT_QUEUE', '100'))    # Eventos pendientes por cliente antes de desconectarlo
+
+    # Resumen de tickets para los paneles (/api/tickets/summary)
+    TICKET_SUMMARY_INTERVAL = float(os.getenv('TICKET_SUMMARY_INTERVAL', '60'))    # Segundos entre recálculos en segundo plano
+    TICKET_SUMMARY_DAYS = int(os.getenv('TICKET_SUMMARY_DAYS', '90'))              # Días incluidos en el desglose diario (0 = todos)
+    TICKET_SUMMARY_IDLE_AFTER = float(os.getenv('TICKET_SUMMARY_IDLE_AFTER', '600'))  # Segundos sin lecturas antes de dejar de recalcular
+
+    # Compresión de respuestas según Accept-Encoding ('br' y 'zstd' requieren los paquetes brotli y zstandard)
+    COMPRESSION_ENABLED = os.getenv('COMPRESSION_ENABLED', 'True').lower() in ('true', '1', 't')
+    COMPRESSION_MIN_SIZE = int(os.getenv('COMPRESSION_MIN_SIZE', '1024'))                              # Bytes; respuestas menores se envían tal cual
+    COMPRESSION_ENCODINGS = [e.strip() for e in os.getenv('COMPRESSION_ENCODINGS', 'br,zstd,gzip').split(',')]  # Orden de preferencia
+    COMPRESSION_LEVELS = {
+        'gzip': int(os.getenv('COMPRESSION_LEVEL_GZIP', '6')),
+        'br': int(os.getenv('COMPRESSION_LEVEL_BR', '4')),
+        'zstd': int(os.getenv('COMPRESSION_LEVEL_ZSTD', '3')),
+    }
+
     # Clave secreta para la seguridad de la sesión de Flask
     SECRET_KEY = os.getenv('SECRET_KEY', 'una_cadena_secreta_muy_larga_y_aleatoria')
 
     # Configuración de Logging
     LOG_FILE = 'app.log'
     LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper() # Nivel de log: DEBUG, INFO, WARNING, ERROR, CRITICAL
+    LOG_FORMAT = os.getenv('LOG_FORMAT', 'text').lower() # 'text' o 'json' (una línea JSON por registro)
+    LOG_HANDLER = os.getenv('LOG_HANDLER', 'rotating').lower() # 'rotating', 'watched' (logrotate externo) o 'stdout' (ver logging_config.py)
+    LOG_QUEUE_SIZE = int(os.getenv('LOG_QUEUE_SIZE', '10000')) # Registros en cola antes de empezar a descartar
+
+    # Métricas
+    METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'True').lower() in ('true', '1', 't')
+    SLOW_QUERY_THRESHOLD_MS = float(os.getenv('SLOW_QUERY_THRESHOLD_MS', '0')) # Registra consultas más lentas que esto (0 = desactivado)
     
     # DEBUG para la aplicación Flask (controla el modo de depuración de Flask)
     DEBUG = os.getenv('FLASK_DEBUG', 'False').lower() in ('true', '1', 't')
@@ -27,4 +122,22 @@ class DevelopmentConfig(Config):
 class ProductionConfig(Config):
     """Configuración para entorno de producción."""
     DEBUG = False
-    # Podrías querer loggear a un servicio de log externo en producción
\ No newline at end of file
+    # Podrías querer loggear a un servicio de log externo en producción
+
+
+# Configuraciones por nombre, para create_app('production') o la variable de entorno APP_ENV
+CONFIGS = {
+    'development': DevelopmentConfig,
+    'production': ProductionConfig,
+}
+
+def get_config(config=None):
+    """Devuelve la clase de configuración indicada (clase o nombre); por defecto la de APP_ENV."""
+    if config is None:
+        config = os.getenv('APP_ENV', 'production')
+    if isinstance(config, str):
+        try:
+            return CONFIGS[config.lower()]
+        except KeyError:
+            raise ValueError(f"APP_ENV desconocido: '{config}' (use {', '.join(CONFIGS)}).")
+    return config
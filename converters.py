@@ -0,0 +1,106 @@
+import base64
+import datetime
+import decimal
+import uuid
+
+# Conversores de filas de la base de datos a diccionarios serializables a JSON.
+#
+# En lugar de inspeccionar cada celda, se construye una vez por forma de resultado
+# (nombres y tipos de cursor.description) una función que convierte la fila completa,
+# y se guarda en memoria para las siguientes consultas con la misma forma.
+
+# Decimales con más dígitos que esto se devuelven como texto para no perder precisión
+MAX_FLOAT_PRECISION = 15
+
+# Máximo de formas de resultado distintas que se guardan en memoria
+MAX_CACHED_CONVERTERS = 256
+
+_converters = {}
+
+
+def _iso(value):
+    return value.isoformat()
+
+
+def _b64(value):
+    return base64.b64encode(value).decode('ascii')
+
+
+def _hex(value):
+    return value.hex()
+
+
+def _decimal_as_float(value):
+    return float(value)
+
+
+def _decimal_as_str(value):
+    return str(value)
+
+
+def _str(value):
+    return str(value)
+
+
+def convert_value(value, column=None):
+    """Convierte un valor suelto cuando el tipo de la columna no se conoce de antemano."""
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return _b64(value) if column == 'Signature' else bytes(value).hex()
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, decimal.Decimal):
+        return str(value)
+    return str(value)
+
+
+def _column_converter(name, type_code, precision):
+    """Devuelve el conversor de una columna, o None si el valor ya es serializable tal cual."""
+    if type_code in (int, float, bool, str):
+        return None
+    if type_code in (datetime.datetime, datetime.date, datetime.time):
+        return _iso
+    if type_code is decimal.Decimal:
+        if precision is not None and precision <= MAX_FLOAT_PRECISION:
+            return _decimal_as_float
+        return _decimal_as_str
+    if type_code in (bytes, bytearray, memoryview):
+        # La firma se envía en Base64; otros binarios en hexadecimal
+        return _b64 if name == 'Signature' else _hex
+    if type_code is uuid.UUID:
+        return _str
+    # Tipo desconocido (p. ej. sqlite no informa tipos): conversión valor a valor
+    return lambda value, _name=name: convert_value(value, _name)
+
+
+def _compile(description):
+    """Genera una función que convierte una fila completa según el plan de columnas."""
+    namespace = {}
+    items = []
+    for i, column in enumerate(description):
+        name, type_code = column[0], column[1]
+        precision = column[4] if len(column) > 4 else None
+        converter = _column_converter(name, type_code, precision)
+        if converter is None:
+            items.append(f"{name!r}: row[{i}]")
+        else:
+            namespace[f"_c{i}"] = converter
+            items.append(f"{name!r}: (None if row[{i}] is None else _c{i}(row[{i}]))")
+    source = "def convert(row):\n    return {" + ", ".join(items) + "}\n"
+    exec(compile(source, "<row converter>", "exec"), namespace)
+    return namespace["convert"]
+
+
+def get_row_converter(description):
+    """Devuelve la función de conversión de filas para un cursor.description, usando la caché."""
+    key = tuple(
+        (column[0], column[1], column[4] if len(column) > 4 else None)
+        for column in description
+    )
+    converter = _converters.get(key)
+    if converter is None:
+        if len(_converters) >= MAX_CACHED_CONVERTERS:
+            _converters.clear()
+        converter = _converters[key] = _compile(description)
+    return converter
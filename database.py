@@ -1,29 +1,188 @@
+import os
 import pyodbc
-from flask import current_app # Para acceder a la configuración de la app
+from flask import current_app, g # Para acceder a la configuración de la app
 import logging
-import base64 # Importa base64 para el manejo de datos IMAGE
+import threading
+from contextlib import contextmanager
+from functools import partial
+from admission import AdmissionController, AdmissionRejected, CircuitBreaker, current_priority
+from db_pool import ConnectionPool
+from converters import get_row_converter # Conversión de filas según los tipos de cada columna
+from metrics import observe_admission, timed_acquire, timed_db
 
 # Obtener el logger de la aplicación Flask
 logger = logging.getLogger(__name__)
 
+# Pool de conexiones del proceso (se crea en el primer uso con la configuración de la app)
+_pool = None
+_pool_lock = threading.Lock()
+
+def _create_pool(config):
+    """Crea el pool de conexiones a partir de la configuración de Flask."""
+    connect = config.get('DB_CONNECT_FUNCTION')
+    if connect is None:
+        uri = config['SQLALCHEMY_DATABASE_URI']
+        connect = lambda: pyodbc.connect(uri)
+    pool = ConnectionPool(
+        connect,
+        min_size=config.get('DB_POOL_MIN_SIZE', 1),
+        max_size=config.get('DB_POOL_MAX_SIZE', 10),
+        timeout=config.get('DB_POOL_TIMEOUT', 30.0),
+        max_uses=config.get('DB_POOL_MAX_USES', 0),
+        max_age=config.get('DB_POOL_MAX_AGE', 0),
+        ping_after=config.get('DB_POOL_PING_AFTER', 5.0),
+    )
+    pool.fill()
+    logger.info("Pool de conexiones creado (min=%s, max=%s).", pool.min_size, pool.max_size)
+    return pool
+
+def get_pool():
+    """Devuelve el pool de conexiones del proceso, creándolo si aún no existe."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = _create_pool(current_app.config)
+    return _pool
+
+def close_pool():
+    """Cierra el pool de conexiones del proceso (el siguiente uso creará uno nuevo)."""
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.close()
+
+# Control de admisión y circuito del proceso (se crean en el primer uso)
+_admission = None
+_breaker = None
+_admission_lock = threading.Lock()
+
+def _get_admission():
+    """Devuelve (control de admisión, circuito) del proceso, creándolos si aún no existen."""
+    global _admission, _breaker
+    if _breaker is None:
+        with _admission_lock:
+            if _breaker is None:
+                config = current_app.config
+                _admission = AdmissionController(
+                    max_concurrent=config.get('DB_MAX_CONCURRENT', 8),
+                    reserved=config.get('DB_ADMISSION_RESERVED', 2),
+                    max_queue=config.get('DB_ADMISSION_MAX_QUEUE', 32),
+                    queue_timeout=config.get('DB_ADMISSION_QUEUE_TIMEOUT', 2.0),
+                    retry_after=config.get('DB_ADMISSION_RETRY_AFTER', 1),
+                    low_max=config.get('DB_ADMISSION_LOW_MAX'),
+                )
+                _breaker = CircuitBreaker(
+                    failure_threshold=config.get('DB_CIRCUIT_FAILURES', 5),
+                    reset_timeout=config.get('DB_CIRCUIT_RESET', 30.0),
+                )
+    return _admission, _breaker
+
+def get_admission_stats():
+    """Devuelve las plazas en uso, la cola por prioridad, los rechazos y el estado del circuito."""
+    if _breaker is None:
+        return None
+    stats = _admission.stats()
+    stats["circuit"] = _breaker.stats()
+    return stats
+
+def _reset_after_fork():
+    """En el proceso hijo de un fork descarta el pool heredado; cada worker abre sus propias conexiones.
+
+    Las conexiones heredadas comparten el socket con el padre: no se cierran (enviarían el cierre
+    de sesión por ese socket), sólo se conservan para que no las cierre el recolector de basura.
+    """
+    global _pool, _pool_lock, _table_columns_lock, _admission, _breaker, _admission_lock
+    if _pool is not None:
+        _inherited_pools.append(_pool)
+    _pool = None
+    _pool_lock = threading.Lock()
+    _table_columns_lock = threading.Lock() # Las columnas ya descubiertas sí se reutilizan
+    _admission = _breaker = None
+    _admission_lock = threading.Lock()
+
+_inherited_pools = []
+
+if hasattr(os, 'register_at_fork'): # No existe en Windows
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+def get_pool_stats():
+    """Devuelve las estadísticas del pool (en uso, inactivas, esperas, tiempo de espera)."""
+    return _pool.stats() if _pool is not None else None
+
+def _is_db_failure(error):
+    """Errores que indican que la base de datos no responde (conexión perdida, tiempo agotado, login)."""
+    return isinstance(error, (pyodbc.OperationalError, pyodbc.InterfaceError))
+
+def _connection_closed(admission, priority, breaker, broken, error):
+    """Libera la plaza de admisión de una conexión y anota en el circuito cómo terminó."""
+    if admission is not None:
+        admission.release(priority)
+    if not broken:
+        breaker.record_success()
+    elif _is_db_failure(error):
+        breaker.record_failure()
+
 def get_db_connection():
-    """Establece y devuelve una conexión a la base de datos Azure SQL."""
-    conn = None
+    """Obtiene una conexión a la base de datos Azure SQL desde el pool.
+
+    Antes espera turno en el control de admisión según la prioridad de la ruta (ver
+    admission.py); lanza AdmissionRejected (503) si la cola está llena, se agota la espera o el
+    circuito está abierto. Al llamar a close() sobre la conexión devuelta, ésta vuelve al pool
+    y libera su plaza.
+    """
+    config = current_app.config
+    admission, breaker = _get_admission()
+    if not config.get('DB_ADMISSION_ENABLED', True):
+        admission = None
+    priority = current_priority()
+    trial = False
     try:
-        conn = pyodbc.connect(current_app.config['SQLALCHEMY_DATABASE_URI'])
-        conn.autocommit = True # Opcional: para que cada comando se guarde inmediatamente
-        logger.info("Conexión a la base de datos Azure SQL exitosa.")
-        return conn
+        trial = breaker.allow()
+        waited = admission.acquire(priority) if admission is not None else 0.0
+    except AdmissionRejected as e:
+        if trial:
+            breaker.cancel_trial() # Sin plaza la prueba no llegó a la base de datos
+        observe_admission(priority, None, e.reason)
+        logger.warning("Consulta rechazada (%s, prioridad %s): %s", e.reason, priority, e.description)
+        raise
+    observe_admission(priority, waited)
+    return _acquire_connection(partial(_connection_closed, admission, priority, breaker), config)
+
+@timed_acquire
+def _acquire_connection(on_close, config):
+    try:
+        conn = get_pool().acquire(on_close=on_close)
     except pyodbc.Error as ex:
+        on_close(True, ex)
         sqlstate = ex.args[0]
-        logger.error(f"Error al conectar a la base de datos: {sqlstate} - {ex}")
+        logger.error("Error al conectar a la base de datos: %s - %s", sqlstate, ex)
         raise # Relanza la excepción para que sea manejada por la ruta
     except Exception as e:
-        logger.error(f"Error inesperado en get_db_connection: {e}")
+        on_close(True, e)
+        logger.error("Error inesperado en get_db_connection: %s", e)
         raise # Relanza la excepción
+    try:
+        conn.autocommit = True # Opcional: para que cada comando se guarde inmediatamente
+        try:
+            # Tiempo máximo por sentencia: el de la ruta (db_priority) o DB_QUERY_TIMEOUT
+            conn.timeout = int(g.get('db_timeout', config.get('DB_QUERY_TIMEOUT', 0)))
+        except AttributeError:
+            pass # Conexiones sin tiempo máximo por sentencia (p. ej. sqlite)
+        return conn
+    except Exception as e:
+        logger.error("Error inesperado en get_db_connection: %s", e)
+        conn.invalidate(e)
+        conn.close()
+        raise
+
+@timed_db('fetch')
+def fetch_data(query, params=None, raw=False):
+    """Ejecuta una consulta SELECT y devuelve los resultados.
 
-def fetch_data(query, params=None):
-    """Ejecuta una consulta SELECT y devuelve los resultados."""
+    Con raw=True devuelve las filas tal como las entrega el driver (p. ej. bytes sin codificar).
+    """
     conn = None
     try:
         conn = get_db_connection()
@@ -32,30 +191,145 @@ def fetch_data(query, params=None):
             cursor.execute(query, params)
         else:
             cursor.execute(query)
-        columns = [column[0] for column in cursor.description]
-        results = []
-        for row in cursor.fetchall():
-            formatted_row = []
-            for i, item in enumerate(row):
-                # Si la columna es 'Signature' y el ítem es bytes/memoryview, convertir a Base64
-                if columns[i] == 'Signature' and isinstance(item, (bytes, memoryview)):
-                    formatted_row.append(base64.b64encode(item).decode('utf-8')) # Convertir a Base64
-                elif isinstance(item, (bytes, memoryview)):
-                    # Para otros tipos binarios que no son Signature, puedes convertirlos a hex o ignorarlos
-                    formatted_row.append(item.hex()) 
-                else:
-                    formatted_row.append(str(item)) # Convertir todos los demás a string para JSON
-            results.append(dict(zip(columns, formatted_row)))
-        logger.debug(f"Datos obtenidos con la consulta: {query} con parámetros {params}")
+        if raw:
+            results = [tuple(row) for row in cursor.fetchall()]
+        else:
+            convert = get_row_converter(cursor.description)
+            results = [convert(row) for row in cursor.fetchall()]
+        logger.debug("Datos obtenidos con la consulta: %s con parámetros %s", query, params)
         return results
     except Exception as e:
-        logger.error(f"Error al ejecutar fetch_data con query '{query}' y params '{params}': {e}")
+        logger.error("Error al ejecutar fetch_data con query '%s' y params '%s': %s", query, params, e)
+        if conn:
+            conn.invalidate(e) # No reutilizar una conexión que ha fallado
         raise
     finally:
         if conn:
             conn.close()
-            logger.debug("Conexión a la base de datos cerrada después de fetch_data.")
+            logger.debug("Conexión devuelta al pool después de fetch_data.")
+
+class RowBatches:
+    """Iterador de lotes de filas leídos con fetchmany sobre una conexión del pool.
 
+    La conexión vuelve al pool al agotarse el iterador o al llamar a close(), lo que
+    ocurra primero (close() es idempotente y debe llamarse aunque no se itere).
+    `on_rows(n)`, si se asigna, recibe el tamaño de cada lote leído (métricas de filas).
+    """
+
+    def __init__(self, conn, cursor, batch_size, query, params):
+        self.columns = [column[0] for column in cursor.description]
+        self._convert = get_row_converter(cursor.description)
+        self._conn = conn
+        self._cursor = cursor
+        self._batch_size = batch_size
+        self._query = query
+        self._params = params
+        self.on_rows = None
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self._conn is None:
+            raise StopIteration
+        try:
+            rows = self._cursor.fetchmany(self._batch_size)
+        except Exception as e:
+            logger.error("Error al transmitir datos con query '%s' y params '%s': %s", self._query, self._params, e)
+            self._conn.invalidate(e)
+            self.close()
+            raise
+        if not rows:
+            logger.debug("Datos transmitidos con la consulta: %s con parámetros %s", self._query, self._params)
+            self.close()
+            raise StopIteration
+        if self.on_rows is not None:
+            self.on_rows(len(rows))
+        convert = self._convert
+        return [convert(row) for row in rows]
+
+    def close(self):
+        if self._conn is not None:
+            conn, self._conn = self._conn, None
+            if self._cursor is not None:
+                try:
+                    self._cursor.close() # Descarta los resultados pendientes si el cliente cortó la respuesta
+                except Exception:
+                    conn.invalidate()
+            conn.close()
+            logger.debug("Conexión devuelta al pool después de stream_batches.")
+
+@timed_db('stream')
+def stream_batches(query, params=None, batch_size=None):
+    """Ejecuta una consulta SELECT y devuelve un RowBatches para leer el resultado por lotes.
+
+    La consulta se ejecuta antes de devolver el iterador, de modo que los errores de la
+    consulta se lanzan aquí y no a mitad de la respuesta.
+    """
+    batch_size = batch_size or current_app.config.get('DB_FETCH_BATCH_SIZE', 500)
+    conn = None
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        if params:
+            cursor.execute(query, params)
+        else:
+            cursor.execute(query)
+        return RowBatches(conn, cursor, batch_size, query, params)
+    except Exception as e:
+        logger.error("Error al ejecutar stream_batches con query '%s' y params '%s': %s", query, params, e)
+        if conn:
+            conn.invalidate(e) # No reutilizar una conexión que ha fallado
+            conn.close()
+        raise
+
+# Columnas de cada tabla (nombre -> type_code de cursor.description), descubiertas una vez por proceso
+_table_columns = {}
+_table_columns_lock = threading.Lock()
+
+def get_table_columns(table):
+    """Devuelve un diccionario ordenado {columna: type_code} con las columnas de la tabla.
+
+    Se consulta una sola vez por tabla con SELECT TOP 0 y se guarda en memoria.
+    """
+    columns = _table_columns.get(table)
+    if columns is not None:
+        return columns
+    conn = None
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        cursor.execute(f"SELECT TOP 0 * FROM {table}")
+        columns = {column[0]: column[1] for column in cursor.description}
+        cursor.fetchall()
+    except Exception as e:
+        logger.error("Error al obtener las columnas de la tabla %s: %s", table, e)
+        if conn:
+            conn.invalidate(e)
+        raise
+    finally:
+        if conn:
+            conn.close()
+    with _table_columns_lock:
+        _table_columns[table] = columns
+    return columns
+
+# Funciones que se llaman tras cada escritura confirmada (p. ej. para invalidar cachés)
+_write_hooks = []
+
+def register_write_hook(hook):
+    """Registra una función hook(query) que se llama después de cada escritura confirmada."""
+    if hook not in _write_hooks:
+        _write_hooks.append(hook)
+
+def _run_write_hooks(query):
+    for hook in _write_hooks:
+        try:
+            hook(query)
+        except Exception as e:
+            logger.error("Error en el hook de escritura %r: %s", hook, e)
+
+@timed_db('execute')
 def execute_query(query, params=None):
     """Ejecuta una consulta INSERT, UPDATE o DELETE."""
     conn = None
@@ -68,15 +342,70 @@ def execute_query(query, params=None):
             cursor.execute(query)
         rows_affected = cursor.rowcount
         conn.commit() # Asegura que los cambios se guarden
-        logger.info(f"Consulta ejecutada exitosamente. Filas afectadas: {rows_affected}. Consulta: {query} con parámetros {params}")
+        _run_write_hooks(query)
+        logger.info("Consulta ejecutada exitosamente. Filas afectadas: %s. Consulta: %s con parámetros %s", rows_affected, query, params)
         return rows_affected
     except Exception as e:
-        logger.error(f"Error al ejecutar execute_query con query '{query}' y params '{params}': {e}")
+        logger.error("Error al ejecutar execute_query con query '%s' y params '%s': %s", query, params, e)
         if conn:
-            conn.rollback() # Revierte los cambios si hay un error
-            logger.warning("Rollback de la transacción debido a un error.")
+            conn.invalidate(e) # No reutilizar una conexión que ha fallado
+            try:
+                conn.rollback() # Revierte los cambios si hay un error
+                logger.warning("Rollback de la transacción debido a un error.")
+            except Exception as rollback_error:
+                logger.error("Error al hacer rollback: %s", rollback_error)
         raise
     finally:
         if conn:
             conn.close()
-            logger.debug("Conexión a la base de datos cerrada después de execute_query.")
\ No newline at end of file
+            logger.debug("Conexión devuelta al pool después de execute_query.")
+
+class Transaction:
+    """Transacción abierta sobre una conexión del pool (ver transaction())."""
+
+    def __init__(self, conn, chunk_size):
+        self.conn = conn
+        self.cursor = conn.cursor()
+        self.chunk_size = chunk_size
+        self.written = []
+        try:
+            self.cursor.fast_executemany = True # Envía los parámetros en bloque (pyodbc)
+        except AttributeError:
+            pass
+
+    def fetch_column(self, query, params=None):
+        """Ejecuta una consulta SELECT dentro de la transacción y devuelve la primera columna."""
+        self.cursor.execute(query, params or ())
+        return [row[0] for row in self.cursor.fetchall()]
+
+    def execute_many(self, query, seq_of_params):
+        """Ejecuta la sentencia con executemany en bloques de chunk_size filas."""
+        for start in range(0, len(seq_of_params), self.chunk_size):
+            self.cursor.executemany(query, seq_of_params[start:start + self.chunk_size])
+        if query not in self.written:
+            self.written.append(query)
+
+@contextmanager
+def transaction(chunk_size=None):
+    """Abre una transacción; se confirma al salir del bloque o se revierte si hay un error."""
+    chunk_size = chunk_size or current_app.config.get('DB_EXECUTEMANY_CHUNK_SIZE', 1000)
+    conn = get_db_connection()
+    try:
+        conn.autocommit = False
+        tx = Transaction(conn, chunk_size)
+        yield tx
+        conn.commit()
+        for query in tx.written:
+            _run_write_hooks(query)
+        logger.info("Transacción confirmada (%s sentencias).", len(tx.written))
+    except Exception as e:
+        logger.error("Error en la transacción, se revierte: %s", e)
+        conn.invalidate(e) # No reutilizar una conexión que ha fallado
+        try:
+            conn.rollback()
+            logger.warning("Rollback de la transacción debido a un error.")
+        except Exception as rollback_error:
+            logger.error("Error al hacer rollback: %s", rollback_error)
+        raise
+    finally:
+        conn.close()
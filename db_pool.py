@@ -0,0 +1,292 @@
+import threading
+import time
+import logging
+from collections import deque
+
+# Obtener el logger de la aplicación Flask
+logger = logging.getLogger(__name__)
+
+
+class PoolTimeoutError(Exception):
+    """Se lanza cuando no se obtiene una conexión del pool dentro del tiempo de espera."""
+
+
+class _Slot:
+    """Conexión física junto con sus datos de uso (edad, usos, último uso)."""
+    __slots__ = ('raw', 'created_at', 'last_used', 'uses')
+
+    def __init__(self, raw):
+        now = time.monotonic()
+        self.raw = raw
+        self.created_at = now
+        self.last_used = now
+        self.uses = 0
+
+
+class PooledConnection:
+    """Envoltorio de una conexión del pool. Al cerrarla se devuelve al pool en lugar de cerrarse.
+
+    `on_close(broken, error)` se llama una vez tras devolverla, con el error pasado a invalidate().
+    """
+
+    def __init__(self, pool, slot, on_close=None):
+        self._pool = pool
+        self._slot = slot
+        self._broken = False
+        self._error = None
+        self._on_close = on_close
+
+    # Propiedades que se escriben sobre la conexión física
+    @property
+    def autocommit(self):
+        return self._slot.raw.autocommit
+
+    @autocommit.setter
+    def autocommit(self, value):
+        self._slot.raw.autocommit = value
+
+    @property
+    def timeout(self):
+        return self._slot.raw.timeout
+
+    @timeout.setter
+    def timeout(self, value):
+        self._slot.raw.timeout = value # Segundos por sentencia en pyodbc (0 = sin límite)
+
+    def cursor(self):
+        return self._slot.raw.cursor()
+
+    def commit(self):
+        self._slot.raw.commit()
+
+    def rollback(self):
+        self._slot.raw.rollback()
+
+    def invalidate(self, error=None):
+        """Marca la conexión como inservible: se descartará al devolverla al pool."""
+        self._broken = True
+        if error is not None:
+            self._error = error
+
+    def close(self):
+        """Devuelve la conexión al pool (idempotente)."""
+        if self._slot is not None:
+            slot, self._slot = self._slot, None
+            try:
+                self._pool._release(slot, self._broken)
+            finally:
+                if self._on_close is not None:
+                    self._on_close(self._broken, self._error)
+
+    def __getattr__(self, name):
+        # Cualquier otro atributo se delega en la conexión física
+        slot = self.__dict__.get('_slot')
+        if slot is None:
+            raise AttributeError(name)
+        return getattr(slot.raw, name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.invalidate()
+        self.close()
+
+
+class ConnectionPool:
+    """Pool de conexiones acotado y seguro entre hilos.
+
+    `connect` es cualquier función sin argumentos que devuelva una conexión DB-API
+    (pyodbc.connect con la cadena de conexión, o sqlite3.connect para pruebas locales).
+    """
+
+    def __init__(self, connect, min_size=0, max_size=10, timeout=30.0, max_uses=0,
+                 max_age=0, ping_after=5.0, ping_query='SELECT 1'):
+        if max_size < 1:
+            raise ValueError("max_size debe ser al menos 1")
+        self._connect = connect
+        self.min_size = min(min_size, max_size)
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_uses = max_uses      # 0 = sin límite de usos
+        self.max_age = max_age        # segundos; 0 = sin límite de edad
+        self.ping_after = ping_after  # verifica la conexión si estuvo inactiva más de N segundos
+        self.ping_query = ping_query
+
+        self._idle = deque()
+        self._size = 0  # conexiones físicas abiertas (inactivas + en uso)
+        self._cond = threading.Condition(threading.Lock())
+        self._closed = False
+
+        # Estadísticas
+        self._checkouts = 0
+        self._waits = 0
+        self._wait_time = 0.0
+        self._timeouts = 0
+        self._created = 0
+        self._recycled = 0
+        self._discarded = 0
+
+    def fill(self):
+        """Abre conexiones hasta alcanzar min_size. Los errores se registran y no se propagan."""
+        while True:
+            with self._cond:
+                if self._closed or self._size >= self.min_size:
+                    return
+                self._size += 1
+            try:
+                slot = self._open()
+            except Exception as e:
+                with self._cond:
+                    self._size -= 1
+                    self._cond.notify()
+                logger.warning("No se pudo precargar el pool de conexiones: %s", e)
+                return
+            with self._cond:
+                self._idle.append(slot)
+                self._cond.notify()
+
+    def acquire(self, timeout=None, on_close=None):
+        """Obtiene una conexión del pool, esperando como máximo `timeout` segundos."""
+        timeout = self.timeout if timeout is None else timeout
+        slot = None
+        waited = None
+        with self._cond:
+            if self._closed:
+                raise PoolTimeoutError("El pool de conexiones está cerrado.")
+            if not self._idle and self._size >= self.max_size:
+                waited = time.monotonic()
+                deadline = waited + timeout
+                self._waits += 1
+                while not self._idle and self._size >= self.max_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0 or self._closed:
+                        self._wait_time += time.monotonic() - waited
+                        self._timeouts += 1
+                        raise PoolTimeoutError(
+                            f"No hay conexiones disponibles tras esperar {timeout} segundos "
+                            f"(máximo {self.max_size})."
+                        )
+                    self._cond.wait(remaining)
+                self._wait_time += time.monotonic() - waited
+            if self._idle:
+                slot = self._idle.pop()  # LIFO: reutiliza la conexión más reciente
+            else:
+                self._size += 1
+            self._checkouts += 1
+
+        try:
+            slot = self._checkout(slot)
+        except Exception:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+        return PooledConnection(self, slot, on_close)
+
+    def _checkout(self, slot):
+        """Valida (o crea) la conexión que se va a prestar."""
+        if slot is not None:
+            if self._expired(slot):
+                self._close_raw(slot)
+                with self._cond:
+                    self._recycled += 1
+                slot = None
+            elif self.ping_after is not None and time.monotonic() - slot.last_used >= self.ping_after:
+                if not self._ping(slot):
+                    self._close_raw(slot)
+                    with self._cond:
+                        self._discarded += 1
+                    slot = None
+        if slot is None:
+            slot = self._open()
+        slot.uses += 1
+        return slot
+
+    def _release(self, slot, broken=False):
+        slot.last_used = time.monotonic()
+        discard = broken or self._closed or self._expired(slot)
+        if not discard:
+            try:
+                # No devolver al pool una transacción abierta
+                if getattr(slot.raw, 'autocommit', True) is False:
+                    slot.raw.rollback()
+                    slot.raw.autocommit = True
+            except Exception as e:
+                logger.warning("No se pudo restablecer la conexión al devolverla al pool: %s", e)
+                discard = True
+        if discard:
+            self._close_raw(slot)
+            with self._cond:
+                self._size -= 1
+                if broken:
+                    self._discarded += 1
+                elif not self._closed:
+                    self._recycled += 1
+                self._cond.notify()
+            return
+        with self._cond:
+            self._idle.append(slot)
+            self._cond.notify()
+
+    def _open(self):
+        raw = self._connect()
+        with self._cond:
+            self._created += 1
+        return _Slot(raw)
+
+    def _expired(self, slot):
+        if self.max_uses and slot.uses >= self.max_uses:
+            return True
+        if self.max_age and time.monotonic() - slot.created_at >= self.max_age:
+            return True
+        return False
+
+    def _ping(self, slot):
+        try:
+            cursor = slot.raw.cursor()
+            try:
+                cursor.execute(self.ping_query)
+                cursor.fetchall()
+            finally:
+                cursor.close()
+            return True
+        except Exception as e:
+            logger.warning("Conexión inactiva descartada tras fallar la verificación: %s", e)
+            return False
+
+    @staticmethod
+    def _close_raw(slot):
+        try:
+            slot.raw.close()
+        except Exception:
+            pass
+
+    def close(self):
+        """Cierra todas las conexiones inactivas; las prestadas se cierran al devolverse."""
+        with self._cond:
+            self._closed = True
+            idle, self._idle = list(self._idle), deque()
+            self._size -= len(idle)
+            self._cond.notify_all()
+        for slot in idle:
+            self._close_raw(slot)
+
+    def stats(self):
+        """Devuelve un diccionario con el estado y las estadísticas del pool."""
+        with self._cond:
+            idle = len(self._idle)
+            return {
+                "size": self._size,
+                "in_use": self._size - idle,
+                "idle": idle,
+                "max_size": self.max_size,
+                "checkouts": self._checkouts,
+                "waits": self._waits,
+                "wait_time_seconds": round(self._wait_time, 6),
+                "timeouts": self._timeouts,
+                "created": self._created,
+                "recycled": self._recycled,
+                "discarded": self._discarded,
+            }
@@ -0,0 +1,58 @@
+# backend/gunicorn.conf.py
+# Servidor de producción: gunicorn -c gunicorn.conf.py wsgi:app
+#
+# El proceso maestro importa la aplicación una sola vez (preload_app), descarga las claves JWKS
+# y descubre las columnas de las tablas; después crea los workers con fork, que heredan todo eso
+# y sólo tienen que abrir sus propias conexiones. Así un worker nuevo (reinicio por max_requests
+# o despliegue gradual) está listo en pocos milisegundos.
+import multiprocessing
+import os
+import time
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:5000')
+workers = int(os.getenv('WEB_WORKERS', str(multiprocessing.cpu_count())))
+# Hilos por worker: las peticiones pasan casi todo el tiempo esperando a la base de datos.
+# Se usa gthread y no un worker asíncrono (gevent/eventlet) porque pyodbc bloquea en C y
+# pararía todo el worker durante cada consulta.
+worker_class = 'gthread'
+# Cada cliente del stream de alertas (/api/alerts/stream) ocupa un hilo mientras está conectado,
+# así que se suman hilos aparte para ellos y la aplicación rechaza con 503 los que no quepan:
+# WEB_THREADS quedan siempre libres para el resto de peticiones. Con N clientes simultáneos
+# del stream, WEB_STREAM_THREADS debe ser al menos N / WEB_WORKERS.
+request_threads = int(os.getenv('WEB_THREADS', '8'))
+stream_threads = int(os.getenv('WEB_STREAM_THREADS', '16'))
+threads = request_threads + stream_threads
+os.environ.setdefault('ALERTS_STREAM_MAX_CLIENTS', str(stream_threads))
+# Todos los workers escriben en el mismo destino: salida estándar, que recoge gunicorn/systemd.
+# Para escribir en logs/app.log usar LOG_HANDLER=watched y rotarlo con logrotate (ver logging_config.py).
+os.environ.setdefault('LOG_HANDLER', 'stdout')
+preload_app = True
+timeout = int(os.getenv('WEB_TIMEOUT', '60'))
+graceful_timeout = int(os.getenv('WEB_GRACEFUL_TIMEOUT', '30'))
+keepalive = 5
+# Recicla los workers de forma escalonada para limitar el crecimiento de memoria
+max_requests = int(os.getenv('WEB_MAX_REQUESTS', '10000'))
+max_requests_jitter = int(os.getenv('WEB_MAX_REQUESTS_JITTER', '1000'))
+
+_forked_at = {}
+
+
+def when_ready(server):
+    """En el maestro, tras cargar la aplicación: prepara lo que heredarán todos los workers."""
+    from app import warm_up
+    from database import close_pool
+    warm_up(server.app.wsgi(), connect=False)
+    close_pool() # Las conexiones no se comparten entre procesos: cada worker abre las suyas
+
+
+def post_fork(server, worker):
+    _forked_at[worker.pid] = time.perf_counter()
+
+
+def post_worker_init(worker):
+    """En cada worker, antes de aceptar peticiones: abre las conexiones mínimas del pool."""
+    from app import warm_up
+    warm_up(worker.wsgi)
+    started = _forked_at.pop(worker.pid, None)
+    if started is not None:
+        worker.log.info("Worker %s listo %.1f ms después del fork.", worker.pid, (time.perf_counter() - started) * 1000)
@@ -0,0 +1,148 @@
+import atexit
+import json
+import logging
+import os
+import queue
+import sys
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler, WatchedFileHandler
+
+from flask.logging import default_handler
+
+# Formato de texto de los logs (el mismo que usaba app.py)
+TEXT_FORMAT = '%(asctime)s %(levelname)s %(funcName)s(%(lineno)d) %(message)s'
+
+
+class DroppingQueueHandler(QueueHandler):
+    """QueueHandler que nunca bloquea: si la cola está llena descarta el registro y lo cuenta.
+
+    El mensaje no se formatea en el hilo de la petición; el registro se pasa tal cual al hilo
+    escritor, que es el único que hace el formateo y la escritura a disco.
+    """
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # El listener está en el mismo proceso: no hace falta copiar ni formatear el registro
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class JsonFormatter(logging.Formatter):
+    """Formatea cada registro como una línea JSON."""
+
+    def format(self, record):
+        data = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "function": record.funcName,
+            "line": record.lineno,
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            data["exception"] = self.formatException(record.exc_info)
+        return json.dumps(data, ensure_ascii=False)
+
+
+# Estado del proceso
+_handler = None
+_listener = None
+
+
+def configure_logging(app):
+    """Envía los logs de todos los módulos a un hilo escritor en segundo plano a través de una cola acotada.
+
+    Los hilos de las peticiones sólo encolan registros; el destino (y la consola en modo DEBUG)
+    se escribe desde el hilo del QueueListener. LOG_HANDLER elige el destino:
+      'rotating' - logs/<LOG_FILE> rotado por la propia aplicación (un solo proceso)
+      'watched'  - logs/<LOG_FILE> rotado por logrotate; cada proceso reabre el archivo al rotarlo
+      'stdout'   - salida estándar, recogida por gunicorn/systemd/contenedor (por defecto con gunicorn)
+    Con varios procesos no se usa 'rotating': cada uno rotaría el mismo archivo por su cuenta.
+    """
+    global _handler, _listener
+    config = app.config
+    level = config['LOG_LEVEL']
+
+    if config.get('LOG_FORMAT', 'text') == 'json':
+        formatter = JsonFormatter()
+    else:
+        formatter = logging.Formatter(TEXT_FORMAT)
+
+    destination = config.get('LOG_HANDLER', 'rotating')
+    if destination == 'stdout':
+        main_handler = logging.StreamHandler(sys.stdout)
+    else:
+        log_file_path = os.path.join(os.getcwd(), 'logs', config['LOG_FILE']) # Ruta completa al archivo de log
+        # Asegúrate de que la carpeta 'logs' exista
+        os.makedirs(os.path.dirname(log_file_path), exist_ok=True)
+        if destination == 'watched':
+            # La rotación la hace logrotate; el handler reabre el archivo cuando cambia
+            main_handler = WatchedFileHandler(log_file_path, mode='a', encoding='utf-8')
+        else:
+            # Rota los logs cuando alcanzan 1MB, manteniendo 5 copias.
+            main_handler = RotatingFileHandler(log_file_path, mode='a', maxBytes=1*1024*1024, backupCount=5, encoding='utf-8', delay=0)
+    main_handler.setFormatter(formatter)
+    main_handler.setLevel(level)
+    handlers = [main_handler]
+    if config.get('DEBUG') and destination != 'stdout':
+        console_handler = logging.StreamHandler()
+        console_handler.setFormatter(formatter)
+        handlers.append(console_handler)
+
+    stop_logging()
+    log_queue = queue.Queue(maxsize=config.get('LOG_QUEUE_SIZE', 10000))
+    _handler = DroppingQueueHandler(log_queue)
+    _handler.setLevel(level)
+    _listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+
+    # Todos los módulos (app, database, routes, werkzeug...) propagan hasta el logger raíz
+    root = logging.getLogger()
+    root.setLevel(level)
+    root.addHandler(_handler)
+    app.logger.removeHandler(default_handler) # La consola se escribe desde el listener en modo DEBUG
+    app.logger.setLevel(level)
+    return _listener
+
+
+def stop_logging():
+    """Vacía la cola y detiene el hilo escritor (se llama también al salir del proceso)."""
+    global _handler, _listener
+    if _handler is not None:
+        logging.getLogger().removeHandler(_handler)
+        _handler = None
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+atexit.register(stop_logging)
+
+
+def _restart_after_fork():
+    """En el proceso hijo de un fork el hilo escritor no existe: se crea otro con una cola nueva."""
+    global _listener
+    if _listener is None:
+        return
+    log_queue = queue.Queue(maxsize=_handler.queue.maxsize)
+    _handler.queue = log_queue
+    _listener = QueueListener(log_queue, *_listener.handlers, respect_handler_level=_listener.respect_handler_level)
+    _listener.start()
+
+
+if hasattr(os, 'register_at_fork'): # No existe en Windows
+    os.register_at_fork(after_in_child=_restart_after_fork)
+
+
+def get_logging_stats():
+    """Devuelve el tamaño actual de la cola de logs y los registros descartados por desbordamiento."""
+    if _handler is None:
+        return None
+    return {"queued": _handler.queue.qsize(), "dropped": _handler.dropped}
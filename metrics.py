@@ -0,0 +1,269 @@
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from functools import wraps
+
+from flask import Response, g, has_request_context, request
+
+# Obtener el logger de la aplicación Flask
+logger = logging.getLogger(__name__)
+
+# Límites superiores (en segundos) de los buckets de los histogramas de latencia
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Umbral de consulta lenta en segundos (None = desactivado); se fija en init_app
+_slow_query_threshold = None
+
+# Estadísticas de otros módulos publicadas como gauges: [(prefijo, función, ayuda)]
+_stats_sources = []
+
+
+class Histogram:
+    """Histograma acumulativo con buckets fijos, por combinación de etiquetas."""
+
+    def __init__(self, name, help_text, label_names, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.label_names = label_names
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels, value):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = [(labels, list(counts), total, count) for labels, (counts, total, count) in self._series.items()]
+        for labels, counts, total, count in sorted(items):
+            label_text = _labels(self.label_names, labels)
+            prefix = label_text + ',' if label_text else ''
+            suffix = f'{{{label_text}}}' if label_text else ''
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                lines.append(f'{self.name}_bucket{{{prefix}le="{bound}"}} {cumulative}')
+            lines.append(f'{self.name}_bucket{{{prefix}le="+Inf"}} {count}')
+            lines.append(f"{self.name}_sum{suffix} {total}")
+            lines.append(f"{self.name}_count{suffix} {count}")
+        return lines
+
+
+class Counter:
+    """Contador monótono por combinación de etiquetas."""
+
+    def __init__(self, name, help_text, label_names):
+        self.name = name
+        self.help = help_text
+        self.label_names = label_names
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels, amount=1):
+        with self._lock:
+            self._series[labels] = self._series.get(labels, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._series.items())
+        for labels, value in items:
+            lines.append(f"{self.name}{{{_labels(self.label_names, labels)}}} {value}")
+        return lines
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, values):
+    return ','.join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+
+
+# --- Métricas ---
+REQUEST_LATENCY = Histogram('http_request_duration_seconds', 'Latencia de las peticiones HTTP por ruta.', ('endpoint', 'method'))
+REQUESTS = Counter('http_requests_total', 'Peticiones HTTP por ruta y código de estado.', ('endpoint', 'method', 'status'))
+RESPONSE_BYTES = Counter('http_response_bytes_total', 'Bytes de cuerpo enviados por ruta.', ('endpoint',))
+REQUEST_ERRORS = Counter('http_request_errors_total', 'Respuestas HTTP con código 5xx por ruta.', ('endpoint',))
+DB_LATENCY = Histogram('db_query_duration_seconds', 'Tiempo en base de datos por ruta y operación.', ('endpoint', 'operation'))
+DB_ROWS = Counter('db_rows_returned_total', 'Filas devueltas o afectadas por ruta y operación.', ('endpoint', 'operation'))
+DB_ERRORS = Counter('db_errors_total', 'Errores de base de datos por ruta y operación.', ('endpoint', 'operation'))
+DB_ACQUIRE = Histogram('db_connection_acquire_seconds', 'Tiempo para obtener una conexión del pool.', ())
+SLOW_QUERIES = Counter('db_slow_queries_total', 'Consultas por encima del umbral de consulta lenta.', ('endpoint', 'operation'))
+COMPRESSION_BYTES_SAVED = Counter('http_compression_saved_bytes_total', 'Bytes ahorrados por la compresión de respuestas.', ('endpoint', 'encoding'))
+COMPRESSION_SECONDS = Counter('http_compression_cpu_seconds_total', 'Tiempo de CPU dedicado a comprimir respuestas.', ('endpoint', 'encoding'))
+DB_ADMISSION_WAIT = Histogram('db_admission_wait_seconds', 'Espera en la cola de admisión de la base de datos por prioridad.', ('priority',))
+DB_ADMISSION_REJECTED = Counter('db_admission_rejected_total', 'Consultas rechazadas con 503 por ruta, prioridad y motivo.', ('endpoint', 'priority', 'reason'))
+
+_METRICS = (REQUEST_LATENCY, REQUESTS, RESPONSE_BYTES, REQUEST_ERRORS,
+            DB_LATENCY, DB_ROWS, DB_ERRORS, DB_ACQUIRE, SLOW_QUERIES,
+            COMPRESSION_BYTES_SAVED, COMPRESSION_SECONDS,
+            DB_ADMISSION_WAIT, DB_ADMISSION_REJECTED)
+
+
+def _reset_after_fork():
+    """En el proceso hijo de un fork renueva los cerrojos, que podían estar tomados al copiar el proceso."""
+    for metric in _METRICS:
+        metric._lock = threading.Lock()
+
+
+if hasattr(os, 'register_at_fork'): # No existe en Windows
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def _endpoint():
+    if has_request_context():
+        return request.endpoint or 'desconocido'
+    return 'segundo_plano'
+
+
+def timed_db(operation):
+    """Decorador para funciones de base de datos: registra tiempo, filas, errores y consultas lentas.
+
+    La función decorada recibe la consulta como primer argumento; si devuelve una lista se
+    cuentan sus elementos, si devuelve un entero (filas afectadas) se suma tal cual y si
+    devuelve un iterador de lotes con `on_rows` (stream_batches) se cuentan al leerlos.
+    """
+    def decorator(f):
+        @wraps(f)
+        def wrapper(query, *args, **kwargs):
+            endpoint = _endpoint()
+            start = time.perf_counter()
+            try:
+                result = f(query, *args, **kwargs)
+            except Exception:
+                DB_ERRORS.inc((endpoint, operation))
+                raise
+            finally:
+                elapsed = time.perf_counter() - start
+                DB_LATENCY.observe((endpoint, operation), elapsed)
+                if has_request_context():
+                    g.db_time = g.get('db_time', 0.0) + elapsed
+                if _slow_query_threshold is not None and elapsed >= _slow_query_threshold:
+                    SLOW_QUERIES.inc((endpoint, operation))
+                    logger.warning("Consulta lenta (%.1f ms) en %s: %s", elapsed * 1000, endpoint, query, stacklevel=2)
+            if isinstance(result, list):
+                DB_ROWS.inc((endpoint, operation), len(result))
+            elif isinstance(result, int) and result > 0:
+                DB_ROWS.inc((endpoint, operation), result)
+            elif hasattr(result, 'on_rows'):
+                labels = (endpoint, operation) # Las filas llegan después, quizá fuera de la petición
+                result.on_rows = lambda count: DB_ROWS.inc(labels, count)
+            return result
+        return wrapper
+    return decorator
+
+
+def timed_acquire(f):
+    """Decorador para get_db_connection: registra el tiempo de obtención de la conexión."""
+    @wraps(f)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return f(*args, **kwargs)
+        finally:
+            DB_ACQUIRE.observe((), time.perf_counter() - start)
+    return wrapper
+
+
+def observe_admission(priority, waited, rejected=None):
+    """Registra la espera en la cola de admisión o, si `rejected` indica el motivo, el rechazo."""
+    if rejected is not None:
+        DB_ADMISSION_REJECTED.inc((_endpoint(), priority, rejected))
+    else:
+        DB_ADMISSION_WAIT.observe((priority,), waited)
+
+
+def register_stats(prefix, get_stats, help_text):
+    """Publica como gauges `{prefix}_{clave}` los valores numéricos del diccionario que devuelve get_stats()."""
+    if all(source[0] != prefix for source in _stats_sources):
+        _stats_sources.append((prefix, get_stats, help_text))
+
+
+def _flatten(prefix, stats):
+    for key, value in stats.items():
+        name = f"{prefix}_{key}"
+        if isinstance(value, dict):
+            yield from _flatten(name, value)
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            yield name, value
+
+
+def render():
+    """Devuelve todas las métricas en el formato de texto de Prometheus."""
+    lines = []
+    for metric in _METRICS:
+        lines.extend(metric.render())
+    for prefix, get_stats, help_text in _stats_sources:
+        try:
+            stats = get_stats()
+        except Exception as e:
+            logger.error("Error al obtener las estadísticas de %s: %s", prefix, e)
+            continue
+        if not stats:
+            continue
+        for name, value in _flatten(prefix, stats):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name} {value}")
+    return '\n'.join(lines) + '\n'
+
+
+def _before_request():
+    g.request_start = time.perf_counter()
+
+
+def _after_request(response):
+    start = g.get('request_start')
+    if start is None:
+        return response
+    endpoint = request.endpoint or 'desconocido'
+    REQUEST_LATENCY.observe((endpoint, request.method), time.perf_counter() - start)
+    REQUESTS.inc((endpoint, request.method, response.status_code))
+    if response.status_code >= 500:
+        REQUEST_ERRORS.inc((endpoint,))
+    if response.is_streamed:
+        response.response = _count_streamed_bytes(response.response, endpoint)
+    else:
+        RESPONSE_BYTES.inc((endpoint,), response.content_length or 0)
+    return response
+
+
+def _count_streamed_bytes(chunks, endpoint):
+    """Cuenta los bytes de una respuesta transmitida por partes a medida que se envían."""
+    sent = 0
+    try:
+        for chunk in chunks:
+            sent += len(chunk)
+            yield chunk
+    finally:
+        RESPONSE_BYTES.inc((endpoint,), sent)
+        close = getattr(chunks, 'close', None)
+        if close is not None:
+            close()
+
+
+def _metrics_view():
+    return Response(render(), mimetype='text/plain; version=0.0.4')
+
+
+def init_app(app):
+    """Registra los hooks de medición y la ruta /api/metrics en la aplicación."""
+    global _slow_query_threshold
+    threshold_ms = app.config.get('SLOW_QUERY_THRESHOLD_MS')
+    _slow_query_threshold = threshold_ms / 1000.0 if threshold_ms else None
+    if not app.config.get('METRICS_ENABLED', True):
+        return
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    app.add_url_rule('/api/metrics', 'metrics', _metrics_view)
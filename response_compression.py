@@ -0,0 +1,197 @@
+import logging
+import time
+import zlib
+
+from flask import current_app, has_request_context, request
+
+import metrics
+
+# Compresores opcionales: se usan sólo si el paquete está instalado
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Obtener el logger de la aplicación Flask
+logger = logging.getLogger(__name__)
+
+# Tipos de contenido que vale la pena comprimir (text/event-stream queda fuera a propósito)
+COMPRESSIBLE_MIMETYPES = {
+    'application/json', 'application/x-ndjson', 'text/plain', 'text/html', 'text/csv',
+    'text/css', 'application/javascript', 'application/xml', 'text/xml',
+}
+
+# Nivel de compresión por defecto de cada codificación (COMPRESSION_LEVELS los sustituye)
+DEFAULT_LEVELS = {'gzip': 6, 'br': 4, 'zstd': 3}
+
+
+class _GzipStream:
+    """Compresor gzip incremental; cada parte se vacía con Z_SYNC_FLUSH para que el cliente la reciba ya."""
+
+    def __init__(self, level):
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31) # wbits=31: formato gzip
+
+    def compress(self, data):
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self._compressor.flush()
+
+
+class _BrotliStream:
+    def __init__(self, level):
+        self._compressor = brotli.Compressor(quality=level)
+
+    def compress(self, data):
+        return self._compressor.process(data) + self._compressor.flush()
+
+    def finish(self):
+        return self._compressor.finish()
+
+
+class _ZstdStream:
+    def __init__(self, level):
+        self._compressor = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data):
+        return self._compressor.compress(data) + self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self):
+        return self._compressor.flush()
+
+
+def _gzip(data, level):
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    return compressor.compress(data) + compressor.flush()
+
+
+def _brotli(data, level):
+    return brotli.compress(data, quality=level)
+
+
+def _zstd(data, level):
+    return zstandard.ZstdCompressor(level=level).compress(data)
+
+
+# Codificación -> (compresión de un cuerpo completo, compresor incremental), sólo las disponibles
+ENCODERS = {'gzip': (_gzip, _GzipStream)}
+if brotli is not None:
+    ENCODERS['br'] = (_brotli, _BrotliStream)
+if zstandard is not None:
+    ENCODERS['zstd'] = (_zstd, _ZstdStream)
+
+
+def available_encodings(config):
+    """Codificaciones configuradas en COMPRESSION_ENCODINGS (en orden de preferencia) que están disponibles."""
+    return [encoding for encoding in config.get('COMPRESSION_ENCODINGS', ('gzip',)) if encoding in ENCODERS]
+
+
+def is_compressible(mimetype, size, config):
+    """Indica si una respuesta de ese tipo y tamaño (None = transmitida por partes) debe comprimirse."""
+    if not config.get('COMPRESSION_ENABLED', True) or mimetype not in COMPRESSIBLE_MIMETYPES:
+        return False
+    return size is None or size >= config.get('COMPRESSION_MIN_SIZE', 1024)
+
+
+def negotiate(encodings):
+    """Elige entre `encodings` la codificación preferida según Accept-Encoding (None = sin comprimir)."""
+    if not encodings:
+        return None
+    return request.accept_encodings.best_match(encodings)
+
+
+def _endpoint():
+    if has_request_context():
+        return request.endpoint or 'desconocido'
+    return 'segundo_plano'
+
+
+def _level(encoding, config):
+    return config.get('COMPRESSION_LEVELS', {}).get(encoding, DEFAULT_LEVELS[encoding])
+
+
+def compress(data, encoding, config):
+    """Comprime un cuerpo completo y registra el tiempo de CPU empleado en la ruta actual."""
+    start = time.thread_time()
+    compressed = ENCODERS[encoding][0](data, _level(encoding, config))
+    metrics.COMPRESSION_SECONDS.inc((_endpoint(), encoding), time.thread_time() - start)
+    return compressed
+
+
+def record_saved(encoding, original_size, sent_size):
+    """Registra los bytes ahorrados al enviar una respuesta comprimida."""
+    metrics.COMPRESSION_BYTES_SAVED.inc((_endpoint(), encoding), original_size - sent_size)
+
+
+def _compress_stream(chunks, encoding, level, endpoint, charset='utf-8'):
+    """Comprime una respuesta transmitida por partes a medida que se genera."""
+    compressor = ENCODERS[encoding][1](level)
+    original = sent = 0
+    cpu = 0.0
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode(charset)
+            if not chunk:
+                continue
+            start = time.thread_time()
+            compressed = compressor.compress(chunk)
+            cpu += time.thread_time() - start
+            original += len(chunk)
+            sent += len(compressed)
+            if compressed:
+                yield compressed
+        start = time.thread_time()
+        tail = compressor.finish()
+        cpu += time.thread_time() - start
+        sent += len(tail)
+        if tail:
+            yield tail
+    finally:
+        metrics.COMPRESSION_SECONDS.inc((endpoint, encoding), cpu)
+        metrics.COMPRESSION_BYTES_SAVED.inc((endpoint, encoding), original - sent)
+        close = getattr(chunks, 'close', None)
+        if close is not None:
+            close()
+
+
+def _after_request(response):
+    config = current_app.config
+    if (response.status_code < 200 or response.status_code in (204, 206, 304)
+            or response.direct_passthrough or 'Content-Encoding' in response.headers):
+        return response
+    streamed = response.is_streamed
+    if not is_compressible(response.mimetype, None if streamed else response.content_length, config):
+        return response
+    response.vary.add('Accept-Encoding')
+    encoding = negotiate(available_encodings(config))
+    if encoding is None:
+        return response
+
+    if streamed:
+        response.response = _compress_stream(response.response, encoding, _level(encoding, config), _endpoint())
+        response.headers.pop('Content-Length', None)
+    else:
+        data = response.get_data()
+        compressed = compress(data, encoding, config)
+        if len(compressed) >= len(data):
+            return response
+        response.set_data(compressed)
+        record_saved(encoding, len(data), len(compressed))
+        etag, weak = response.get_etag()
+        if etag:
+            response.set_etag(f"{etag}-{encoding}", weak) # Cada codificación es una representación distinta
+    response.headers['Content-Encoding'] = encoding
+    return response
+
+
+def init_app(app):
+    """Registra la compresión de respuestas. Debe llamarse después de metrics.init_app para que
+    las métricas de bytes enviados cuenten los bytes ya comprimidos."""
+    app.after_request(_after_request)
+    logger.info("Compresión de respuestas disponible: %s", ', '.join(available_encodings(app.config)) or 'ninguna')
@@ -1,5 +1,15 @@
-from flask import Blueprint, jsonify, request
-from database import fetch_data, execute_query
+from flask import Blueprint, Response, current_app, g, jsonify, request, stream_with_context, url_for
+from database import fetch_data, execute_query, stream_batches, get_table_columns, transaction
+from datetime import date, datetime, timedelta
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+import math
+import os
+import threading
+import time
+from werkzeug.exceptions import HTTPException
+from admission import current_priority, db_priority
+from cache import cached_response, send_cached
+from ticket_summary import get_ticket_summary
 import logging
 
 # Crear un Blueprint para las rutas de la API
@@ -8,116 +18,740 @@ api_bp = Blueprint('api', __name__)
 # Obtener el logger de la aplicación Flask
 logger = logging.getLogger(__name__)
 
+# Tabla de tickets de cada isla
+ISLAND_TABLES = {
+    'antigua': 'antigua_Ticket',
+    'dominica': 'dominica_Ticket',
+    'maartin': 'maartin_Ticket',
+    'thomas': 'Thomas_Ticket',
+}
+
+# --- Utilidades para respuestas transmitidas por partes ---
+def _wants_ndjson():
+    """Indica si el cliente pidió NDJSON (?format=ndjson o Accept: application/x-ndjson)."""
+    if request.args.get('format', '').lower() == 'ndjson':
+        return True
+    return request.accept_mimetypes.best == 'application/x-ndjson'
+
+def _stream_response(batches, decorate=None):
+    """Devuelve una respuesta que escribe los lotes de filas a medida que se leen de la base de datos.
+
+    Por defecto genera un arreglo JSON; con NDJSON escribe un objeto JSON por línea. Si se
+    indica, `decorate(lote)` completa las filas de cada lote antes de serializarlas.
+    """
+    dumps = current_app.json.dumps
+    ndjson = _wants_ndjson()
+
+    def generate():
+        first = True
+        if not ndjson:
+            yield '['
+        try:
+            for batch in batches:
+                if decorate is not None:
+                    decorate(batch)
+                if ndjson:
+                    yield ''.join(dumps(row) + '\n' for row in batch)
+                else:
+                    chunk = ','.join(dumps(row) for row in batch)
+                    yield chunk if first else ',' + chunk
+                    first = False
+        except Exception as e:
+            # Las cabeceras ya se enviaron: sólo queda registrar el error y cortar la respuesta
+            logger.error("Error al transmitir la respuesta: %s", e)
+            return
+        if not ndjson:
+            yield ']'
+
+    response = Response(stream_with_context(generate()),
+                        mimetype='application/x-ndjson' if ndjson else 'application/json')
+    response.call_on_close(batches.close) # Devuelve la conexión al pool aunque el cliente corte
+    return response
+
+def _parse_datetime(value, name, end=False):
+    """Convierte un parámetro ISO 8601 en datetime. Con fecha sin hora y end=True devuelve el día siguiente."""
+    try:
+        if len(value) == 10:
+            parsed = datetime.combine(date.fromisoformat(value), datetime.min.time())
+            return parsed + timedelta(days=1) if end else parsed
+        return datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"El parámetro '{name}' debe ser una fecha ISO 8601 (AAAA-MM-DD o AAAA-MM-DDTHH:MM:SS).")
+
+def _parse_limit(args, config, default):
+    """Lee ?limit= y comprueba que esté entre 1 y TICKETS_MAX_PAGE_SIZE."""
+    limit = args.get('limit')
+    try:
+        limit = int(limit) if limit is not None else default
+    except ValueError:
+        raise ValueError("El parámetro 'limit' debe ser un número entero.")
+    if not 1 <= limit <= config['TICKETS_MAX_PAGE_SIZE']:
+        raise ValueError(f"El parámetro 'limit' debe estar entre 1 y {config['TICKETS_MAX_PAGE_SIZE']}.")
+    return limit
+
+def _blob_columns(table, config):
+    """Columnas binarias (p. ej. Signature) que los listados no incluyen salvo que se pidan en ?fields=.
+
+    Se detectan por el tipo que informa el driver o por TICKET_BLOB_COLUMNS; la columna de
+    versión (rowversion) no cuenta como blob.
+    """
+    configured = config.get('TICKET_BLOB_COLUMNS', ())
+    return [name for name, type_code in get_table_columns(table).items()
+            if name != config.get('TICKET_CHANGE_COLUMN')
+            and (name in configured or type_code in (bytes, bytearray, memoryview))]
+
+def _listed_blobs(table, args, config):
+    """Blobs sustituidos por `<columna>_url` en un listado (ninguno si se pidió ?fields=)."""
+    return [] if args.get('fields') else _blob_columns(table, config)
+
+def _select_columns(table, fields, config, required=('Number',)):
+    """Traduce ?fields= en (lista SELECT, nombres de las columnas devueltas).
+
+    Sin ?fields= se seleccionan todas las columnas salvo los blobs, de los que sólo se lee el
+    tamaño (`<columna>_size`). Las columnas de `required` se añaden siempre a la proyección.
+    """
+    columns = get_table_columns(table)
+    if fields:
+        selected = []
+        for field in fields.split(','):
+            field = field.strip()
+            if field not in columns:
+                raise ValueError(f"La columna '{field}' no existe en {table}.")
+            if field not in selected:
+                selected.append(field)
+        for field in reversed(required):
+            if field not in selected:
+                selected.insert(0, field)
+        return ', '.join(f"[{field}]" for field in selected), selected
+
+    blobs = _blob_columns(table, config)
+    names = [name for name in columns if name not in blobs]
+    expressions = [f"[{name}]" for name in names]
+    for blob in blobs:
+        expressions.append(f"DATALENGTH([{blob}]) AS [{blob}_size]")
+        names.append(f"{blob}_size")
+    return ', '.join(expressions), names
+
+def _add_blob_urls(rows, island, blobs):
+    """Añade a cada fila `<columna>_url` con la ruta que devuelve el blob (None si está vacío)."""
+    if not blobs:
+        return rows
+    base = url_for(f'api.get_{island}_tickets')
+    for row in rows:
+        for blob in blobs:
+            present = row.get(f"{blob}_size") is not None
+            row[f"{blob}_url"] = f"{base}/{row['Number']}/{blob.lower()}" if present else None
+    return rows
+
+def _ticket_selection(table, args, config, required=('Number',)):
+    """Traduce ?fields=, ?from=, ?to= y ?status= en (lista SELECT, condiciones WHERE, parámetros).
+
+    Las columnas de `required` se añaden siempre a la proyección. Lanza ValueError si algún
+    parámetro no es válido para la tabla.
+    """
+    columns = get_table_columns(table)
+    select_list, _ = _select_columns(table, args.get('fields'), config, required)
+
+    conditions = []
+    params = []
+    date_from = args.get('from')
+    date_to = args.get('to')
+    if date_from or date_to:
+        date_column = config['TICKET_DATE_COLUMN']
+        if date_column not in columns:
+            raise ValueError(f"La tabla {table} no tiene la columna de fecha '{date_column}'.")
+        if date_from:
+            conditions.append(f"[{date_column}] >= ?")
+            params.append(_parse_datetime(date_from, 'from'))
+        if date_to:
+            conditions.append(f"[{date_column}] < ?")
+            params.append(_parse_datetime(date_to, 'to', end=True))
+
+    status = args.get('status')
+    if status:
+        status_column = config['TICKET_STATUS_COLUMN']
+        if status_column not in columns:
+            raise ValueError(f"La tabla {table} no tiene la columna de estado '{status_column}'.")
+        values = [value.strip() for value in status.split(',') if value.strip()]
+        if not values:
+            raise ValueError("El parámetro 'status' no puede estar vacío.")
+        conditions.append(f"[{status_column}] IN ({', '.join('?' for _ in values)})")
+        params.extend(values)
+
+    return select_list, conditions, params
+
+def _build_ticket_query(table):
+    """Construye la consulta de listado a partir de ?fields=, ?after=, ?limit=, ?from=, ?to= y ?status=.
+
+    Devuelve (consulta, parámetros, límite); el límite es None si no se pidió paginación.
+    Lanza ValueError si algún parámetro no es válido.
+    """
+    config = current_app.config
+    select_list, conditions, params = _ticket_selection(table, request.args, config)
+
+    after = request.args.get('after')
+    if after is not None:
+        try:
+            params.insert(0, int(after))
+        except ValueError:
+            raise ValueError("El parámetro 'after' debe ser un número de ticket.")
+        conditions.insert(0, "[Number] > ?")
+
+    query = f"SELECT {select_list} FROM {table}"
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
+
+    if request.args.get('limit') is None and after is None:
+        return query, params, None
+    limit = _parse_limit(request.args, config, config['TICKETS_MAX_PAGE_SIZE'])
+    # Paginación por clave: el orden por Number hace que las páginas no se desplacen con nuevas inserciones
+    query += " ORDER BY [Number] OFFSET 0 ROWS FETCH NEXT ? ROWS ONLY"
+    params.append(limit + 1) # Una fila extra para saber si hay página siguiente
+    return query, params, limit
+
+def _list_tickets(table, island_name):
+    """Lista los tickets de la tabla de una isla.
+
+    Sin ?limit= ni ?after= la respuesta se transmite completa por partes; con paginación se
+    devuelve una página y las cabeceras X-Next-After y Link apuntan a la siguiente.
+    """
+    try:
+        query, params, limit = _build_ticket_query(table)
+    except ValueError as e:
+        logger.warning("Parámetros no válidos para %s: %s", table, e)
+        return jsonify({"message": str(e)}), 400
+    except HTTPException:
+        raise # 503 del control de admisión
+    except Exception as e:
+        logger.error("Error al obtener tickets de %s: %s", table, e)
+        return jsonify({"message": f"Error al obtener los tickets de {island_name}", "error": str(e)}), 500
+
+    island = island_name.lower()
+    blobs = _listed_blobs(table, request.args, current_app.config)
+    try:
+        if limit is None:
+            return _stream_response(stream_batches(query, tuple(params)),
+                                    decorate=lambda batch: _add_blob_urls(batch, island, blobs))
+        tickets = fetch_data(query, tuple(params))
+        has_more = len(tickets) > limit
+        tickets = _add_blob_urls(tickets[:limit], island, blobs)
+        response = jsonify(tickets)
+        if has_more:
+            next_after = tickets[-1]['Number']
+            args = request.args.to_dict()
+            args.update({'after': next_after, 'limit': limit})
+            response.headers['X-Next-After'] = str(next_after)
+            response.headers['Link'] = f'<{url_for(request.endpoint, _external=True, **args)}>; rel="next"'
+        return response
+    except HTTPException:
+        raise # 503 del control de admisión
+    except Exception as e:
+        logger.error("Error al obtener tickets de %s: %s", table, e)
+        return jsonify({"message": f"Error al obtener los tickets de {island_name}", "error": str(e)}), 500
+
 # --- Rutas para la tabla antigua_Ticket ---
 @api_bp.route('/antigua_tickets', methods=['GET'])
+@db_priority('low') # Listado masivo: cede el turno a las alertas
 def get_antigua_tickets():
     logger.info("Solicitud GET recibida para /api/antigua_tickets")
-    try:
-        query = "SELECT * FROM antigua_Ticket"
-        tickets = fetch_data(query)
-        return jsonify(tickets)
-    except Exception as e:
-        logger.error(f"Error al obtener tickets de antigua_Ticket: {e}")
-        return jsonify({"message": "Error al obtener los tickets de Antigua", "error": str(e)}), 500
+    return _list_tickets("antigua_Ticket", "Antigua")
 
 @api_bp.route('/antigua_tickets/<int:ticket_number>', methods=['GET'])
+@cached_response('ticket', tables=('antigua_Ticket',))
 def get_antigua_ticket_by_number(ticket_number):
-    logger.info(f"Solicitud GET recibida para /api/antigua_tickets/{ticket_number}")
+    logger.info("Solicitud GET recibida para /api/antigua_tickets/%s", ticket_number)
     try:
         query = "SELECT * FROM antigua_Ticket WHERE Number = ?"
         ticket = fetch_data(query, (ticket_number,))
         if ticket:
             return jsonify(ticket[0])
         else:
-            logger.warning(f"Ticket con Number {ticket_number} no encontrado en antigua_Ticket.")
+            logger.warning("Ticket con Number %s no encontrado en antigua_Ticket.", ticket_number)
             return jsonify({"message": "Ticket no encontrado"}), 404
+    except HTTPException:
+        raise # 503 del control de admisión
     except Exception as e:
-        logger.error(f"Error al obtener ticket con Number {ticket_number} de antigua_Ticket: {e}")
+        logger.error("Error al obtener ticket con Number %s de antigua_Ticket: %s", ticket_number, e)
         return jsonify({"message": "Error al obtener el ticket de Antigua", "error": str(e)}), 500
 
 # --- Rutas para la tabla dominica_Ticket ---
 @api_bp.route('/dominica_tickets', methods=['GET'])
+@db_priority('low') # Listado masivo: cede el turno a las alertas
 def get_dominica_tickets():
     logger.info("Solicitud GET recibida para /api/dominica_tickets")
-    try:
-        query = "SELECT * FROM dominica_Ticket"
-        tickets = fetch_data(query)
-        return jsonify(tickets)
-    except Exception as e:
-        logger.error(f"Error al obtener tickets de dominica_Ticket: {e}")
-        return jsonify({"message": "Error al obtener los tickets de Dominica", "error": str(e)}), 500
+    return _list_tickets("dominica_Ticket", "Dominica")
 
 @api_bp.route('/dominica_tickets/<int:ticket_number>', methods=['GET'])
+@cached_response('ticket', tables=('dominica_Ticket',))
 def get_dominica_ticket_by_number(ticket_number):
-    logger.info(f"Solicitud GET recibida para /api/dominica_tickets/{ticket_number}")
+    logger.info("Solicitud GET recibida para /api/dominica_tickets/%s", ticket_number)
     try:
         query = "SELECT * FROM dominica_Ticket WHERE Number = ?"
         ticket = fetch_data(query, (ticket_number,))
         if ticket:
             return jsonify(ticket[0])
         else:
-            logger.warning(f"Ticket con Number {ticket_number} no encontrado en dominica_Ticket.")
+            logger.warning("Ticket con Number %s no encontrado en dominica_Ticket.", ticket_number)
             return jsonify({"message": "Ticket no encontrado"}), 404
+    except HTTPException:
+        raise # 503 del control de admisión
     except Exception as e:
-        logger.error(f"Error al obtener ticket con Number {ticket_number} de dominica_Ticket: {e}")
+        logger.error("Error al obtener ticket con Number %s de dominica_Ticket: %s", ticket_number, e)
         return jsonify({"message": "Error al obtener el ticket de Dominica", "error": str(e)}), 500
 
 # --- Rutas para la tabla maartin_Ticket ---
 @api_bp.route('/maartin_tickets', methods=['GET'])
+@db_priority('low') # Listado masivo: cede el turno a las alertas
 def get_maartin_tickets():
     logger.info("Solicitud GET recibida para /api/maartin_tickets")
-    try:
-        query = "SELECT * FROM maartin_Ticket"
-        tickets = fetch_data(query)
-        return jsonify(tickets)
-    except Exception as e:
-        logger.error(f"Error al obtener tickets de maartin_Ticket: {e}")
-        return jsonify({"message": "Error al obtener los tickets de Maartin", "error": str(e)}), 500
+    return _list_tickets("maartin_Ticket", "Maartin")
 
 @api_bp.route('/maartin_tickets/<int:ticket_number>', methods=['GET'])
+@cached_response('ticket', tables=('maartin_Ticket',))
 def get_maartin_ticket_by_number(ticket_number):
-    logger.info(f"Solicitud GET recibida para /api/maartin_tickets/{ticket_number}")
+    logger.info("Solicitud GET recibida para /api/maartin_tickets/%s", ticket_number)
     try:
         query = "SELECT * FROM maartin_Ticket WHERE Number = ?"
         ticket = fetch_data(query, (ticket_number,))
         if ticket:
             return jsonify(ticket[0])
         else:
-            logger.warning(f"Ticket con Number {ticket_number} no encontrado en maartin_Ticket.")
+            logger.warning("Ticket con Number %s no encontrado en maartin_Ticket.", ticket_number)
             return jsonify({"message": "Ticket no encontrado"}), 404
+    except HTTPException:
+        raise # 503 del control de admisión
     except Exception as e:
-        logger.error(f"Error al obtener ticket con Number {ticket_number} de maartin_Ticket: {e}")
+        logger.error("Error al obtener ticket con Number %s de maartin_Ticket: %s", ticket_number, e)
         return jsonify({"message": "Error al obtener el ticket de Maartin", "error": str(e)}), 500
 
 
 # --- Rutas para la tabla Thomas_Ticket ---
 @api_bp.route('/thomas_tickets', methods=['GET'])
+@db_priority('low') # Listado masivo: cede el turno a las alertas
 def get_thomas_tickets():
     logger.info("Solicitud GET recibida para /api/thomas_tickets")
-    try:
-        query = "SELECT * FROM Thomas_Ticket"
-        tickets = fetch_data(query)
-        return jsonify(tickets)
-    except Exception as e:
-        logger.error(f"Error al obtener tickets de Thomas_Ticket: {e}")
-        return jsonify({"message": "Error al obtener los tickets de Thomas", "error": str(e)}), 500
+    return _list_tickets("Thomas_Ticket", "Thomas")
 
 @api_bp.route('/thomas_tickets/<int:ticket_number>', methods=['GET'])
+@cached_response('ticket', tables=('Thomas_Ticket',))
 def get_thomas_ticket_by_number(ticket_number):
-    logger.info(f"Solicitud GET recibida para /api/thomas_tickets/{ticket_number}")
+    logger.info("Solicitud GET recibida para /api/thomas_tickets/%s", ticket_number)
     try:
         query = "SELECT * FROM Thomas_Ticket WHERE Number = ?"
         ticket = fetch_data(query, (ticket_number,))
         if ticket:
             return jsonify(ticket[0])
         else:
-            logger.warning(f"Ticket con Number {ticket_number} no encontrado en Thomas_Ticket.")
+            logger.warning("Ticket con Number %s no encontrado en Thomas_Ticket.", ticket_number)
             return jsonify({"message": "Ticket no encontrado"}), 404
+    except HTTPException:
+        raise # 503 del control de admisión
     except Exception as e:
-        logger.error(f"Error al obtener ticket con Number {ticket_number} de Thomas_Ticket: {e}")
+        logger.error("Error al obtener ticket con Number %s de Thomas_Ticket: %s", ticket_number, e)
         return jsonify({"message": "Error al obtener el ticket de Thomas", "error": str(e)}), 500
 
 
+
+# --- Sincronización incremental de tickets por isla ---
+
+# Consulta del límite superior de cada ventana de cambios según el tipo de la columna de versión
+_CHANGE_BOUND_QUERIES = {
+    'rowversion': "SELECT MIN_ACTIVE_ROWVERSION() AS Bound", # Versiones menores ya están confirmadas
+    'datetime': "SELECT SYSUTCDATETIME() AS Bound",
+}
+
+def _parse_version(value, change_type):
+    """Convierte una versión de la marca de agua (texto) en el parámetro de la consulta."""
+    if change_type == 'rowversion':
+        return bytes.fromhex(value)
+    return datetime.fromisoformat(value)
+
+def _parse_watermark(value, change_type):
+    """Convierte ?since= en (versión, Number o None). Lanza ValueError si no es válido."""
+    version, _, number = value.partition('_')
+    try:
+        _parse_version(version, change_type)
+        return version, int(number) if number else None
+    except ValueError:
+        raise ValueError("El parámetro 'since' no es una marca de agua válida.")
+
+def _list_ticket_changes(table, island_name):
+    """Filas insertadas o modificadas y Numbers eliminados desde la marca de agua ?since=.
+
+    La marca de agua es la versión (rowversion o fecha de modificación, según TICKET_CHANGE_TYPE)
+    hasta la que el cliente tiene todos los cambios; si la respuesta se cortó por ?limit= lleva
+    además el último Number entregado. Las filas se devuelven en formato compacto (columnas y
+    arreglos de valores) y cada Number aparece como mucho una vez, en "rows" o en "deleted".
+    Sin ?since= se devuelve la tabla completa por páginas.
+    """
+    config = current_app.config
+    change_column = config['TICKET_CHANGE_COLUMN']
+    change_type = config['TICKET_CHANGE_TYPE']
+    try:
+        if change_column not in get_table_columns(table):
+            # Falta de configuración de la base de datos, no un fallo de la petición
+            logger.error("La tabla %s no tiene la columna de versión '%s'; ejecute sql/delta_sync.sql.",
+                         table, change_column)
+            return jsonify({"message": f"La sincronización incremental no está habilitada para los tickets de {island_name}."}), 501
+        since = request.args.get('since')
+        since = _parse_watermark(since, change_type) if since else None
+        limit = _parse_limit(request.args, config, config['TICKETS_MAX_PAGE_SIZE'])
+        select_list, columns = _select_columns(table, request.args.get('fields'), config,
+                                               required=('Number', change_column))
+        blobs = _listed_blobs(table, request.args, config)
+    except ValueError as e:
+        logger.warning("Parámetros no válidos para los cambios de %s: %s", table, e)
+        return jsonify({"message": str(e)}), 400
+    except HTTPException:
+        raise # 503 del control de admisión
+    except Exception as e:
+        logger.error("Error al obtener los cambios de %s: %s", table, e)
+        return jsonify({"message": f"Error al obtener los cambios de los tickets de {island_name}", "error": str(e)}), 500
+
+    try:
+        bound = fetch_data(_CHANGE_BOUND_QUERIES[change_type])[0]['Bound']
+
+        conditions = [f"[{change_column}] < ?"]
+        params = [_parse_version(bound, change_type)]
+        if since is not None:
+            version, number = since
+            if number is None:
+                conditions.append(f"[{change_column}] >= ?")
+                params.append(_parse_version(version, change_type))
+            else:
+                conditions.append(f"([{change_column}] > ? OR ([{change_column}] = ? AND [Number] > ?))")
+                params.extend((_parse_version(version, change_type), _parse_version(version, change_type), number))
+        query = (f"SELECT {select_list} FROM {table} WHERE {' AND '.join(conditions)} "
+                 f"ORDER BY [{change_column}], [Number] OFFSET 0 ROWS FETCH NEXT ? ROWS ONLY")
+        params.append(limit + 1)
+        rows = fetch_data(query, tuple(params))
+
+        has_more = len(rows) > limit
+        if has_more:
+            rows = rows[:limit]
+            last = rows[-1]
+            upper = last[change_column]
+            watermark = f"{upper}_{last['Number']}"
+        else:
+            upper = bound
+            watermark = bound
+
+        deleted = {}
+        if since is not None:
+            tombstone_column = config['TICKET_TOMBSTONE_COLUMN']
+            tombstones = fetch_data(
+                f"SELECT [Number], [{tombstone_column}] AS Version FROM {config['TICKET_TOMBSTONE_TABLE']} "
+                f"WHERE [TableName] = ? AND [{tombstone_column}] >= ? AND [{tombstone_column}] < ?",
+                (table, _parse_version(since[0], change_type), _parse_version(upper, change_type)),
+            )
+            for tombstone in tombstones:
+                if tombstone['Version'] > deleted.get(tombstone['Number'], ''):
+                    deleted[tombstone['Number']] = tombstone['Version']
+            if deleted:
+                # Prevalece el cambio más reciente de cada Number: borrado o fila reinsertada
+                kept = []
+                for row in rows:
+                    deleted_version = deleted.get(row['Number'])
+                    if deleted_version is None or row[change_column] > deleted_version:
+                        deleted.pop(row['Number'], None)
+                        kept.append(row)
+                rows = kept
+    except HTTPException:
+        raise # 503 del control de admisión
+    except Exception as e:
+        logger.error("Error al obtener los cambios de %s: %s", table, e)
+        return jsonify({"message": f"Error al obtener los cambios de los tickets de {island_name}", "error": str(e)}), 500
+
+    _add_blob_urls(rows, island_name.lower(), blobs)
+    columns = columns + [f"{blob}_url" for blob in blobs]
+    logger.info("Cambios de %s desde %s: %s filas y %s eliminados.", table, since, len(rows), len(deleted))
+    return jsonify({
+        "columns": columns,
+        "rows": [list(row.values()) for row in rows],
+        "deleted": sorted(deleted),
+        "watermark": watermark,
+        "has_more": has_more,
+    })
+
+@api_bp.route('/<any(antigua, dominica, maartin, thomas):island>_tickets/changes', methods=['GET'])
+def get_island_ticket_changes(island):
+    logger.info("Solicitud GET recibida para /api/%s_tickets/changes", island)
+    return _list_ticket_changes(ISLAND_TABLES[island], island.capitalize())
+
+
+# --- Blobs de los tickets (firma) ---
+
+# Firmas de los formatos de archivo más comunes: (prefijo, tipo de contenido)
+_MAGIC_NUMBERS = (
+    (b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (b'\xff\xd8\xff', 'image/jpeg'),
+    (b'GIF87a', 'image/gif'),
+    (b'GIF89a', 'image/gif'),
+    (b'BM', 'image/bmp'),
+    (b'%PDF-', 'application/pdf'),
+)
+
+def _sniff_mimetype(head):
+    """Deduce el tipo de contenido a partir de los primeros bytes del blob."""
+    for magic, mimetype in _MAGIC_NUMBERS:
+        if head.startswith(magic):
+            return mimetype
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return 'image/webp'
+    return 'application/octet-stream'
+
+def _blob_chunks(table, column, ticket_number, first_chunk, size, chunk_size, version_column=None, version=None):
+    """Lee el resto del blob por partes con SUBSTRING, sin cargarlo entero en memoria.
+
+    Si la tabla tiene columna de versión, cada parte exige la misma versión que la primera
+    lectura: si la fila se modifica a mitad de la descarga no se mezclan dos versiones del blob.
+    """
+    yield first_chunk
+    query = f"SELECT SUBSTRING([{column}], ?, ?) AS Chunk FROM {table} WHERE Number = ?"
+    params = (ticket_number,)
+    if version_column is not None:
+        query += f" AND [{version_column}] = ?"
+        params += (version,)
+    offset = len(first_chunk)
+    while offset < size:
+        rows = fetch_data(query, (offset + 1, chunk_size) + params, raw=True)
+        chunk = rows[0][0] if rows else None
+        if not chunk:
+            logger.error("El blob %s de %s %s cambió durante la descarga.", column, table, ticket_number)
+            return
+        yield bytes(chunk)
+        offset += len(chunk)
+
+@api_bp.route('/<any(antigua, dominica, maartin, thomas):island>_tickets/<int:ticket_number>/<column>', methods=['GET'])
+def get_ticket_blob(island, ticket_number, column):
+    """Devuelve un blob de un ticket (p. ej. /signature) en binario, transmitido por partes."""
+    logger.info("Solicitud GET recibida para /api/%s_tickets/%s/%s", island, ticket_number, column)
+    config = current_app.config
+    table = ISLAND_TABLES[island]
+    try:
+        blob = next((name for name in _blob_columns(table, config) if name.lower() == column.lower()), None)
+        if blob is None:
+            return jsonify({"message": f"La tabla {table} no tiene la columna binaria '{column}'."}), 404
+        chunk_size = config.get('TICKET_BLOB_CHUNK_SIZE', 65536)
+        version = config.get('TICKET_CHANGE_COLUMN')
+        version_select = f", [{version}] AS Version" if version in get_table_columns(table) else ""
+        rows = fetch_data(
+            f"SELECT DATALENGTH([{blob}]) AS Size, SUBSTRING([{blob}], 1, ?) AS Head{version_select} "
+            f"FROM {table} WHERE Number = ?",
+            (chunk_size, ticket_number), raw=True,
+        )
+    except HTTPException:
+        raise # 503 del control de admisión
+    except Exception as e:
+        logger.error("Error al obtener %s del ticket %s de %s: %s", column, ticket_number, table, e)
+        return jsonify({"message": f"Error al obtener el archivo del ticket de {island.capitalize()}", "error": str(e)}), 500
+    if not rows:
+        return jsonify({"message": "Ticket no encontrado"}), 404
+    size, head = rows[0][0], rows[0][1]
+    if size is None:
+        return jsonify({"message": f"El ticket no tiene {blob}."}), 404
+    head = bytes(head)
+
+    chunks = _blob_chunks(table, blob, ticket_number, head, size, chunk_size,
+                          *((version, rows[0][2]) if version_select else ()))
+    response = Response(stream_with_context(chunks), mimetype=_sniff_mimetype(head))
+    response.content_length = size
+    response.headers['X-Content-Type-Options'] = 'nosniff'
+    response.headers['Cache-Control'] = f"private, max-age={int(config.get('TICKET_BLOB_MAX_AGE', 300))}"
+    if version_select:
+        response.set_etag(bytes(rows[0][2]).hex()) # La rowversion cambia con cada modificación de la fila
+        response.make_conditional(request)
+    return response
+
+# --- Consulta conjunta de tickets de todas las islas ---
+
+# Hilos del proceso para consultar las islas en paralelo (se crean en el primer uso)
+_island_executor = None
+_island_executor_lock = threading.Lock()
+
+def _get_island_executor():
+    global _island_executor
+    if _island_executor is None:
+        with _island_executor_lock:
+            if _island_executor is None:
+                _island_executor = ThreadPoolExecutor(
+                    max_workers=current_app.config.get('CROSS_ISLAND_MAX_WORKERS', 16),
+                    thread_name_prefix='island-query',
+                )
+    return _island_executor
+
+def _reset_after_fork():
+    # Los hilos del pool no sobreviven al fork: el proceso hijo crea los suyos en el primer uso
+    global _island_executor, _island_executor_lock
+    _island_executor = None
+    _island_executor_lock = threading.Lock()
+
+if hasattr(os, 'register_at_fork'): # No existe en Windows
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+def _run_island_query(started, island, *args):
+    """Ejecuta _fetch_island_tickets anotando cuándo empezó, para medir el tiempo de espera desde ahí."""
+    started[island] = time.monotonic()
+    return _fetch_island_tickets(*args)
+
+def _wait_islands(futures, started, timeout, submitted):
+    """Espera las consultas de las islas de una petición y devuelve (terminadas, agotadas).
+
+    Cada consulta dispone de `timeout` segundos desde que empezó; la que no obtuvo hilo en
+    `timeout` segundos desde `submitted` (el pool compartido está ocupado) se cancela sin
+    ejecutarse. Las que siguen en curso al agotarse su tiempo terminan en segundo plano,
+    acotadas por el tiempo máximo por sentencia que fija _fetch_island_tickets, y se descartan.
+    """
+    pending = set(futures)
+    expired = set()
+    while pending:
+        now = time.monotonic()
+        deadlines = [started[futures[f]] + timeout if futures[f] in started else submitted + timeout for f in pending]
+        _, pending = wait(pending, timeout=max(0.0, min(deadlines) - now), return_when=FIRST_COMPLETED)
+        now = time.monotonic()
+        late = set()
+        for f in pending:
+            island = futures[f]
+            if island in started:
+                if started[island] + timeout <= now:
+                    late.add(f)
+            elif submitted + timeout <= now and f.cancel():
+                late.add(f)
+        expired |= late
+        pending -= late
+    return [f for f in futures if f not in expired], expired
+
+def _fetch_island_tickets(app, island, args, sort, descending, limit, priority):
+    """Consulta los primeros `limit` tickets de una isla según el orden pedido (se ejecuta en un hilo del pool)."""
+    with app.app_context():
+        g.db_priority = priority # La misma prioridad que la petición que la lanzó
+        # Una consulta que supera CROSS_ISLAND_TIMEOUT se descarta: que no siga ocupando conexión y plaza
+        g.db_timeout = max(1, math.ceil(app.config.get('CROSS_ISLAND_TIMEOUT', 10)))
+        table = ISLAND_TABLES[island]
+        select_list, conditions, params = _ticket_selection(table, args, app.config, required=('Number', sort))
+        query = f"SELECT {select_list} FROM {table}"
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        direction = 'DESC' if descending else 'ASC'
+        order_by = f"[{sort}] {direction}" if sort == 'Number' else f"[{sort}] {direction}, [Number] {direction}"
+        query += f" ORDER BY {order_by} OFFSET 0 ROWS FETCH NEXT ? ROWS ONLY"
+        params.append(limit)
+        return fetch_data(query, tuple(params))
+
+def _sort_tickets(tickets, sort, descending):
+    """Ordena los tickets por la columna pedida; los nulos van siempre al final."""
+    present = [row for row in tickets if row.get(sort) is not None]
+    missing = [row for row in tickets if row.get(sort) is None]
+    try:
+        present.sort(key=lambda row: row[sort], reverse=descending)
+    except TypeError:
+        # Tipos distintos entre islas: se comparan como texto
+        present.sort(key=lambda row: str(row[sort]), reverse=descending)
+    return present + missing
+
+@api_bp.route('/tickets', methods=['GET'])
+@db_priority('low')
+def get_all_tickets():
+    """Tickets de las cuatro islas consultadas en paralelo, etiquetados con su isla y ordenados globalmente.
+
+    Admite ?limit=, ?sort=<columna>, ?order=asc|desc, ?islands=a,b y los filtros de los listados por isla.
+    Si una isla falla o supera CROSS_ISLAND_TIMEOUT, se devuelven las demás y su error en "errors".
+    """
+    logger.info("Solicitud GET recibida para /api/tickets")
+    config = current_app.config
+    try:
+        limit = _parse_limit(request.args, config, 100)
+        sort = request.args.get('sort', 'Number')
+        order = request.args.get('order', 'desc').lower()
+        if order not in ('asc', 'desc'):
+            raise ValueError("El parámetro 'order' debe ser 'asc' o 'desc'.")
+        islands = [island.strip().lower() for island in request.args.get('islands', ','.join(ISLAND_TABLES)).split(',') if island.strip()]
+        for island in islands:
+            if island not in ISLAND_TABLES:
+                raise ValueError(f"Isla desconocida: '{island}'.")
+        if not islands:
+            raise ValueError("El parámetro 'islands' no puede estar vacío.")
+        # Se validan aquí la columna de orden y los filtros de cada isla, antes de lanzar las consultas
+        for island in islands:
+            table = ISLAND_TABLES[island]
+            if sort not in get_table_columns(table):
+                raise ValueError(f"La columna '{sort}' no existe en {table}.")
+            _ticket_selection(table, request.args, config, required=('Number', sort))
+    except ValueError as e:
+        logger.warning("Parámetros no válidos para /api/tickets: %s", e)
+        return jsonify({"message": str(e)}), 400
+    except HTTPException:
+        raise # 503 del control de admisión
+    except Exception as e:
+        logger.error("Error al validar los parámetros de /api/tickets: %s", e)
+        return jsonify({"message": "Error al obtener los tickets de las islas", "error": str(e)}), 500
+
+    app = current_app._get_current_object()
+    args = request.args.to_dict()
+    executor = _get_island_executor()
+    started = {}
+    submitted = time.monotonic()
+    futures = {
+        executor.submit(_run_island_query, started, island,
+                        app, island, args, sort, order == 'desc', limit, current_priority()): island
+        for island in islands
+    }
+    done, not_done = _wait_islands(futures, started, config.get('CROSS_ISLAND_TIMEOUT', 10), submitted)
+
+    tickets = []
+    errors = {}
+    rejected = None
+    for future in not_done:
+        errors[futures[future]] = "Tiempo de espera agotado."
+    for future in done:
+        island = futures[future]
+        try:
+            rows = future.result()
+        except Exception as e:
+            logger.error("Error al obtener tickets de %s: %s", ISLAND_TABLES[island], e)
+            errors[island] = str(e)
+            if isinstance(e, HTTPException):
+                rejected = e
+            continue
+        for row in rows:
+            row['island'] = island
+        tickets.extend(_add_blob_urls(rows, island, _listed_blobs(ISLAND_TABLES[island], args, config)))
+
+    if errors and len(errors) == len(islands):
+        if rejected is not None:
+            raise rejected # Base de datos saturada: 503 con Retry-After en lugar de 500
+        return jsonify({"message": "Error al obtener los tickets de las islas", "errors": errors}), 500
+    if errors:
+        logger.warning("Respuesta parcial en /api/tickets: %s", errors)
+    tickets = _sort_tickets(tickets, sort, order == 'desc')
+    return jsonify({"tickets": tickets[:limit], "errors": errors})
+
+
+@api_bp.route('/tickets/summary', methods=['GET'])
+def get_tickets_summary():
+    """Conteos de tickets por isla, estado y día para los paneles.
+
+    Se sirve la última instantánea calculada en segundo plano (ver ticket_summary.py); su
+    campo "generated_at" indica cuándo se generó.
+    """
+    logger.info("Solicitud GET recibida para /api/tickets/summary")
+    app = current_app._get_current_object()
+    try:
+        summary = get_ticket_summary(app, ISLAND_TABLES)
+        snapshot = summary.get()
+    except HTTPException:
+        raise # 503 del control de admisión
+    except Exception as e:
+        logger.error("Error al obtener el resumen de tickets: %s", e)
+        return jsonify({"message": "Error al obtener el resumen de tickets", "error": str(e)}), 500
+
+    # Variante según Accept-Encoding con su propio ETag, para que If-None-Match coincida también comprimida
+    response = send_cached(snapshot.entry, current_app.config)
+    response.last_modified = snapshot.generated_at
+    # El navegador puede reutilizarla hasta el próximo recálculo
+    response.headers['Cache-Control'] = f"private, max-age={max(0, int(summary.interval - snapshot.age))}"
+    return response
+
 # --- Endpoints de ejemplo pre-existentes (mantener si son necesarios) ---
 
 # Endpoint para obtener todos los ítems
@@ -128,24 +762,28 @@ def get_items():
         query = "SELECT Id, Name, Description FROM Items" # Ajusta tu tabla y columnas
         items = fetch_data(query)
         return jsonify(items)
+    except HTTPException:
+        raise # 503 del control de admisión
     except Exception as e:
-        logger.error(f"Error al obtener ítems: {e}")
+        logger.error("Error al obtener ítems: %s", e)
         return jsonify({"message": "Error al obtener los ítems", "error": str(e)}), 500
 
 # Endpoint para obtener un ítem por ID
 @api_bp.route('/items/<int:item_id>', methods=['GET'])
 def get_item(item_id):
-    logger.info(f"Solicitud GET recibida para /api/items/{item_id}")
+    logger.info("Solicitud GET recibida para /api/items/%s", item_id)
     try:
         query = "SELECT Id, Name, Description FROM Items WHERE Id = ?"
         item = fetch_data(query, (item_id,))
         if item:
             return jsonify(item[0])
         else:
-            logger.warning(f"Ítem con ID {item_id} no encontrado.")
+            logger.warning("Ítem con ID %s no encontrado.", item_id)
             return jsonify({"message": "Ítem no encontrado"}), 404
+    except HTTPException:
+        raise # 503 del control de admisión
     except Exception as e:
-        logger.error(f"Error al obtener ítem con ID {item_id}: {e}")
+        logger.error("Error al obtener ítem con ID %s: %s", item_id, e)
         return jsonify({"message": "Error al obtener el ítem", "error": str(e)}), 500
 
 # Endpoint para añadir un nuevo ítem
@@ -165,20 +803,22 @@ def add_item():
         rows_affected = execute_query(query, (name, description))
         
         if rows_affected > 0:
-            logger.info(f"Ítem '{name}' añadido exitosamente.")
+            logger.info("Ítem '%s' añadido exitosamente.", name)
             return jsonify({"message": "Ítem añadido exitosamente", "name": name}), 201
         else:
-            logger.error(f"No se pudo añadir el ítem '{name}'. Filas afectadas: {rows_affected}")
+            logger.error("No se pudo añadir el ítem '%s'. Filas afectadas: %s", name, rows_affected)
             return jsonify({"message": "No se pudo añadir el ítem"}), 500
 
+    except HTTPException:
+        raise # 503 del control de admisión
     except Exception as e:
-        logger.error(f"Error al añadir ítem: {e}")
+        logger.error("Error al añadir ítem: %s", e)
         return jsonify({"message": "Error al añadir el ítem", "error": str(e)}), 500
 
 # Endpoint para actualizar un ítem
 @api_bp.route('/items/<int:item_id>', methods=['PUT'])
 def update_item(item_id):
-    logger.info(f"Solicitud PUT recibida para /api/items/{item_id}")
+    logger.info("Solicitud PUT recibida para /api/items/%s", item_id)
     try:
         data = request.get_json()
         name = data.get('name')
@@ -206,29 +846,217 @@ def update_item(item_id):
         rows_affected = execute_query(query, tuple(params))
 
         if rows_affected > 0:
-            logger.info(f"Ítem con ID {item_id} actualizado exitosamente.")
+            logger.info("Ítem con ID %s actualizado exitosamente.", item_id)
             return jsonify({"message": "Ítem actualizado exitosamente"}), 200
         else:
-            logger.warning(f"Ítem con ID {item_id} no encontrado para actualizar o no se realizaron cambios.")
+            logger.warning("Ítem con ID %s no encontrado para actualizar o no se realizaron cambios.", item_id)
             return jsonify({"message": "Ítem no encontrado o no se realizaron cambios"}), 404
+    except HTTPException:
+        raise # 503 del control de admisión
     except Exception as e:
-        logger.error(f"Error al actualizar ítem con ID {item_id}: {e}")
+        logger.error("Error al actualizar ítem con ID %s: %s", item_id, e)
         return jsonify({"message": "Error al actualizar el ítem", "error": str(e)}), 500
 
 # Endpoint para eliminar un ítem
 @api_bp.route('/items/<int:item_id>', methods=['DELETE'])
 def delete_item(item_id):
-    logger.info(f"Solicitud DELETE recibida para /api/items/{item_id}")
+    logger.info("Solicitud DELETE recibida para /api/items/%s", item_id)
     try:
         query = "DELETE FROM Items WHERE Id = ?"
         rows_affected = execute_query(query, (item_id,))
 
         if rows_affected > 0:
-            logger.info(f"Ítem con ID {item_id} eliminado exitosamente.")
+            logger.info("Ítem con ID %s eliminado exitosamente.", item_id)
             return jsonify({"message": "Ítem eliminado exitosamente"}), 200
         else:
-            logger.warning(f"Ítem con ID {item_id} no encontrado para eliminar.")
+            logger.warning("Ítem con ID %s no encontrado para eliminar.", item_id)
             return jsonify({"message": "Ítem no encontrado"}), 404
+    except HTTPException:
+        raise # 503 del control de admisión
+    except Exception as e:
+        logger.error("Error al eliminar ítem con ID %s: %s", item_id, e)
+        return jsonify({"message": "Error al eliminar el ítem", "error": str(e)}), 500
+
+# --- Operaciones masivas sobre Items ---
+
+# Máximo de parámetros por cláusula IN (SQL Server admite 2100 parámetros por sentencia)
+_IN_CHUNK_SIZE = 1000
+
+def _batch_payload(key):
+    """Devuelve la lista de la petición (un arreglo JSON o {key: [...]}) o lanza ValueError."""
+    data = request.get_json(silent=True)
+    if isinstance(data, dict):
+        data = data.get(key)
+    if not isinstance(data, list) or not data:
+        raise ValueError(f"Se esperaba un arreglo JSON no vacío (o un objeto con la clave '{key}').")
+    max_rows = current_app.config.get('ITEMS_BATCH_MAX_ROWS', 50000)
+    if len(data) > max_rows:
+        raise ValueError(f"Se admiten como máximo {max_rows} filas por petición.")
+    return data
+
+def _existing_item_ids(tx, ids):
+    """Devuelve el conjunto de Ids de Items que existen, consultando por bloques dentro de la transacción."""
+    existing = set()
+    ids = list(ids)
+    for start in range(0, len(ids), _IN_CHUNK_SIZE):
+        chunk = ids[start:start + _IN_CHUNK_SIZE]
+        query = f"SELECT Id FROM Items WHERE Id IN ({', '.join('?' for _ in chunk)})"
+        existing.update(tx.fetch_column(query, tuple(chunk)))
+    return existing
+
+def _batch_response(results, ok_status):
+    """Resumen y resultado por fila; 400 sólo si ninguna fila se aplicó y alguna no era válida.
+
+    Un lote válido cuyos ítems no existen (todos 'not_found') responde 200 con sus resultados.
+    """
+    summary = {}
+    for result in results:
+        summary[result['status']] = summary.get(result['status'], 0) + 1
+    logger.info("Operación masiva sobre Items completada: %s", summary)
+    status = 400 if 'error' in summary and ok_status not in summary else 200
+    return jsonify({"summary": summary, "results": results}), status
+
+def _item_id(value):
+    if isinstance(value, bool) or not isinstance(value, int):
+        raise ValueError("El campo 'id' debe ser un número entero.")
+    return value
+
+def _item_text(item, field):
+    """Valor de texto opcional de un elemento del lote; lanza ValueError si no es una cadena."""
+    value = item.get(field)
+    if value is not None and not isinstance(value, str):
+        raise ValueError(f"El campo '{field}' debe ser una cadena de texto.")
+    return value
+
+# Endpoint para añadir ítems en bloque
+@api_bp.route('/items/batch', methods=['POST'])
+def add_items_batch():
+    logger.info("Solicitud POST recibida para /api/items/batch")
+    try:
+        items = _batch_payload('items')
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+
+    results = []
+    rows = []
+    for index, item in enumerate(items):
+        # Los valores se validan aquí: un tipo inválido haría fallar la transacción de todo el lote
+        try:
+            if not isinstance(item, dict):
+                raise ValueError("Cada elemento debe ser un objeto JSON.")
+            name = _item_text(item, 'name')
+            if not name:
+                raise ValueError("Nombre del ítem es requerido")
+            description = _item_text(item, 'description')
+        except ValueError as e:
+            results.append({"index": index, "status": "error", "message": str(e)})
+            continue
+        rows.append((name, description))
+        results.append({"index": index, "status": "created"})
+
+    try:
+        if rows:
+            with transaction() as tx:
+                tx.execute_many("INSERT INTO Items (Name, Description) VALUES (?, ?)", rows)
+    except HTTPException:
+        raise # 503 del control de admisión
+    except Exception as e:
+        logger.error("Error al añadir ítems en bloque: %s", e)
+        return jsonify({"message": "Error al añadir los ítems; no se guardó ninguno", "error": str(e)}), 500
+    return _batch_response(results, "created")
+
+# Endpoint para actualizar ítems en bloque
+@api_bp.route('/items/batch', methods=['PATCH'])
+def update_items_batch():
+    logger.info("Solicitud PATCH recibida para /api/items/batch")
+    try:
+        items = _batch_payload('items')
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+
+    results = [None] * len(items)
+    pending = {} # Id -> (índice, {columna: valor})
+    for index, item in enumerate(items):
+        try:
+            if not isinstance(item, dict):
+                raise ValueError("Cada elemento debe ser un objeto JSON.")
+            item_id = _item_id(item.get('id'))
+            if item_id in pending:
+                raise ValueError(f"El ítem con ID {item_id} aparece más de una vez.")
+            updates = {}
+            name = _item_text(item, 'name')
+            if name:
+                updates['Name'] = name
+            description = _item_text(item, 'description')
+            if description:
+                updates['Description'] = description
+            if not updates:
+                raise ValueError("Proporcione al menos un campo (nombre o descripción) para actualizar")
+        except ValueError as e:
+            results[index] = {"index": index, "status": "error", "message": str(e)}
+            continue
+        pending[item_id] = (index, updates)
+
+    try:
+        if pending:
+            with transaction() as tx:
+                existing = _existing_item_ids(tx, pending)
+                # Agrupa las filas por columnas modificadas para usar una sentencia por grupo
+                groups = {}
+                for item_id, (index, updates) in pending.items():
+                    if item_id not in existing:
+                        results[index] = {"index": index, "id": item_id, "status": "not_found"}
+                        continue
+                    columns = tuple(sorted(updates))
+                    groups.setdefault(columns, []).append(tuple(updates[column] for column in columns) + (item_id,))
+                    results[index] = {"index": index, "id": item_id, "status": "updated"}
+                for columns, rows in groups.items():
+                    query = f"UPDATE Items SET {', '.join(f'{column} = ?' for column in columns)} WHERE Id = ?"
+                    tx.execute_many(query, rows)
+    except HTTPException:
+        raise # 503 del control de admisión
+    except Exception as e:
+        logger.error("Error al actualizar ítems en bloque: %s", e)
+        return jsonify({"message": "Error al actualizar los ítems; no se guardó ningún cambio", "error": str(e)}), 500
+    return _batch_response(results, "updated")
+
+# Endpoint para eliminar ítems en bloque
+@api_bp.route('/items/batch', methods=['DELETE'])
+def delete_items_batch():
+    logger.info("Solicitud DELETE recibida para /api/items/batch")
+    try:
+        ids = _batch_payload('ids')
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+
+    results = [None] * len(ids)
+    pending = {} # Id -> índice
+    for index, value in enumerate(ids):
+        try:
+            item_id = _item_id(value)
+            if item_id in pending:
+                raise ValueError(f"El ítem con ID {item_id} aparece más de una vez.")
+        except ValueError as e:
+            results[index] = {"index": index, "status": "error", "message": str(e)}
+            continue
+        pending[item_id] = index
+
+    try:
+        if pending:
+            with transaction() as tx:
+                existing = _existing_item_ids(tx, pending)
+                rows = []
+                for item_id, index in pending.items():
+                    if item_id in existing:
+                        rows.append((item_id,))
+                        results[index] = {"index": index, "id": item_id, "status": "deleted"}
+                    else:
+                        results[index] = {"index": index, "id": item_id, "status": "not_found"}
+                if rows:
+                    tx.execute_many("DELETE FROM Items WHERE Id = ?", rows)
+    except HTTPException:
+        raise # 503 del control de admisión
     except Exception as e:
-        logger.error(f"Error al eliminar ítem con ID {item_id}: {e}")
-        return jsonify({"message": "Error al eliminar el ítem", "error": str(e)}), 500
\ No newline at end of file
+        logger.error("Error al eliminar ítems en bloque: %s", e)
+        return jsonify({"message": "Error al eliminar los ítems; no se eliminó ninguno", "error": str(e)}), 500
+    return _batch_response(results, "deleted")
@@ -0,0 +1,65 @@
+-- Seguimiento de cambios para /api/<isla>_tickets/changes
+--
+-- 1) Una columna rowversion en cada tabla de tickets. SQL Server le asigna un valor nuevo,
+--    único en toda la base de datos, en cada INSERT y UPDATE.
+-- 2) Una tabla de lápidas (TicketTombstone) que los triggers AFTER DELETE llenan con el Number
+--    de cada ticket eliminado. Su rowversion sale del mismo contador, así que filas y borrados
+--    se comparan con la misma marca de agua.
+--
+-- Las lápidas se pueden purgar periódicamente (ver el final del archivo); un cliente que lleve
+-- sin sincronizar más tiempo que la retención debe descargar la tabla de nuevo (sin ?since=).
+
+-- --- Columna de versión e índice en cada tabla de tickets ---
+ALTER TABLE dbo.antigua_Ticket ADD RowVer rowversion NOT NULL;
+CREATE INDEX IX_antigua_Ticket_RowVer ON dbo.antigua_Ticket (RowVer, Number);
+
+ALTER TABLE dbo.dominica_Ticket ADD RowVer rowversion NOT NULL;
+CREATE INDEX IX_dominica_Ticket_RowVer ON dbo.dominica_Ticket (RowVer, Number);
+
+ALTER TABLE dbo.maartin_Ticket ADD RowVer rowversion NOT NULL;
+CREATE INDEX IX_maartin_Ticket_RowVer ON dbo.maartin_Ticket (RowVer, Number);
+
+ALTER TABLE dbo.Thomas_Ticket ADD RowVer rowversion NOT NULL;
+CREATE INDEX IX_Thomas_Ticket_RowVer ON dbo.Thomas_Ticket (RowVer, Number);
+GO
+
+-- --- Lápidas de los tickets eliminados ---
+CREATE TABLE dbo.TicketTombstone (
+    TableName sysname NOT NULL,
+    Number int NOT NULL,
+    RowVer rowversion NOT NULL,
+    DeletedAt datetime2 NOT NULL CONSTRAINT DF_TicketTombstone_DeletedAt DEFAULT SYSUTCDATETIME(),
+    CONSTRAINT PK_TicketTombstone PRIMARY KEY (TableName, RowVer)
+);
+GO
+
+CREATE TRIGGER dbo.TR_antigua_Ticket_Delete ON dbo.antigua_Ticket AFTER DELETE AS
+BEGIN
+    SET NOCOUNT ON;
+    INSERT INTO dbo.TicketTombstone (TableName, Number) SELECT 'antigua_Ticket', Number FROM deleted;
+END
+GO
+
+CREATE TRIGGER dbo.TR_dominica_Ticket_Delete ON dbo.dominica_Ticket AFTER DELETE AS
+BEGIN
+    SET NOCOUNT ON;
+    INSERT INTO dbo.TicketTombstone (TableName, Number) SELECT 'dominica_Ticket', Number FROM deleted;
+END
+GO
+
+CREATE TRIGGER dbo.TR_maartin_Ticket_Delete ON dbo.maartin_Ticket AFTER DELETE AS
+BEGIN
+    SET NOCOUNT ON;
+    INSERT INTO dbo.TicketTombstone (TableName, Number) SELECT 'maartin_Ticket', Number FROM deleted;
+END
+GO
+
+CREATE TRIGGER dbo.TR_Thomas_Ticket_Delete ON dbo.Thomas_Ticket AFTER DELETE AS
+BEGIN
+    SET NOCOUNT ON;
+    INSERT INTO dbo.TicketTombstone (TableName, Number) SELECT 'Thomas_Ticket', Number FROM deleted;
+END
+GO
+
+-- --- Purga de lápidas (programar, p. ej., como trabajo diario del Agente SQL) ---
+-- DELETE FROM dbo.TicketTombstone WHERE DeletedAt < DATEADD(day, -30, SYSUTCDATETIME());
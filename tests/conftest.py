@@ -0,0 +1,55 @@
+import os
+import sys
+
+import pytest
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(TESTS_DIR)
+sys.path.insert(0, REPO_DIR)
+sys.path.insert(0, os.path.join(REPO_DIR, 'benchmarks'))
+
+from standin_db import StandInDatabase  # noqa: E402
+
+
+@pytest.fixture
+def standin_db(tmp_path):
+    """Base sqlite pequeña con las tablas de la aplicación (ver benchmarks/standin_db.py)."""
+    db = StandInDatabase(str(tmp_path / 'standin.sqlite'))
+    db.seed(tickets=20, alerts=10, items=10, signature_bytes=64)
+    return db
+
+
+@pytest.fixture
+def make_app(standin_db, monkeypatch):
+    """Crea la aplicación sobre `standin_db` con la configuración de desarrollo y `overrides`.
+
+    Necesita pyodbc (lo importa database.py). Los objetos que la aplicación crea en el primer
+    uso (pool, control de admisión, columnas, cachés, hilos) se descartan antes y después.
+    """
+    pytest.importorskip('pyodbc', exc_type=ImportError) # Necesita el driver ODBC del sistema
+    import alerts_stream
+    import cache
+    import database
+    import routes
+    import ticket_summary
+    from app import create_app
+    from config import DevelopmentConfig
+
+    def reset():
+        database.close_pool()
+        monkeypatch.setattr(database, '_admission', None)
+        monkeypatch.setattr(database, '_breaker', None)
+        monkeypatch.setattr(database, '_table_columns', {})
+        monkeypatch.setattr(cache, '_cache', None)
+        monkeypatch.setattr(alerts_stream, '_broadcaster', None)
+        monkeypatch.setattr(ticket_summary, '_summary', None)
+        monkeypatch.setattr(routes, '_island_executor', None)
+
+    def factory(**overrides):
+        reset()
+        settings = {'DB_CONNECT_FUNCTION': staticmethod(standin_db.connect), 'LOG_HANDLER': 'stdout'}
+        settings.update(overrides)
+        return create_app(type('TestConfig', (DevelopmentConfig,), settings))
+
+    yield factory
+    database.close_pool()
@@ -0,0 +1,242 @@
+import threading
+import time
+
+import pytest
+
+from admission import AdmissionController, AdmissionRejected, CircuitBreaker, CircuitOpenError
+
+
+def _acquire_in_thread(controller, priority, results, timeout=1.0):
+    """Espera turno en otro hilo y anota la prioridad en `results` al obtenerlo."""
+    def run():
+        try:
+            controller.acquire(priority, timeout=timeout)
+            results.append(priority)
+        except AdmissionRejected as e:
+            results.append(e.reason)
+    thread = threading.Thread(target=run)
+    thread.start()
+    return thread
+
+
+def _wait_queued(controller, count):
+    deadline = time.monotonic() + 1
+    while controller.stats()['queued'] < count and time.monotonic() < deadline:
+        time.sleep(0.005)
+    assert controller.stats()['queued'] == count
+
+
+# --- Control de admisión ---
+
+def test_admits_without_waiting_below_limit():
+    controller = AdmissionController(max_concurrent=2, reserved=0)
+    assert controller.acquire() == 0.0
+    assert controller.acquire() == 0.0
+    assert controller.stats()['active'] == 2
+
+
+def test_reserved_slots_only_for_high():
+    controller = AdmissionController(max_concurrent=3, reserved=1, queue_timeout=0.02)
+    controller.acquire('normal')
+    controller.acquire('normal')
+    with pytest.raises(AdmissionRejected) as excinfo:
+        controller.acquire('normal')
+    assert excinfo.value.reason == 'timeout'
+    assert controller.acquire('high') == 0.0
+
+
+def test_low_priority_has_its_own_cap():
+    controller = AdmissionController(max_concurrent=4, reserved=1, low_max=1, queue_timeout=0.02)
+    controller.acquire('low')
+    with pytest.raises(AdmissionRejected):
+        controller.acquire('low')
+    assert controller.acquire('normal') == 0.0 # Las plazas compartidas siguen libres para 'normal'
+    controller.release('low')
+    assert controller.acquire('low') == 0.0
+    assert controller.stats()['active_low'] == 1
+
+
+def test_release_grants_by_priority_then_arrival():
+    controller = AdmissionController(max_concurrent=1, reserved=0)
+    controller.acquire('normal')
+    order = []
+    threads = []
+    for priority in ('low', 'normal', 'high'):
+        threads.append(_acquire_in_thread(controller, priority, order))
+        _wait_queued(controller, len(threads))
+    assert controller.stats()['queued_by_priority'] == {'high': 1, 'normal': 1, 'low': 1}
+    for expected in range(1, 4):
+        controller.release()
+        deadline = time.monotonic() + 1
+        while len(order) < expected and time.monotonic() < deadline:
+            time.sleep(0.005)
+    for thread in threads:
+        thread.join(1)
+    assert order == ['high', 'normal', 'low']
+
+
+def test_queue_timeout_rejects_and_counts():
+    controller = AdmissionController(max_concurrent=1, reserved=0, queue_timeout=0.05, retry_after=3)
+    controller.acquire()
+    start = time.monotonic()
+    with pytest.raises(AdmissionRejected) as excinfo:
+        controller.acquire('normal')
+    assert time.monotonic() - start >= 0.05
+    assert excinfo.value.reason == 'timeout' and excinfo.value.retry_after == 3
+    assert excinfo.value.code == 503
+    stats = controller.stats()
+    assert stats['queued'] == 0 and stats['rejected_by_reason'] == {'normal_timeout': 1}
+
+
+def test_full_queue_rejects_immediately():
+    controller = AdmissionController(max_concurrent=1, reserved=0, max_queue=1)
+    controller.acquire()
+    results = []
+    thread = _acquire_in_thread(controller, 'normal', results)
+    _wait_queued(controller, 1)
+    with pytest.raises(AdmissionRejected) as excinfo:
+        controller.acquire('high')
+    assert excinfo.value.reason == 'queue_full'
+    controller.release()
+    thread.join(1)
+    assert results == ['normal']
+
+
+def test_timed_out_waiter_lets_the_next_one_in():
+    controller = AdmissionController(max_concurrent=2, reserved=1)
+    controller.acquire('normal')
+    controller.acquire('high')
+    results = []
+    normal = _acquire_in_thread(controller, 'normal', results, timeout=0.05)
+    _wait_queued(controller, 1)
+    high = _acquire_in_thread(controller, 'high', results)
+    _wait_queued(controller, 2)
+    controller.release('high') # Queda una plaza sólo apta para 'high': la 'normal' sigue esperando
+    normal.join(1)
+    high.join(1)
+    assert sorted(results) == ['high', 'timeout']
+
+
+# --- Circuito ---
+
+def _open_breaker(threshold=2, reset=0.05):
+    breaker = CircuitBreaker(failure_threshold=threshold, reset_timeout=reset)
+    for _ in range(threshold):
+        breaker.record_failure()
+    return breaker
+
+
+def test_breaker_opens_after_consecutive_failures():
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=60)
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.record_success() # Un acierto reinicia la cuenta
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.allow() is False
+    breaker.record_failure()
+    with pytest.raises(CircuitOpenError) as excinfo:
+        breaker.allow()
+    assert excinfo.value.reason == 'circuit_open' and excinfo.value.retry_after == 60
+    stats = breaker.stats()
+    assert stats['state'] == CircuitBreaker.OPEN and stats['trips'] == 1 and stats['rejected'] == 1
+
+
+def test_breaker_half_open_allows_a_single_probe():
+    breaker = _open_breaker()
+    time.sleep(0.06)
+    assert breaker.allow() is True
+    assert breaker.stats()['state'] == CircuitBreaker.HALF_OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.allow()
+
+
+def test_breaker_closes_after_successful_probe():
+    breaker = _open_breaker()
+    time.sleep(0.06)
+    breaker.allow()
+    breaker.record_success()
+    assert breaker.stats()['state'] == CircuitBreaker.CLOSED
+    assert breaker.allow() is False
+
+
+def test_breaker_reopens_after_failed_probe():
+    breaker = _open_breaker()
+    time.sleep(0.06)
+    breaker.allow()
+    breaker.record_failure()
+    stats = breaker.stats()
+    assert stats['state'] == CircuitBreaker.OPEN and stats['trips'] == 2
+    with pytest.raises(CircuitOpenError):
+        breaker.allow()
+
+
+def test_breaker_retries_probe_that_never_finished():
+    breaker = _open_breaker()
+    time.sleep(0.06)
+    assert breaker.allow() is True
+    time.sleep(0.06) # La prueba no terminó dentro de reset_timeout: se permite otra
+    assert breaker.allow() is True
+
+
+def test_cancelled_probe_is_available_at_once():
+    breaker = _open_breaker(reset=60)
+    breaker._opened_at -= 60
+    assert breaker.allow() is True
+    breaker.cancel_trial()
+    assert breaker.allow() is True
+
+
+def test_disabled_breaker_never_opens():
+    breaker = CircuitBreaker(failure_threshold=0)
+    for _ in range(10):
+        breaker.record_failure()
+    assert breaker.allow() is False
+
+
+# --- Integración con get_db_connection ---
+
+@pytest.fixture
+def app(make_app):
+    return make_app(DB_MAX_CONCURRENT=1, DB_ADMISSION_RESERVED=0, DB_ADMISSION_QUEUE_TIMEOUT=0.05,
+                    DB_ADMISSION_RETRY_AFTER=2, DB_CIRCUIT_FAILURES=1, DB_CIRCUIT_RESET=60)
+
+
+def test_saturated_database_returns_503_with_retry_after(app):
+    import database
+    with app.test_request_context():
+        held = database.get_db_connection()
+        try:
+            response = app.test_client().get('/api/items/1')
+        finally:
+            held.close()
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '2'
+    assert response.get_json()['reason'] == 'timeout'
+    assert app.test_client().get('/api/items/1').status_code == 200
+
+
+def test_admission_rejection_does_not_spend_the_probe(app, monkeypatch):
+    import database
+    cancelled = []
+    cancel_trial = CircuitBreaker.cancel_trial
+    monkeypatch.setattr(CircuitBreaker, 'cancel_trial',
+                        lambda self: cancelled.append(True) or cancel_trial(self))
+    with app.test_request_context():
+        # La plaza se toma con el circuito aún cerrado: esta conexión no es la consulta de prueba
+        held = database.get_db_connection()
+        _, breaker = database._get_admission()
+        breaker.record_failure()
+        breaker._opened_at -= 60 # El circuito ya puede probar
+        try:
+            response = app.test_client().get('/api/items/1')
+        finally:
+            held.invalidate(RuntimeError('descartada por la prueba')) # Sin anotar éxito en el circuito
+            held.close()
+    assert response.status_code == 503
+    assert response.get_json()['reason'] == 'timeout'
+    assert cancelled == [True]
+    assert breaker.stats()['state'] == CircuitBreaker.HALF_OPEN
+    # La prueba no llegó a la base de datos: la siguiente petición la hace y cierra el circuito
+    assert app.test_client().get('/api/items/1').status_code == 200
+    assert breaker.stats()['state'] == CircuitBreaker.CLOSED
@@ -0,0 +1,86 @@
+import queue
+
+import pytest
+
+
+@pytest.fixture
+def app(make_app):
+    return make_app()
+
+
+def _broadcaster(app, monkeypatch, **settings):
+    """Difusor sin hilo en segundo plano: las consultas se lanzan a mano con poll()."""
+    from alerts_stream import AlertBroadcaster
+    broadcaster = AlertBroadcaster(app, **settings)
+    monkeypatch.setattr(broadcaster, '_ensure_started', lambda: None)
+    return broadcaster
+
+
+def _drain(subscriber):
+    """IDs de las alertas encoladas ('reset' para el evento de recarga)."""
+    received = []
+    while True:
+        try:
+            payload = subscriber.queue.get_nowait()
+        except queue.Empty:
+            return received
+        if payload.startswith('event: reset'):
+            received.append('reset')
+        else:
+            received.append(int(payload.split('\n', 1)[0].rpartition('|')[2]))
+
+
+def _failing_fetch(*args):
+    raise RuntimeError('sin conexión')
+
+
+def test_new_client_gets_the_latest_alerts(app, monkeypatch):
+    broadcaster = _broadcaster(app, monkeypatch, initial_events=3)
+    subscriber = broadcaster.subscribe()
+    broadcaster.poll()
+    assert _drain(subscriber) == [8, 9, 10]
+
+
+def test_resume_on_a_fresh_process_reads_missed_alerts_from_the_database(app, monkeypatch, standin_db):
+    broadcaster = _broadcaster(app, monkeypatch)
+    subscriber = broadcaster.subscribe(standin_db.alert_event_id(6))
+    assert _drain(subscriber) == [7, 8, 9, 10]
+    broadcaster.poll() # La primera carga del búfer no repite lo ya enviado
+    assert _drain(subscriber) == []
+    assert broadcaster.stats()['backfilled'] == 4
+
+
+def test_resume_older_than_the_buffer_reads_the_gap_from_the_database(app, monkeypatch, standin_db):
+    broadcaster = _broadcaster(app, monkeypatch, buffer_size=3)
+    broadcaster.poll()
+    subscriber = broadcaster.subscribe(standin_db.alert_event_id(2))
+    assert _drain(subscriber) == [3, 4, 5, 6, 7, 8, 9, 10]
+
+
+def test_resume_within_the_buffer_does_not_query(app, monkeypatch, standin_db):
+    import alerts_stream
+    broadcaster = _broadcaster(app, monkeypatch)
+    broadcaster.poll()
+    monkeypatch.setattr(alerts_stream, 'fetch_data', lambda *args: pytest.fail("consulta innecesaria"))
+    subscriber = broadcaster.subscribe(standin_db.alert_event_id(8))
+    assert _drain(subscriber) == [9, 10]
+
+
+def test_too_many_missed_alerts_send_a_reset(app, monkeypatch, standin_db):
+    broadcaster = _broadcaster(app, monkeypatch, client_queue_size=4, initial_events=2)
+    subscriber = broadcaster.subscribe(standin_db.alert_event_id(3))
+    broadcaster.poll()
+    assert _drain(subscriber) == ['reset', 9, 10]
+    assert broadcaster.stats()['resets'] == 1
+
+
+def test_failed_backfill_sends_a_reset(app, monkeypatch, standin_db):
+    import alerts_stream
+    broadcaster = _broadcaster(app, monkeypatch, initial_events=2)
+    fetch_data = alerts_stream.fetch_data
+    monkeypatch.setattr(alerts_stream, 'fetch_data', _failing_fetch)
+    subscriber = broadcaster.subscribe(standin_db.alert_event_id(6))
+    monkeypatch.setattr(alerts_stream, 'fetch_data', fetch_data)
+    broadcaster.poll()
+    assert _drain(subscriber) == ['reset', 9, 10]
+    assert broadcaster.stats()['resume_errors'] == 1
@@ -0,0 +1,112 @@
+import jwt
+import pytest
+
+import auth
+from auth import JWKSCache, TokenValidator, ValidatedTokenCache
+from load_test import JWKSStub
+
+AUDIENCE = 'api://pruebas'
+ISSUER = 'https://login.example/tenant/v2.0'
+
+
+@pytest.fixture(scope='module')
+def stub():
+    stub = JWKSStub()
+    yield stub
+    stub.server.shutdown()
+
+
+@pytest.fixture
+def jwks(stub):
+    stub.rotate('inicial')
+    cache = JWKSCache(stub.url, refresh_interval=3600, min_refetch_interval=60)
+    yield cache
+    cache.stop()
+
+
+def test_known_kid_is_served_from_memory(stub, jwks):
+    jwks.refresh()
+    fetches = stub.fetches
+    assert jwks.get_key('inicial').key_id == 'inicial'
+    assert jwks.get_key('inicial').key_id == 'inicial'
+    assert stub.fetches == fetches
+    assert jwks.stats()['hits'] == 2
+
+
+def test_unknown_kid_refetches_keys(stub, jwks):
+    jwks.refresh()
+    jwks.min_refetch_interval = 0
+    stub.rotate('rotada')
+    fetches = stub.fetches
+    assert jwks.get_key('rotada').key_id == 'rotada'
+    assert stub.fetches == fetches + 1
+    assert jwks.stats()['misses'] == 1 and jwks.stats()['refreshes'] == 2
+
+
+def test_unknown_kid_refetch_is_rate_limited(stub, jwks):
+    jwks.refresh()
+    fetches = stub.fetches
+    with pytest.raises(jwt.InvalidTokenError):
+        jwks.get_key('desconocida')
+    with pytest.raises(jwt.InvalidTokenError):
+        jwks.get_key('desconocida')
+    assert stub.fetches == fetches # Dentro de min_refetch_interval no se vuelve a descargar
+
+
+def test_validator_accepts_token_after_key_rotation(stub, jwks):
+    jwks.min_refetch_interval = 0
+    validator = TokenValidator(jwks, AUDIENCE, ISSUER)
+    assert validator.decode(stub.token(AUDIENCE, ISSUER))['aud'] == AUDIENCE
+    stub.rotate('nueva')
+    assert validator.decode(stub.token(AUDIENCE, ISSUER))['aud'] == AUDIENCE
+    assert jwks.stats()['refreshes'] == 2
+
+
+def test_validator_caches_validated_token(stub, jwks, monkeypatch):
+    validator = TokenValidator(jwks, AUDIENCE, ISSUER)
+    token = stub.token(AUDIENCE, ISSUER)
+    validator.decode(token)
+    monkeypatch.setattr(jwt, 'decode', lambda *args, **kwargs: pytest.fail("firma verificada de nuevo"))
+    assert validator.decode(token)['iss'] == ISSUER
+    assert validator.token_cache.stats()['hits'] == 1
+
+
+class _Clock:
+    """Sustituye al módulo time en auth para avanzar el reloj sin esperar."""
+
+    def __init__(self, now):
+        self.now = now
+
+    def time(self):
+        return self.now
+
+    def monotonic(self):
+        return self.now
+
+
+def test_token_cache_entry_expires_with_token(monkeypatch):
+    clock = _Clock(1000.0)
+    monkeypatch.setattr(auth, 'time', clock)
+    cache = ValidatedTokenCache(max_size=4)
+    cache.put('token', {'sub': 'usuario', 'exp': 1060})
+    assert cache.get('token') == {'sub': 'usuario', 'exp': 1060}
+    clock.now = 1060.0
+    assert cache.get('token') is None
+    assert cache.stats() == {"size": 0, "max_size": 4, "hits": 1, "misses": 1}
+
+
+def test_token_cache_evicts_least_recently_used():
+    cache = ValidatedTokenCache(max_size=2)
+    expires = 2 ** 40
+    cache.put('a', {'exp': expires})
+    cache.put('b', {'exp': expires})
+    cache.get('a')
+    cache.put('c', {'exp': expires})
+    assert cache.get('b') is None
+    assert cache.get('a') is not None and cache.get('c') is not None
+
+
+def test_token_cache_ignores_tokens_without_exp():
+    cache = ValidatedTokenCache(max_size=2)
+    cache.put('token', {'sub': 'usuario'})
+    assert cache.get('token') is None
@@ -0,0 +1,65 @@
+import pytest
+
+TICKET = '/api/antigua_tickets/5'
+
+
+@pytest.fixture
+def app(make_app):
+    # Con el mínimo bajo también se guarda la variante gzip de un ticket
+    return make_app(COMPRESSION_ENCODINGS=['gzip'], COMPRESSION_MIN_SIZE=100)
+
+
+@pytest.mark.parametrize('encoding', [None, 'gzip'])
+def test_matching_etag_returns_304_for_each_encoding(app, encoding):
+    client = app.test_client()
+    headers = {'Accept-Encoding': encoding} if encoding else {}
+    first = client.get(TICKET, headers=headers)
+    assert first.status_code == 200
+    assert first.headers.get('Content-Encoding') == encoding
+    assert first.headers['Cache-Control'] == 'no-cache'
+    assert 'Accept-Encoding' in first.vary
+    second = client.get(TICKET, headers={**headers, 'If-None-Match': first.headers['ETag']})
+    assert second.status_code == 304
+    assert second.data == b''
+    assert second.headers['ETag'] == first.headers['ETag']
+
+
+def test_each_encoding_has_its_own_etag(app):
+    client = app.test_client()
+    plain = client.get(TICKET)
+    compressed = client.get(TICKET, headers={'Accept-Encoding': 'gzip'})
+    assert compressed.headers['ETag'] != plain.headers['ETag']
+    # El ETag de la versión sin comprimir no valida la comprimida
+    response = client.get(TICKET, headers={'Accept-Encoding': 'gzip', 'If-None-Match': plain.headers['ETag']})
+    assert response.status_code == 200
+    assert response.headers['Content-Encoding'] == 'gzip'
+
+
+def test_write_to_the_table_changes_the_etag(app):
+    import database
+    client = app.test_client()
+    before = client.get(TICKET)
+    with app.app_context():
+        database.execute_query("UPDATE antigua_Ticket SET Description = ? WHERE Number = ?", ('Editado', 5))
+    after = client.get(TICKET, headers={'If-None-Match': before.headers['ETag']})
+    assert after.status_code == 200
+    assert after.headers['ETag'] != before.headers['ETag']
+    assert after.get_json()['Description'] == 'Editado'
+
+
+def test_write_to_another_table_keeps_the_etag(app):
+    client = app.test_client()
+    before = client.get(TICKET)
+    assert client.post('/api/items', json={'name': 'Nuevo', 'description': 'otra tabla'}).status_code == 201
+    after = client.get(TICKET, headers={'If-None-Match': before.headers['ETag']})
+    assert after.status_code == 304
+
+
+def test_cached_entry_is_served_without_querying(app, monkeypatch):
+    import routes
+    client = app.test_client()
+    first = client.get(TICKET)
+    monkeypatch.setattr(routes, 'fetch_data', lambda *args: pytest.fail("consulta innecesaria"))
+    second = client.get(TICKET)
+    assert second.status_code == 200
+    assert second.data == first.data
@@ -0,0 +1,132 @@
+import gzip
+import json
+
+import pytest
+from flask import Flask, Response, jsonify
+
+import response_compression
+
+ROWS = [{"Number": i, "Status": "Open", "Description": f"Ticket de prueba {i}"} for i in range(200)]
+
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    app.config.update(COMPRESSION_ENCODINGS=['br', 'zstd', 'gzip'], COMPRESSION_MIN_SIZE=1024)
+
+    @app.route('/big')
+    def big():
+        return jsonify(ROWS)
+
+    @app.route('/small')
+    def small():
+        return jsonify(ROWS[:2])
+
+    @app.route('/image')
+    def image():
+        return Response(bytes(range(256)) * 20, mimetype='image/png')
+
+    @app.route('/stream')
+    def stream():
+        return Response((json.dumps(row) + '\n' for row in ROWS), mimetype='application/x-ndjson')
+
+    response_compression.init_app(app)
+    return app
+
+
+def _decode(encoding, data):
+    if encoding == 'gzip':
+        return gzip.decompress(data)
+    if encoding == 'br':
+        return response_compression.brotli.decompress(data)
+    return response_compression.zstandard.ZstdDecompressor().decompress(data)
+
+
+def _fake_encoders(monkeypatch, *names):
+    """Codificaciones de mentira (sin los paquetes opcionales) para probar sólo la negociación."""
+    encoders = dict(response_compression.ENCODERS)
+    for name in names:
+        encoders.setdefault(name, encoders['gzip'])
+    monkeypatch.setattr(response_compression, 'ENCODERS', encoders)
+
+
+@pytest.mark.parametrize('accept, expected', [
+    ('gzip', 'gzip'),
+    ('gzip, br', 'br'),
+    ('gzip, zstd', 'zstd'),
+    ('br;q=0.5, zstd;q=0.8, gzip;q=0.1', 'zstd'),
+    ('gzip, br;q=0', 'gzip'),
+    ('identity', None),
+    ('', None),
+])
+def test_encoding_follows_accept_encoding(app, monkeypatch, accept, expected):
+    _fake_encoders(monkeypatch, 'br', 'zstd')
+    response = app.test_client().get('/big', headers={'Accept-Encoding': accept})
+    assert response.headers.get('Content-Encoding') == expected
+    assert 'Accept-Encoding' in response.vary
+
+
+def test_unavailable_encoding_is_not_offered(app, monkeypatch):
+    encoders = {'gzip': response_compression.ENCODERS['gzip']}
+    monkeypatch.setattr(response_compression, 'ENCODERS', encoders)
+    response = app.test_client().get('/big', headers={'Accept-Encoding': 'br, gzip;q=0.1'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+
+
+@pytest.mark.parametrize('encoding', ['gzip', 'br', 'zstd'])
+def test_compressed_body_round_trips(app, encoding):
+    if encoding not in response_compression.ENCODERS:
+        pytest.skip(f"{encoding} no está instalado")
+    response = app.test_client().get('/big', headers={'Accept-Encoding': encoding})
+    assert response.headers['Content-Encoding'] == encoding
+    assert int(response.headers['Content-Length']) == len(response.data)
+    assert json.loads(_decode(encoding, response.data)) == ROWS
+
+
+def test_small_body_is_sent_as_is(app):
+    response = app.test_client().get('/small', headers={'Accept-Encoding': 'gzip'})
+    assert 'Content-Encoding' not in response.headers
+    assert response.get_json() == ROWS[:2]
+
+
+def test_min_size_is_configurable(app):
+    app.config['COMPRESSION_MIN_SIZE'] = 10
+    response = app.test_client().get('/small', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+
+
+def test_non_compressible_type_is_sent_as_is(app):
+    response = app.test_client().get('/image', headers={'Accept-Encoding': 'gzip'})
+    assert 'Content-Encoding' not in response.headers
+    assert 'Accept-Encoding' not in response.vary
+
+
+def test_disabled_compression(app):
+    app.config['COMPRESSION_ENABLED'] = False
+    response = app.test_client().get('/big', headers={'Accept-Encoding': 'gzip'})
+    assert 'Content-Encoding' not in response.headers
+
+
+def test_streamed_response_is_compressed_incrementally(app):
+    response = app.test_client().get('/stream', headers={'Accept-Encoding': 'gzip'}, buffered=False)
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Content-Length' not in response.headers
+    assert 'Accept-Encoding' in response.vary
+    chunks = list(response.iter_encoded())
+    assert len(chunks) > len(ROWS) // 2 # Cada parte se envía ya comprimida, sin esperar al final
+    lines = gzip.decompress(b''.join(chunks)).decode('utf-8').splitlines()
+    assert [json.loads(line) for line in lines] == ROWS
+
+
+def test_streamed_response_without_accept_encoding(app):
+    response = app.test_client().get('/stream')
+    assert 'Content-Encoding' not in response.headers
+    assert len(response.data.decode('utf-8').splitlines()) == len(ROWS)
+
+
+def test_streamed_ticket_listing_is_compressed(make_app):
+    client = make_app(COMPRESSION_ENCODINGS=['gzip']).test_client()
+    plain = client.get('/api/antigua_tickets?format=ndjson')
+    response = client.get('/api/antigua_tickets?format=ndjson', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(response.data) == plain.data
@@ -0,0 +1,95 @@
+import base64
+import datetime
+import decimal
+import json
+import uuid
+
+import pytest
+
+import converters
+from bench_row_conversion import legacy_format_row
+from converters import convert_value, get_row_converter
+
+# (nombre, tipo) como en cursor.description; precisión en la posición 4
+DESCRIPTION = [
+    ('Number', int, None, 10, 10, 0, False),
+    ('CreatedDate', datetime.datetime, None, 23, 23, 3, True),
+    ('DueDate', datetime.date, None, 10, 10, 0, True),
+    ('Amount', decimal.Decimal, None, 12, 12, 2, True),
+    ('Total', decimal.Decimal, None, 38, 38, 10, True),
+    ('Signature', bytearray, None, 0, 0, 0, True),
+    ('Blob', bytes, None, 16, 16, 0, True),
+    ('Customer', str, None, 100, 100, 0, True),
+    ('Guid', uuid.UUID, None, 36, 36, 0, True),
+]
+COLUMNS = [column[0] for column in DESCRIPTION]
+ROW = (
+    7,
+    datetime.datetime(2026, 1, 2, 3, 4, 5, 123000),
+    datetime.date(2026, 1, 2),
+    decimal.Decimal('1234.50'),
+    decimal.Decimal('12345678901234567890.1234567890'),
+    bytearray(b'\x00\x01firma\xff'),
+    b'\xde\xad\xbe\xef',
+    'Cliente',
+    uuid.UUID('12345678-1234-5678-1234-567812345678'),
+)
+NULL_ROW = (8,) + (None,) * (len(ROW) - 1)
+
+
+@pytest.fixture(autouse=True)
+def empty_cache(monkeypatch):
+    monkeypatch.setattr(converters, '_converters', {})
+
+
+def test_binary_columns_match_the_previous_conversion():
+    row = get_row_converter(DESCRIPTION)(ROW)
+    legacy = legacy_format_row(COLUMNS, [bytes(value) if isinstance(value, bytearray) else value for value in ROW])
+    assert row['Signature'] == legacy['Signature'] == base64.b64encode(ROW[5]).decode('ascii')
+    assert row['Blob'] == legacy['Blob'] == 'deadbeef'
+
+
+def test_text_uuid_and_high_precision_decimal_match_the_previous_conversion():
+    row = get_row_converter(DESCRIPTION)(ROW)
+    legacy = legacy_format_row(COLUMNS, ROW)
+    for column in ('Customer', 'Guid', 'Total'):
+        assert row[column] == legacy[column]
+
+
+def test_typed_values_keep_the_value_of_the_previous_text():
+    row = get_row_converter(DESCRIPTION)(ROW)
+    legacy = legacy_format_row(COLUMNS, ROW)
+    assert row['Number'] == int(legacy['Number'])
+    assert row['Amount'] == float(legacy['Amount'])
+    # ISO 8601 con 'T' en lugar del espacio de str(), pero el mismo instante
+    assert row['CreatedDate'] == '2026-01-02T03:04:05.123000'
+    assert datetime.datetime.fromisoformat(row['CreatedDate']) == datetime.datetime.fromisoformat(legacy['CreatedDate'])
+    assert row['DueDate'] == legacy['DueDate'] == '2026-01-02'
+
+
+def test_null_becomes_json_null_in_every_column():
+    row = get_row_converter(DESCRIPTION)(NULL_ROW)
+    assert row == {'Number': 8, **{column: None for column in COLUMNS[1:]}}
+    assert json.loads(json.dumps(row)) == row
+
+
+def test_compiled_converter_matches_value_by_value_conversion():
+    row = get_row_converter(DESCRIPTION)(ROW)
+    expected = {column: convert_value(value, column) for column, value in zip(COLUMNS, ROW)}
+    expected['Number'] = ROW[0]
+    expected['Amount'] = float(ROW[3]) # Con tipo conocido, los decimales cortos van como número
+    assert row == expected
+
+
+def test_untyped_columns_fall_back_to_value_by_value_conversion():
+    # sqlite no informa tipos en cursor.description
+    description = [(name, None, None, None, None, None, None) for name in COLUMNS]
+    convert = get_row_converter(description)
+    assert convert(ROW) == {column: convert_value(value, column) for column, value in zip(COLUMNS, ROW)}
+    assert convert(NULL_ROW) == {'Number': 8, **{column: None for column in COLUMNS[1:]}}
+
+
+def test_converter_is_compiled_once_per_shape():
+    first = get_row_converter(DESCRIPTION)
+    assert get_row_converter(list(DESCRIPTION)) is first
+    assert get_row_converter(DESCRIPTION[:3]) is not first
@@ -0,0 +1,78 @@
+import threading
+import time
+
+import pytest
+
+
+@pytest.fixture
+def app(make_app):
+    return make_app(CROSS_ISLAND_MAX_WORKERS=2, CROSS_ISLAND_TIMEOUT=0.3)
+
+
+def test_merges_and_sorts_all_islands(app):
+    response = app.test_client().get('/api/tickets?limit=10&sort=Number&order=desc')
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body['errors'] == {}
+    assert len(body['tickets']) == 10
+    numbers = [ticket['Number'] for ticket in body['tickets']]
+    assert numbers == sorted(numbers, reverse=True)
+    assert {ticket['island'] for ticket in body['tickets']} == {'antigua', 'dominica', 'maartin', 'thomas'}
+
+
+def test_unknown_sort_column_is_rejected_before_querying(app):
+    response = app.test_client().get('/api/tickets?sort=NoExiste')
+    assert response.status_code == 400
+    assert 'NoExiste' in response.get_json()['message']
+
+
+def test_requests_share_one_bounded_executor(app):
+    import routes
+    client = app.test_client()
+    client.get('/api/tickets?limit=5')
+    executor = routes._island_executor
+    client.get('/api/tickets?limit=5')
+    assert routes._island_executor is executor
+    assert executor._max_workers == 2
+
+
+def test_slow_island_is_dropped_and_queued_ones_still_run(app, monkeypatch):
+    import routes
+    fetch = routes._fetch_island_tickets
+    release = threading.Event()
+
+    def slow_antigua(app, island, *args):
+        if island == 'antigua':
+            release.wait(2)
+        return fetch(app, island, *args)
+
+    monkeypatch.setattr(routes, '_fetch_island_tickets', slow_antigua)
+    start = time.monotonic()
+    try:
+        response = app.test_client().get('/api/tickets?limit=5')
+    finally:
+        release.set()
+    assert time.monotonic() - start < 1.5
+    body = response.get_json()
+    assert response.status_code == 200
+    assert list(body['errors']) == ['antigua']
+    assert {ticket['island'] for ticket in body['tickets']} == {'dominica', 'maartin', 'thomas'}
+
+
+def test_island_without_a_free_thread_is_cancelled(app, monkeypatch):
+    import routes
+    fetch = routes._fetch_island_tickets
+    release = threading.Event()
+
+    def blocked(app, island, *args):
+        release.wait(2)
+        return fetch(app, island, *args)
+
+    monkeypatch.setattr(routes, '_fetch_island_tickets', blocked)
+    try:
+        response = app.test_client().get('/api/tickets?limit=5')
+    finally:
+        release.set()
+    # Dos hilos ocupados hasta agotar su tiempo y las otras dos islas sin hilo: todas fallan
+    assert response.status_code == 500
+    assert set(response.get_json()['errors']) == {'antigua', 'dominica', 'maartin', 'thomas'}
@@ -0,0 +1,116 @@
+import threading
+import time
+
+import pytest
+
+from db_pool import ConnectionPool, PoolTimeoutError
+
+
+def _select_one(conn):
+    cursor = conn.cursor()
+    cursor.execute('SELECT 1')
+    return cursor.fetchall()[0][0]
+
+
+def test_reuses_idle_connection(standin_db):
+    pool = ConnectionPool(standin_db.connect, max_size=2)
+    with pool.acquire() as conn:
+        assert _select_one(conn) == 1
+    with pool.acquire() as conn:
+        assert _select_one(conn) == 1
+    stats = pool.stats()
+    assert stats['created'] == 1
+    assert stats['checkouts'] == 2
+    assert stats['idle'] == 1 and stats['in_use'] == 0
+
+
+def test_acquire_times_out_when_exhausted(standin_db):
+    pool = ConnectionPool(standin_db.connect, max_size=1, timeout=0.05)
+    conn = pool.acquire()
+    start = time.monotonic()
+    with pytest.raises(PoolTimeoutError):
+        pool.acquire()
+    assert time.monotonic() - start >= 0.05
+    stats = pool.stats()
+    assert stats['waits'] == 1 and stats['timeouts'] == 1
+    conn.close()
+    pool.acquire(timeout=0).close() # La conexión devuelta vuelve a estar disponible
+
+
+def test_waiter_gets_released_connection(standin_db):
+    pool = ConnectionPool(standin_db.connect, max_size=1, timeout=2)
+    conn = pool.acquire()
+    got = []
+    waiter = threading.Thread(target=lambda: got.append(pool.acquire()))
+    waiter.start()
+    time.sleep(0.05)
+    conn.close()
+    waiter.join(1)
+    assert got and _select_one(got[0]) == 1
+    got[0].close()
+    assert pool.stats()['created'] == 1
+
+
+def test_recycles_after_max_uses(standin_db):
+    pool = ConnectionPool(standin_db.connect, max_size=1, max_uses=2)
+    for _ in range(3):
+        with pool.acquire() as conn:
+            _select_one(conn)
+    stats = pool.stats()
+    assert stats['recycled'] == 1
+    assert stats['created'] == 2
+
+
+def test_recycles_after_max_age(standin_db):
+    pool = ConnectionPool(standin_db.connect, max_size=1, max_age=0.05, ping_after=None)
+    pool.acquire().close()
+    time.sleep(0.06)
+    pool.acquire().close()
+    stats = pool.stats()
+    assert stats['recycled'] == 1
+    assert stats['created'] == 2
+
+
+def test_invalidated_connection_is_discarded(standin_db):
+    closed = []
+    pool = ConnectionPool(standin_db.connect, max_size=1)
+    conn = pool.acquire(on_close=lambda broken, error: closed.append((broken, error)))
+    error = RuntimeError('conexión perdida')
+    conn.invalidate(error)
+    conn.close()
+    conn.close() # Idempotente: on_close sólo se llama una vez
+    assert closed == [(True, error)]
+    stats = pool.stats()
+    assert stats['discarded'] == 1 and stats['size'] == 0
+    with pool.acquire() as conn:
+        assert _select_one(conn) == 1
+    assert pool.stats()['created'] == 2
+
+
+def test_exception_in_context_invalidates(standin_db):
+    pool = ConnectionPool(standin_db.connect, max_size=1)
+    with pytest.raises(ValueError):
+        with pool.acquire():
+            raise ValueError('fallo')
+    assert pool.stats()['discarded'] == 1
+
+
+def test_failed_ping_replaces_idle_connection(standin_db):
+    pool = ConnectionPool(standin_db.connect, max_size=1, ping_after=0, ping_query='SELECT * FROM NoExiste')
+    pool.acquire().close()
+    pool.acquire().close()
+    stats = pool.stats()
+    assert stats['discarded'] == 1 and stats['created'] == 2
+
+
+def test_open_transaction_is_rolled_back_on_release(standin_db):
+    pool = ConnectionPool(standin_db.connect, max_size=1)
+    conn = pool.acquire()
+    conn.autocommit = False
+    conn.cursor().execute("INSERT INTO Items (Name, Description) VALUES ('x', 'sin confirmar')")
+    conn.close()
+    with pool.acquire() as conn:
+        assert conn.autocommit is True
+        cursor = conn.cursor()
+        cursor.execute("SELECT COUNT(*) FROM Items WHERE Description = 'sin confirmar'")
+        assert cursor.fetchall()[0][0] == 0
@@ -0,0 +1,101 @@
+import sqlite3
+
+import pytest
+
+ITEMS = 10 # Ítems que siembra el fixture standin_db
+
+
+@pytest.fixture
+def app(make_app):
+    return make_app(DB_EXECUTEMANY_CHUNK_SIZE=3)
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+def _item_count(standin_db):
+    conn = sqlite3.connect(standin_db.path)
+    try:
+        return conn.execute("SELECT COUNT(*) FROM Items").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def _statuses(response):
+    return [result['status'] for result in response.get_json()['results']]
+
+
+def test_post_creates_rows_across_chunks(client, standin_db):
+    response = client.post('/api/items/batch', json=[{"name": f"Lote {i}", "description": "d"} for i in range(8)])
+    assert response.status_code == 200
+    assert response.get_json()['summary'] == {'created': 8}
+    assert _item_count(standin_db) == ITEMS + 8
+
+
+def test_post_rejects_non_string_values_per_row(client, standin_db):
+    response = client.post('/api/items/batch', json=[
+        {"name": "Bueno"},
+        {"name": 5},
+        {"name": "Malo", "description": {"texto": "x"}},
+        "no es un objeto",
+        {"description": "sin nombre"},
+    ])
+    assert response.status_code == 200
+    assert _statuses(response) == ['created', 'error', 'error', 'error', 'error']
+    assert "'name'" in response.get_json()['results'][1]['message']
+    assert "'description'" in response.get_json()['results'][2]['message']
+    assert _item_count(standin_db) == ITEMS + 1
+
+
+def test_post_with_only_invalid_rows_is_400(client, standin_db):
+    response = client.post('/api/items/batch', json=[{"name": ["lista"]}])
+    assert response.status_code == 400
+    assert _item_count(standin_db) == ITEMS
+
+
+def test_patch_mixes_updated_not_found_and_invalid(client):
+    response = client.patch('/api/items/batch', json=[
+        {"id": 1, "name": "Nuevo"},
+        {"id": 999, "name": "No existe"},
+        {"id": 2, "description": 7},
+        {"id": 3, "description": "Otra"},
+    ])
+    assert response.status_code == 200
+    assert _statuses(response) == ['updated', 'not_found', 'error', 'updated']
+    assert client.get('/api/items/1').get_json()['Name'] == 'Nuevo'
+    assert client.get('/api/items/3').get_json()['Description'] == 'Otra'
+
+
+def test_all_not_found_is_not_a_bad_request(client):
+    response = client.patch('/api/items/batch', json=[{"id": 900, "name": "x"}, {"id": 901, "name": "y"}])
+    assert response.status_code == 200
+    assert response.get_json()['summary'] == {'not_found': 2}
+    response = client.delete('/api/items/batch', json=[900, 901])
+    assert response.status_code == 200
+    assert response.get_json()['summary'] == {'not_found': 2}
+
+
+def test_delete_across_chunks(client, standin_db, monkeypatch):
+    import routes
+    monkeypatch.setattr(routes, '_IN_CHUNK_SIZE', 4) # Comprobación de existencia en varios IN (...)
+    response = client.delete('/api/items/batch', json=list(range(1, ITEMS + 1)) + [ITEMS + 1])
+    assert response.status_code == 200
+    assert response.get_json()['summary'] == {'deleted': ITEMS, 'not_found': 1}
+    assert _item_count(standin_db) == 0
+
+
+def test_failed_statement_rolls_back_earlier_chunks(client, standin_db):
+    conn = sqlite3.connect(standin_db.path)
+    conn.execute("CREATE TRIGGER tr_items_falla BEFORE INSERT ON Items WHEN NEW.Name = 'falla' "
+                 "BEGIN SELECT RAISE(ABORT, 'fallo simulado'); END")
+    conn.commit()
+    conn.close()
+    rows = [{"name": f"Lote {i}"} for i in range(5)] + [{"name": "falla"}] # El 6.º está en el segundo bloque
+    response = client.post('/api/items/batch', json=rows)
+    assert response.status_code == 500
+    assert _item_count(standin_db) == ITEMS
+    # La conexión descartada no afecta a la siguiente petición
+    assert client.post('/api/items/batch', json=[{"name": "Después"}]).status_code == 200
+    assert _item_count(standin_db) == ITEMS + 1
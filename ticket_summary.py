@@ -0,0 +1,217 @@
+import logging
+import os
+import threading
+import time
+from datetime import date, datetime, timedelta, timezone
+
+from flask import g
+
+from cache import CachedResponse, precompress
+from database import fetch_data
+
+# Obtener el logger de la aplicación Flask
+logger = logging.getLogger(__name__)
+
+# Clave usada para los tickets sin estado (las claves JSON deben ser texto)
+NO_STATUS = 'Sin estado'
+
+
+def _day_key(value):
+    """Fecha del grupo como 'AAAA-MM-DD' (el driver devuelve date; otras bases de datos, texto)."""
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()[:10]
+    return str(value)[:10]
+
+
+class SummarySnapshot:
+    """Resumen ya serializado (con sus variantes comprimidas y su ETag) y momento en que se generó."""
+    __slots__ = ('entry', 'generated_at', 'created')
+
+    def __init__(self, entry, generated_at):
+        self.entry = entry
+        self.generated_at = generated_at
+        self.created = time.monotonic()
+
+    @property
+    def age(self):
+        return time.monotonic() - self.created
+
+
+class TicketSummary:
+    """Conteos de tickets por isla, estado y día, recalculados en segundo plano.
+
+    Un hilo por proceso ejecuta las consultas GROUP BY una vez por intervalo y guarda el resultado
+    serializado; las peticiones sólo leen esa instantánea. Si nadie la consulta durante
+    `idle_after` segundos el hilo se detiene y la siguiente lectura lo vuelve a arrancar.
+    """
+
+    def __init__(self, app, tables, interval=60.0, days=90, idle_after=600.0):
+        self.app = app
+        self.tables = tables
+        self.interval = interval
+        self.days = days
+        self.idle_after = idle_after
+        self._snapshot = None
+        self._last_read = time.monotonic()
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._thread = None
+        # Estadísticas
+        self.refreshes = 0
+        self.refresh_errors = 0
+        self.last_duration_ms = None
+
+    def get(self):
+        """Devuelve la instantánea actual; la calcula en el momento sólo si no hay ninguna o está caducada."""
+        self._last_read = time.monotonic()
+        self._ensure_started()
+        snapshot = self._snapshot
+        if snapshot is None or snapshot.age > 2 * self.interval:
+            with self._refresh_lock:
+                # Otro hilo pudo recalcularla mientras se esperaba el bloqueo
+                snapshot = self._snapshot
+                if snapshot is None or snapshot.age > 2 * self.interval:
+                    snapshot = self._refresh()
+        return snapshot
+
+    def _ensure_started(self):
+        if self._thread is None or not self._thread.is_alive():
+            with self._lock:
+                if self._thread is None or not self._thread.is_alive():
+                    self._thread = threading.Thread(target=self._run, name='ticket-summary', daemon=True)
+                    self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            if time.monotonic() - self._last_read > self.idle_after:
+                logger.info("Resumen de tickets sin lecturas en %.0f s; se detiene el recálculo.", self.idle_after)
+                return
+            try:
+                with self._refresh_lock:
+                    self._refresh()
+            except Exception as e:
+                logger.error("Error al recalcular el resumen de tickets: %s", e)
+
+    def _refresh(self):
+        """Recalcula el resumen (con _refresh_lock adquirido). Conserva la instantánea anterior si todas las islas fallan."""
+        start = time.perf_counter()
+        try:
+            with self.app.app_context():
+                g.db_priority = 'low' # Agregación pesada: cede el turno a las peticiones interactivas
+                summary = self._compute()
+                duration_ms = round((time.perf_counter() - start) * 1000, 1)
+                summary['duration_ms'] = duration_ms
+                entry = CachedResponse(self.app.json.dumps(summary).encode('utf-8'), 'application/json')
+                precompress(entry, self.app.config) # Se comprime una vez por recálculo, no por petición
+                snapshot = SummarySnapshot(entry, datetime.fromisoformat(summary['generated_at']))
+        except Exception:
+            self.refresh_errors += 1
+            raise
+        self._snapshot = snapshot
+        self.refreshes += 1
+        self.last_duration_ms = duration_ms
+        logger.info("Resumen de tickets recalculado en %.1f ms.", duration_ms)
+        return snapshot
+
+    def _compute(self):
+        config = self.app.config
+        status_column = config['TICKET_STATUS_COLUMN']
+        date_column = config['TICKET_DATE_COLUMN']
+        generated_at = datetime.now(timezone.utc)
+        first_day = (date.today() - timedelta(days=self.days - 1)).isoformat() if self.days > 0 else None
+
+        islands = {}
+        errors = {}
+        for island, table in self.tables.items():
+            try:
+                rows = fetch_data(
+                    f"SELECT [{status_column}] AS [Status], CAST([{date_column}] AS date) AS [Day], COUNT(*) AS [Count] "
+                    f"FROM {table} GROUP BY [{status_column}], CAST([{date_column}] AS date)"
+                )
+            except Exception as e:
+                logger.error("Error al resumir los tickets de %s: %s", table, e)
+                errors[island] = str(e)
+                continue
+            total = 0
+            by_status = {}
+            by_day = {}
+            for row in rows:
+                status = NO_STATUS if row['Status'] is None else str(row['Status'])
+                count = row['Count']
+                total += count
+                by_status[status] = by_status.get(status, 0) + count
+                if row['Day'] is None:
+                    continue
+                day = _day_key(row['Day'])
+                if first_day is None or day >= first_day:
+                    day_counts = by_day.setdefault(day, {})
+                    day_counts[status] = day_counts.get(status, 0) + count
+            islands[island] = {"total": total, "by_status": by_status, "by_day": by_day}
+
+        if errors and not islands:
+            raise RuntimeError(f"No se pudo resumir ninguna isla: {errors}")
+
+        totals_by_status = {}
+        for counts in islands.values():
+            for status, count in counts['by_status'].items():
+                totals_by_status[status] = totals_by_status.get(status, 0) + count
+        return {
+            "generated_at": generated_at.isoformat(timespec='seconds'),
+            "refresh_interval": self.interval,
+            "first_day": first_day,
+            "totals": {
+                "total": sum(counts['total'] for counts in islands.values()),
+                "by_island": {island: counts['total'] for island, counts in islands.items()},
+                "by_status": totals_by_status,
+            },
+            "islands": islands,
+            "errors": errors,
+        }
+
+    def stats(self):
+        snapshot = self._snapshot
+        return {
+            "refreshes": self.refreshes,
+            "refresh_errors": self.refresh_errors,
+            "last_duration_ms": self.last_duration_ms,
+            "age_seconds": round(snapshot.age, 1) if snapshot is not None else None,
+            "running": int(self._thread is not None and self._thread.is_alive()),
+        }
+
+
+# Resumen del proceso (se crea en el primer uso)
+_summary = None
+_summary_lock = threading.Lock()
+
+
+def get_ticket_summary(app, tables):
+    """Devuelve el resumen de tickets del proceso, creándolo si aún no existe."""
+    global _summary
+    if _summary is None:
+        with _summary_lock:
+            if _summary is None:
+                config = app.config
+                _summary = TicketSummary(
+                    app,
+                    tables,
+                    interval=config.get('TICKET_SUMMARY_INTERVAL', 60.0),
+                    days=config.get('TICKET_SUMMARY_DAYS', 90),
+                    idle_after=config.get('TICKET_SUMMARY_IDLE_AFTER', 600.0),
+                )
+    return _summary
+
+
+def _reset_after_fork():
+    """En el proceso hijo de un fork el hilo de recálculo no existe: se crea uno nuevo en el primer uso."""
+    global _summary, _summary_lock
+    _summary = None
+    _summary_lock = threading.Lock()
+
+
+if hasattr(os, 'register_at_fork'): # No existe en Windows
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def get_summary_stats():
+    return _summary.stats() if _summary is not None else None